@@ -279,7 +279,40 @@ async function writeJsonFile(filePath,data){
     }
 }
 
+// Render chart dari bar MT5 di API broker (/chart) tanpa layanan chart eksternal
+async function getMt5ChartImages(symbol){
+    const baseUrl = process.env.BROKER_API_BASE_URL || 'https://api.mt5.flx.web.id';
+    const chartConfigs=[
+        {timeframe:'H4',name:'H4 with FVG & sessions'},
+        {timeframe:'H1',name:'H1 with FVG & sessions'},
+        {timeframe:'M15',name:'M15 with FVG & sessions'}
+    ];
+    const responses = await Promise.all(chartConfigs.map(cfg =>
+        axios.get(`${baseUrl}/chart/${symbol}`, {
+            params:{timeframe:cfg.timeframe,count:120,overlays:'fvg,sessions'},
+            responseType:'arraybuffer',
+            timeout: 30000
+        }).catch(error => {
+            log.error(`❌ MT5 chart request failed for ${symbol} ${cfg.timeframe}`, {
+                error: error.message,
+                status: error.response?.status
+            });
+            return null;
+        })
+    ));
+    const successful = chartConfigs.map((cfg, i) => ({cfg, res: responses[i]})).filter(r => r.res !== null);
+    log.info(`✅ Berhasil render ${successful.length}/${chartConfigs.length} chart MT5 untuk ${symbol}`);
+    return {
+        intervals: successful.map(r=>r.cfg.name),
+        images: successful.map(r=>Buffer.from(r.res.data)),
+        geminiData: successful.map(r=>({inlineData:{mimeType:'image/png',data:Buffer.from(r.res.data).toString('base64')}}))
+    };
+}
+
 async function getChartImages(symbol){
+    if(process.env.CHART_SOURCE === 'mt5'){
+        return getMt5ChartImages(symbol);
+    }
     log.info(`📈 Mengambil gambar chart untuk ${symbol}...`);
     const apiSymbol = `OANDA:${symbol}`;
     
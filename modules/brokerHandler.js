@@ -22,6 +22,8 @@ const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'X-API-Key': API_KEY,
+    // Identitas klien untuk rate limit per klien di API (API key dipakai bersama dashboard)
+    'X-Client-Id': process.env.BROKER_CLIENT_ID || 'trading-bot',
     'Content-Type': 'application/json'
   }
 });
@@ -325,8 +327,72 @@ async function modifyPosition(ticket, sl = 0.0, tp = 0.0) {
     throw new Error(`Gagal memodifikasi posisi #${ticket}: ${errorMessage}`);
   }
 }
+
+/**
+ * [POST /modify_sl_tp/batch] Mengubah SL/TP banyak posisi dalam satu request.
+ * @param {Array<{position: number, sl?: number, tp?: number}>} modifications - SL/TP yang tidak diisi tidak diubah.
+ * @returns {object} { results: [...], summary: {...} } dengan status per tiket.
+ */
+async function modifyPositions(modifications) {
+  try {
+    log.info(`[BROKER HANDLER] Mengirim modifikasi SL/TP batch untuk ${modifications.length} posisi.`);
+    const response = await apiClient.post('/modify_sl_tp/batch', { modifications });
+    if (!response.data || !Array.isArray(response.data.results)) {
+        throw new Error('Respons dari API broker (modifyPositions) tidak memiliki format yang diharapkan.');
+    }
+    return response.data;
+  } catch (error) {
+    const errorMessage = error.response ? JSON.stringify(error.response.data) : error.message;
+    log.error('[BROKER HANDLER] Gagal memodifikasi SL/TP batch:', {
+      error: errorMessage,
+      count: modifications.length,
+      statusCode: error.response?.status,
+      responseData: error.response?.data,
+      stack: error.stack
+    });
+    throw new Error(`Gagal memodifikasi SL/TP batch: ${errorMessage}`);
+  }
+}
 // ===================================================================================
 
+/**
+ * [POST /alerts] Mendaftarkan level harga / zona (FVG, likuiditas, zona entry) untuk dipantau server.
+ * @param {Array<{symbol: string, price?: number, low?: number, high?: number, name?: string, id?: string}>} alerts
+ * @returns {Array} Alert yang terdaftar.
+ */
+async function registerPriceAlerts(alerts) {
+  try {
+    const response = await apiClient.post('/alerts', { alerts });
+    return response.data.alerts;
+  } catch (error) {
+    const errorMessage = error.response ? JSON.stringify(error.response.data) : error.message;
+    log.error('[BROKER HANDLER] Gagal mendaftarkan price alert:', {
+      error: errorMessage,
+      count: alerts.length,
+      statusCode: error.response?.status
+    });
+    throw new Error(`Gagal mendaftarkan price alert: ${errorMessage}`);
+  }
+}
+
+/**
+ * [GET /alerts/events] Menunggu event touch/cross (long poll) setelah event id `since`.
+ * @returns {object} { events: [...], last_event_id } - kirim last_event_id sebagai `since` berikutnya.
+ */
+async function waitForAlertEvents(since = 0, waitSeconds = 25, symbols = []) {
+  try {
+    const response = await apiClient.get('/alerts/events', {
+      params: { since, wait: waitSeconds, symbols: symbols.join(',') || undefined },
+      timeout: (waitSeconds + 10) * 1000
+    });
+    return response.data;
+  } catch (error) {
+    const errorMessage = error.response ? JSON.stringify(error.response.data) : error.message;
+    log.error('[BROKER HANDLER] Gagal mengambil event price alert:', { error: errorMessage, since });
+    return { events: [], last_event_id: since };
+  }
+}
+
 /**
  * [FUNGSI DIPERBAIKI] Mengambil detail deal penutupan dari histori dengan lebih teliti.
  * @param {number} positionId - ID Posisi (biasanya sama dengan tiket order pembuka) yang ingin dicari.
@@ -595,5 +661,8 @@ module.exports = {
   getClosingDealInfo,
   getTodaysProfit,
   getWeeklyPerformance,
-  modifyPosition
+  modifyPosition,
+  modifyPositions,
+  registerPriceAlerts,
+  waitForAlertEvents
 };
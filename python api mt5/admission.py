@@ -0,0 +1,183 @@
+"""
+Admission control: per-client token buckets, per-class concurrency limits and load
+shedding, so trading calls stay fast while dashboards flood the data routes.
+
+Every request is put in a class:
+
+    trade    views decorated with ``trade_priority`` -- always admitted, never charged
+    data     bar / history / analytics fetches (``DATA_ROUTE_PREFIXES``)
+    default  everything else
+    exempt   ``/health`` and ``/metrics``
+
+A client may make ``ADMISSION_RATE`` requests per second with bursts up to
+``ADMISSION_BURST``; beyond that it gets ``429``. Clients are told apart by the
+``X-Client-Id`` header when sent, else by remote address; every caller shares the one
+``API_SECRET_KEY``, so the key is only used when neither is known. Each class
+has a concurrency limit (``ADMISSION_DATA_CONCURRENCY``, ``ADMISSION_DEFAULT_CONCURRENCY``)
+and data requests are also shed while more than ``ADMISSION_DATA_QUEUE`` data calls wait
+in the MT5 executor; both answer ``503``. Rejections carry ``Retry-After``.
+"""
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from flask import request, g, jsonify, current_app
+import metrics
+from terminal import executor, PRIORITY_DATA
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('ADMISSION_DISABLED', '').lower() not in ('1', 'true', 'yes')
+RATE = float(os.environ.get('ADMISSION_RATE', 20))
+BURST = float(os.environ.get('ADMISSION_BURST', 40))
+CONCURRENCY = {
+    'data': int(os.environ.get('ADMISSION_DATA_CONCURRENCY', 8)),
+    'default': int(os.environ.get('ADMISSION_DEFAULT_CONCURRENCY', 16)),
+}
+DATA_QUEUE_LIMIT = int(os.environ.get('ADMISSION_DATA_QUEUE', 32))
+
+DATA_ROUTE_PREFIXES = ('/ohlcv', '/fetch_data', '/history', '/get_deal_from_ticket', '/get_order_from_ticket',
+                       '/analytics', '/chart', '/sessions')
+EXEMPT_ROUTES = ('/health', '/metrics')
+IDLE_BUCKET_SECONDS = 600
+
+REJECTED = metrics.register(metrics.Counter(
+    'mt5api_admission_rejected_total', 'Requests rejected by admission control.', ('class', 'reason')))
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, capacity):
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, rate, capacity):
+        """Take one token; returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AdmissionController:
+    def __init__(self, rate=RATE, burst=BURST, concurrency=None, data_queue_limit=DATA_QUEUE_LIMIT):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = dict(CONCURRENCY if concurrency is None else concurrency)
+        self.data_queue_limit = data_queue_limit
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._active = {'trade': 0, 'data': 0, 'default': 0}
+        self._next_sweep = time.monotonic() + IDLE_BUCKET_SECONDS
+
+    def classify(self, view, rule):
+        if rule in EXEMPT_ROUTES:
+            return 'exempt'
+        if getattr(view, 'trade_critical', False):
+            return 'trade'
+        if rule.startswith(DATA_ROUTE_PREFIXES):
+            return 'data'
+        return 'default'
+
+    def _client(self):
+        client_id = request.headers.get('X-Client-Id', '').strip()
+        if client_id:
+            return 'id:' + client_id[:64]
+        if request.remote_addr:
+            return 'addr:' + request.remote_addr
+        key = request.headers.get('X-API-Key')
+        if key:
+            return 'key:' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+        return 'unknown'
+
+    def _sweep(self, now):
+        idle = now - IDLE_BUCKET_SECONDS
+        self._buckets = {k: b for k, b in self._buckets.items() if b.updated > idle}
+        self._next_sweep = now + IDLE_BUCKET_SECONDS
+
+    def admit(self, route_class):
+        """Return None when admitted, else a (status, reason, retry_after) tuple."""
+        if route_class == 'trade':
+            with self._lock:
+                self._active['trade'] += 1
+            return None
+
+        client = self._client()
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            # Capacity first: a request shed with 503 must not cost the client a token
+            if self._active[route_class] >= self.concurrency[route_class]:
+                return 503, 'concurrency', 1.0
+            if route_class == 'data' and executor._depth[PRIORITY_DATA] >= self.data_queue_limit:
+                return 503, 'terminal_queue', 1.0
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.burst)
+            wait = bucket.take(self.rate, self.burst)
+            if wait:
+                return 429, 'rate_limited', wait
+            self._active[route_class] += 1
+        return None
+
+    def release(self, route_class):
+        with self._lock:
+            self._active[route_class] -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "concurrency_limits": dict(self.concurrency),
+                "active": dict(self._active),
+                "clients": len(self._buckets),
+            }
+
+
+controller = AdmissionController()
+
+metrics.register(metrics.CallbackGauge(
+    'mt5api_admission_active_requests', 'Admitted requests in flight by class.', ('class',),
+    lambda: {(cls,): n for cls, n in controller._active.items()}))
+
+
+def init_app(app):
+    """Install the admission hooks on ``app``."""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _admit():
+        if request.url_rule is None:
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        route_class = controller.classify(view, request.url_rule.rule)
+        if route_class == 'exempt':
+            return None
+        rejected = controller.admit(route_class)
+        if rejected is None:
+            g.admission_class = route_class
+            return None
+
+        status, reason, retry_after = rejected
+        REJECTED.inc(route_class, reason)
+        logger.warning("Rejected %s %s (%s): %s", request.method, request.path, route_class, reason)
+        response = jsonify({"error": "Too many requests" if status == 429 else "Server busy, retry later",
+                            "reason": reason})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    @app.teardown_request
+    def _release(exc):
+        route_class = g.pop('admission_class', None)
+        if route_class is not None:
+            controller.release(route_class)
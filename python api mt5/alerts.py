@@ -0,0 +1,311 @@
+"""
+Price-level alerts evaluated on the tick stream.
+
+Clients register levels (``price``) or zones (``low`` / ``high``) per symbol, e.g. FVG
+boundaries, liquidity levels or entry zones. Every new tick of a symbol with alerts is
+checked against a per-symbol index of the zones sorted by their low; the bid moved from
+the previous tick to this one, and only zones overlapping that range are looked at
+(a ``searchsorted`` on the lows, widened by the widest zone), so the cost of a tick
+does not grow with the number of levels far from the price.
+
+Events, on bid prices like MT5 charts:
+
+* ``touch``: the price reached the level or zone from outside it
+* ``cross``: the price left the zone on the other side from the one it came from
+  (for a level: moved through it); ``direction`` is ``up`` or ``down``
+
+Alerts fire once and are then removed unless registered with ``"once": false``, and
+expire after ``ttl_seconds`` when given. Events are kept in a ring buffer with
+increasing ids (``ALERT_EVENT_BUFFER``) for long polling and are pushed to subscribers
+(the ``/stream/alerts`` SSE route of ``asgi.py``).
+
+Alerts apply to the default terminal (the one ``tick_stream`` polls) and are kept in
+memory only; the bot registers the zones of each analysis again.
+"""
+import os
+import time
+import uuid
+import logging
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timezone
+import numpy as np
+from tick_stream import tick_stream
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_ALERTS = int(os.environ.get('ALERTS_MAX', 20000))
+EVENT_BUFFER = int(os.environ.get('ALERT_EVENT_BUFFER', 1000))
+
+EVENT_TYPES = ('touch', 'cross')
+
+EVENTS = metrics.register(metrics.Counter(
+    'mt5api_alert_events_total', 'Price alert events fired, by event type.', ('event',)))
+
+
+class Alert:
+    def __init__(self, alert_id, symbol, low, high, name=None, events=EVENT_TYPES, once=True, expires=None):
+        self.id = alert_id
+        self.symbol = symbol
+        self.low = low
+        self.high = high
+        self.name = name
+        self.events = frozenset(events)
+        self.once = once
+        self.expires = expires
+        self.created = time.time()
+        # Side of the zone the price is on (-1 below, 0 inside, 1 above) and the last
+        # side it was on outside the zone; None until the first price is known
+        self.side = None
+        self.origin = None
+        self.fired = 0
+
+    def locate(self, price):
+        return -1 if price < self.low else 1 if price > self.high else 0
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "symbol": self.symbol,
+            "low": self.low,
+            "high": self.high,
+            "name": self.name,
+            "events": sorted(self.events),
+            "once": self.once,
+            "expires": datetime.fromtimestamp(self.expires, timezone.utc).isoformat() if self.expires else None,
+            "side": {-1: "below", 0: "inside", 1: "above"}.get(self.side),
+            "fired": self.fired,
+        }
+
+
+def parse_alert(data):
+    """An ``Alert`` from a request item; raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("Every alert must be an object")
+    symbol = str(data.get('symbol') or '').strip()
+    if not symbol:
+        raise ValueError("'symbol' is required")
+    if data.get('price') is None and (data.get('low') is None or data.get('high') is None):
+        raise ValueError(f"Alert for {symbol} needs 'price' or both 'low' and 'high'")
+    try:
+        if data.get('price') is not None:
+            low = high = float(data['price'])
+        else:
+            low, high = sorted((float(data['low']), float(data['high'])))
+        ttl = float(data['ttl_seconds']) if data.get('ttl_seconds') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid number in alert for {symbol}")
+    if low <= 0:
+        raise ValueError("Alert prices must be positive")
+    events = data.get('events') or EVENT_TYPES
+    if isinstance(events, str):
+        events = [events]
+    unknown = set(events) - set(EVENT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown event type(s): {', '.join(sorted(unknown))}. Valid options are: {', '.join(EVENT_TYPES)}.")
+    return Alert(str(data.get('id') or uuid.uuid4().hex[:12]), symbol, low, high, name=data.get('name'),
+                 events=events, once=bool(data.get('once', True)),
+                 expires=time.time() + ttl if ttl else None)
+
+
+class _Index:
+    """Zones of one symbol sorted by low."""
+
+    def __init__(self, alerts):
+        alerts = sorted(alerts, key=lambda alert: alert.low)
+        self.alerts = alerts
+        self.lows = np.array([a.low for a in alerts])
+        self.highs = np.array([a.high for a in alerts])
+        self.max_width = float((self.highs - self.lows).max()) if alerts else 0.0
+
+    def overlapping(self, lo, hi):
+        """Alerts whose zone intersects ``[lo, hi]``."""
+        start = np.searchsorted(self.lows, lo - self.max_width, side='left')
+        stop = np.searchsorted(self.lows, hi, side='right')
+        hits = np.flatnonzero(self.highs[start:stop] >= lo) + start
+        return [self.alerts[i] for i in hits]
+
+
+class AlertEngine:
+    def __init__(self, max_alerts=MAX_ALERTS, buffer=EVENT_BUFFER):
+        self.max_alerts = max_alerts
+        self._lock = threading.Lock()
+        self._alerts = {}
+        self._indexes = {}
+        self._prices = {}
+        self._next_expiry = None
+        self._token = None
+        self._symbols = frozenset()
+        self._events = deque(maxlen=buffer)
+        self._event_ids = itertools.count(1)
+        self._last_event_id = 0
+        self._subscribers = {}
+        self._subscriber_ids = itertools.count(1)
+
+    # --- Registry -------------------------------------------------------------
+    def add(self, alerts):
+        """Register (or replace, by id) ``alerts``; raises ValueError past ``max_alerts``."""
+        with self._lock:
+            self._prune(time.time())
+            new = sum(1 for alert in alerts if alert.id not in self._alerts)
+            if len(self._alerts) + new > self.max_alerts:
+                raise ValueError(f"At most {self.max_alerts} alerts can be registered")
+            for alert in alerts:
+                old = self._alerts.pop(alert.id, None)
+                if old is not None:
+                    self._indexes.pop(old.symbol, None)
+                self._alerts[alert.id] = alert
+                self._indexes.pop(alert.symbol, None)
+            self._update_expiry()
+        self._resubscribe()
+        return [alert.to_dict() for alert in alerts]
+
+    def remove(self, alert_id=None, symbol=None):
+        """Remove one alert, every alert of ``symbol`` or (neither given) all; returns the count."""
+        with self._lock:
+            ids = [alert_id] if alert_id is not None else [
+                a.id for a in self._alerts.values() if symbol is None or a.symbol == symbol]
+            removed = [self._alerts.pop(i) for i in ids if i in self._alerts]
+            for alert in removed:
+                self._indexes.pop(alert.symbol, None)
+            self._update_expiry()
+        if removed:
+            self._resubscribe()
+        return len(removed)
+
+    def all(self, symbol=None):
+        with self._lock:
+            self._prune(time.time())
+            return [a.to_dict() for a in self._alerts.values() if symbol is None or a.symbol == symbol]
+
+    def _prune(self, now):
+        expired = [a for a in self._alerts.values() if a.expires and a.expires <= now]
+        for alert in expired:
+            del self._alerts[alert.id]
+            self._indexes.pop(alert.symbol, None)
+        if expired:
+            self._update_expiry()
+        return expired
+
+    def _update_expiry(self):
+        self._next_expiry = min((a.expires for a in self._alerts.values() if a.expires), default=None)
+
+    def _resubscribe(self):
+        with self._lock:
+            symbols = frozenset(alert.symbol for alert in self._alerts.values())
+            if symbols == self._symbols:
+                return
+            old, self._symbols = self._token, symbols
+            self._token = tick_stream.subscribe(symbols, self.on_tick) if symbols else None
+            # Prices of symbols no longer streamed go stale
+            self._prices = {s: p for s, p in self._prices.items() if s in symbols}
+        if old is not None:
+            tick_stream.unsubscribe(old)
+
+    # --- Evaluation -----------------------------------------------------------
+    def on_tick(self, symbol, tick):
+        """Tick stream callback: fire the events of the zones the bid moved through."""
+        price = tick.bid
+        if not price:
+            return
+        fired = []
+        with self._lock:
+            now = time.time()
+            if self._next_expiry is not None and self._next_expiry <= now:
+                self._prune(now)
+            previous = self._prices.get(symbol)
+            self._prices[symbol] = price
+            index = self._indexes.get(symbol)
+            if index is None:
+                index = self._indexes[symbol] = _Index([a for a in self._alerts.values() if a.symbol == symbol])
+                # New alerts start from the last known price (this one on the first tick)
+                for alert in index.alerts:
+                    if alert.side is None:
+                        alert.side = alert.origin = alert.locate(price if previous is None else previous)
+            if previous is None:
+                return
+
+            for alert in index.overlapping(min(previous, price), max(previous, price)):
+                side = alert.locate(price)
+                events = []
+                if alert.side != 0 and 'touch' in alert.events:
+                    events.append(('touch', 'up' if alert.side < 0 else 'down'))
+                if side != 0 and alert.origin is not None and side == -alert.origin and 'cross' in alert.events:
+                    events.append(('cross', 'up' if side > 0 else 'down'))
+                alert.side = side
+                if side != 0:
+                    alert.origin = side
+                for event, direction in events:
+                    fired.append(self._record(alert, event, direction, price, tick))
+                if events and alert.once:
+                    del self._alerts[alert.id]
+                    self._indexes.pop(symbol, None)
+            subscribers = list(self._subscribers.values()) if fired else ()
+
+        for callback in subscribers:
+            for event in fired:
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception("Alert subscriber failed")
+        if fired and not any(alert.symbol == symbol for alert in list(self._alerts.values())):
+            self._resubscribe()
+
+    def _record(self, alert, event, direction, price, tick):
+        alert.fired += 1
+        self._last_event_id = next(self._event_ids)
+        payload = {
+            "id": self._last_event_id,
+            "alert": alert.id,
+            "name": alert.name,
+            "symbol": alert.symbol,
+            "event": event,
+            "direction": direction,
+            "price": price,
+            "low": alert.low,
+            "high": alert.high,
+            "time_msc": tick.time_msc,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._events.append(payload)
+        EVENTS.inc(event)
+        logger.info("Alert %s %s %s %s at %s", alert.id, alert.symbol, event, direction, price)
+        return payload
+
+    # --- Delivery -------------------------------------------------------------
+    def events_since(self, since=0, symbols=None):
+        """Buffered events with an id above ``since``."""
+        with self._lock:
+            if since > self._last_event_id:
+                # Ids restart with the server
+                since = 0
+            events = [e for e in self._events if e['id'] > since and (not symbols or e['symbol'] in symbols)]
+            return events, self._last_event_id
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every event (on the tick poller thread); returns a token."""
+        token = next(self._subscriber_ids)
+        with self._lock:
+            self._subscribers[token] = callback
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "alerts": len(self._alerts),
+                "symbols": sorted(self._symbols),
+                "last_event_id": self._last_event_id,
+                "subscribers": len(self._subscribers),
+            }
+
+
+engine = AlertEngine()
+metrics.register(metrics.CallbackGauge(
+    'mt5api_alerts_registered', 'Price alerts currently registered.', (),
+    lambda: {(): len(engine._alerts)}))
@@ -1,27 +1,58 @@
 import logging
 import os
-from flask import Flask
+import threading
+from flask import Flask, request, g, jsonify
 from dotenv import load_dotenv
-import MetaTrader5 as mt5
-from flasgger import Swagger
 from werkzeug.middleware.proxy_fix import ProxyFix
-from swagger import swagger_config
+
+load_dotenv()
+
+import logging_setup
+logging_setup.configure_logging()
+
+import startup
+
+with startup.phase('core'):
+    import metrics
+    import profiling
+    import admission
+    from swagger import init_swagger
+    from connection import connection
+    from terminal import mt5, set_account, reset_account, SIMULATED
+    from terminal_pool import TerminalPool, UnknownAccount
+    from traffic_recorder import TrafficRecorder
+    from json_provider import FastJSONProvider
+    import prewarm
+    import stop_manager
 
 # Import routes kembali ke atas
-from routes.health import health_bp
-from routes.symbol import symbol_bp
-from routes.data import data_bp
-from routes.position import position_bp
-from routes.order import order_bp
-from routes.history import history_bp
-from routes.error import error_bp
+with startup.phase('routes'):
+    from routes.health import health_bp
+    from routes.symbol import symbol_bp
+    from routes.data import data_bp
+    from routes.position import position_bp
+    from routes.order import order_bp
+    from routes.history import history_bp
+    from routes.error import error_bp
+    from routes.analytics import analytics_bp
+    from routes.metrics import metrics_bp
+    from routes.profiling import profiling_bp
+    from routes.cache import cache_bp
+    from routes.chart import chart_bp
+    from routes.session import session_bp
+    from routes.stops import stops_bp
+    from routes.alerts import alerts_bp
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+if SIMULATED:
+    logger.warning("MT5_SIMULATOR is set: serving simulated MetaTrader5 data, no orders reach a broker.")
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['PREFERRED_URL_SCHEME'] = 'https'
-swagger = Swagger(app, config=swagger_config)
+with startup.phase('swagger'):
+    swagger = init_swagger(app)
 
 # Register blueprints
 app.register_blueprint(health_bp)
@@ -31,10 +62,64 @@ app.register_blueprint(position_bp)
 app.register_blueprint(order_bp)
 app.register_blueprint(history_bp)
 app.register_blueprint(error_bp)
+app.register_blueprint(analytics_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(profiling_bp)
+app.register_blueprint(cache_bp)
+app.register_blueprint(chart_bp)
+app.register_blueprint(session_bp)
+app.register_blueprint(stops_bp)
+app.register_blueprint(alerts_bp)
+
+logging_setup.init_app(app)
+metrics.init_app(app)
+profiling.init_app(app)
+admission.init_app(app)
+
+# Optional multi-terminal pool: route calls to per-account worker processes
+if os.environ.get('MT5_TERMINALS_FILE'):
+    mt5.pool = TerminalPool.from_file(os.environ['MT5_TERMINALS_FILE'])
+
+    @app.before_request
+    def select_account():
+        account = request.headers.get('X-MT5-Account')
+        if account is None and request.is_json:
+            account = (request.get_json(silent=True) or {}).get('account')
+        if account is not None:
+            try:
+                mt5.pool.account_worker(account)
+            except UnknownAccount as e:
+                return jsonify({"error": str(e)}), 400
+        g.account_token = set_account(account)
+
+    @app.teardown_request
+    def release_account(exc):
+        token = g.pop('account_token', None)
+        if token is not None:
+            reset_account(token)
+
+# Optional traffic recording for offline replay (benchmarks/replay.py)
+if os.environ.get('TRAFFIC_RECORD_FILE'):
+    app.wsgi_app = TrafficRecorder(app.wsgi_app, os.environ['TRAFFIC_RECORD_FILE'])
+
+# x_for: the per-client rate limit keys on remote_addr, which must be the caller, not the proxy
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+startup.mark_ready()
+if startup.FAST_START:
+    startup.warm_up()
 
 if __name__ == '__main__':
-    if not mt5.initialize():
-        logger.error("Failed to initialize MT5.")
+    if startup.FAST_START:
+        # Accept requests right away; handlers answer 503 until the terminal is up
+        threading.Thread(target=connection.start, name='mt5-connect', daemon=True).start()
+    else:
+        with startup.phase('connect'):
+            connection.start()
+        if not connection.connected:
+            logger.error("Failed to initialize MT5, retrying in background.")
+    # Fill the caches now and before each analysis window (waits for the terminal)
+    prewarm.start()
+    # Restore saved stop rules and manage them on the tick stream
+    stop_manager.start()
     app.run(host='0.0.0.0', port=int(os.environ.get('MT5_API_PORT')))
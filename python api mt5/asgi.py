@@ -0,0 +1,386 @@
+"""
+ASGI entry point.
+
+Serves the same blueprints as ``app.py`` (same URLs, same responses) plus streaming
+routes that are handled natively on the event loop:
+
+    uvicorn asgi:application --host 0.0.0.0 --port $MT5_API_PORT
+
+Regular requests are handed to the Flask app on a bounded thread pool
+(``ASGI_WORKERS``, default 16), and their terminal calls still go through the single
+MT5 executor. Streaming clients only cost a coroutine and a small queue each, so
+hundreds of idle SSE or long-poll connections do not hold a thread.
+"""
+import os
+import io
+import sys
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from app import app
+from startup import FAST_START
+from auth import is_authorized
+from connection import connection
+from tick_stream import tick_stream
+from alerts import engine as alert_engine
+import prewarm
+import stop_manager
+
+logger = logging.getLogger(__name__)
+
+WSGI_WORKERS = int(os.environ.get('ASGI_WORKERS', 16))
+HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+STREAM_QUEUE_SIZE = 256
+
+wsgi_pool = ThreadPoolExecutor(max_workers=WSGI_WORKERS, thread_name_prefix='wsgi')
+
+
+# ---------------------------------------------------------------------------
+# WSGI bridge
+# ---------------------------------------------------------------------------
+def _build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return chunks.append
+
+    result = app.wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return response['status'], response['headers'], b''.join(chunks)
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body.extend(message.get('body', b''))
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _handle_wsgi(scope, receive, send):
+    body = await _read_body(receive)
+    if body is None:
+        return
+    loop = asyncio.get_running_loop()
+    status, headers, content = await loop.run_in_executor(wsgi_pool, _call_wsgi, _build_environ(scope, body))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+# ---------------------------------------------------------------------------
+# Native streaming routes
+# ---------------------------------------------------------------------------
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _header(scope, name):
+    name = name.lower().encode('latin-1')
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _query(scope):
+    return {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+
+
+def _tick_payload(symbol, tick):
+    return {'symbol': symbol, **tick._asdict()}
+
+
+def _subscribe(symbols, maxsize=STREAM_QUEUE_SIZE):
+    """Subscribe an asyncio queue to the tick stream; the oldest tick is dropped when it is full."""
+    loop = asyncio.get_running_loop()
+    ticks = asyncio.Queue(maxsize=maxsize)
+
+    def offer(item):
+        if ticks.full():
+            ticks.get_nowait()
+        ticks.put_nowait(item)
+
+    def on_tick(symbol, tick):
+        loop.call_soon_threadsafe(offer, (symbol, tick))
+
+    return ticks, tick_stream.subscribe(symbols, on_tick)
+
+
+def _symbols(params):
+    return [s.strip() for s in params.get('symbols', '').split(',') if s.strip()]
+
+
+async def _stream_ticks(scope, receive, send):
+    """GET /stream/ticks?symbols=EURUSD,GBPUSD -> text/event-stream of ticks."""
+    if not is_authorized(_header(scope, 'X-API-Key')):
+        return await _send_json(send, 401, {"error": "Unauthorized Access"})
+    symbols = _symbols(_query(scope))
+    if not symbols:
+        return await _send_json(send, 400, {"error": "Parameter 'symbols' is required"})
+
+    ticks, token = _subscribe(symbols)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'),
+                                (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        for symbol in symbols:
+            tick = tick_stream.latest(symbol)
+            if tick is not None:
+                await _send_event(send, 'tick', _tick_payload(symbol, tick))
+
+        while not disconnected.done():
+            getter = asyncio.ensure_future(ticks.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await _send_event(send, 'tick', _tick_payload(*getter.result()))
+                continue
+            getter.cancel()
+            if not done:
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+    finally:
+        tick_stream.unsubscribe(token)
+        disconnected.cancel()
+
+
+async def _poll_ticks(scope, receive, send):
+    """
+    GET /stream/ticks/poll?symbols=EURUSD&since=<time_msc>&timeout=25 -> long poll.
+    Returns at once if a newer tick is already known, otherwise waits for the next one.
+    """
+    if not is_authorized(_header(scope, 'X-API-Key')):
+        return await _send_json(send, 401, {"error": "Unauthorized Access"})
+    params = _query(scope)
+    symbols = _symbols(params)
+    if not symbols:
+        return await _send_json(send, 400, {"error": "Parameter 'symbols' is required"})
+    try:
+        since = int(params.get('since', 0))
+        timeout = min(float(params.get('timeout', 25)), 120.0)
+    except ValueError:
+        return await _send_json(send, 400, {"error": "Invalid 'since' or 'timeout' parameter"})
+
+    ticks, token = _subscribe(symbols)
+    try:
+        fresh = [_tick_payload(s, t) for s in symbols
+                 for t in [tick_stream.latest(s)] if t is not None and t.time_msc > since]
+        if not fresh:
+            try:
+                symbol, tick = await asyncio.wait_for(ticks.get(), timeout)
+                fresh.append(_tick_payload(symbol, tick))
+            except asyncio.TimeoutError:
+                pass
+        while not ticks.empty():
+            fresh.append(_tick_payload(*ticks.get_nowait()))
+        await _send_json(send, 200, {"ticks": [t for t in fresh if t['time_msc'] > since]})
+    finally:
+        tick_stream.unsubscribe(token)
+
+
+def _subscribe_alerts(symbols, maxsize=STREAM_QUEUE_SIZE):
+    """Subscribe an asyncio queue to alert events (of ``symbols`` when given)."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(maxsize=maxsize)
+    wanted = set(symbols)
+
+    def offer(event):
+        if events.full():
+            events.get_nowait()
+        events.put_nowait(event)
+
+    def on_event(event):
+        if not wanted or event['symbol'] in wanted:
+            loop.call_soon_threadsafe(offer, event)
+
+    return events, alert_engine.subscribe(on_event)
+
+
+def _alert_since(scope, params):
+    return int(params.get('since') or _header(scope, 'Last-Event-ID') or 0)
+
+
+async def _stream_alerts(scope, receive, send):
+    """
+    GET /stream/alerts?symbols=EURUSD&since=<event id> -> text/event-stream of alert events.
+    Buffered events after ``since`` (or the Last-Event-ID header) are sent first.
+    """
+    if not is_authorized(_header(scope, 'X-API-Key')):
+        return await _send_json(send, 401, {"error": "Unauthorized Access"})
+    params = _query(scope)
+    symbols = _symbols(params)
+    try:
+        since = _alert_since(scope, params)
+    except ValueError:
+        return await _send_json(send, 400, {"error": "Invalid 'since' parameter"})
+
+    events, token = _subscribe_alerts(symbols)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'),
+                                (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        buffered, last_id = alert_engine.events_since(since, symbols)
+        for event in buffered:
+            await _send_event(send, 'alert', event, event['id'])
+
+        while not disconnected.done():
+            getter = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({getter, disconnected}, timeout=HEARTBEAT_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                event = getter.result()
+                # Already sent from the buffer
+                if event['id'] > last_id:
+                    await _send_event(send, 'alert', event, event['id'])
+                continue
+            getter.cancel()
+            if not done:
+                await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+    finally:
+        alert_engine.unsubscribe(token)
+        disconnected.cancel()
+
+
+async def _poll_alerts(scope, receive, send):
+    """
+    GET /stream/alerts/poll?since=<event id>&symbols=EURUSD&timeout=25 -> long poll.
+    Returns at once if there are buffered events after ``since``, otherwise waits for the next one.
+    """
+    if not is_authorized(_header(scope, 'X-API-Key')):
+        return await _send_json(send, 401, {"error": "Unauthorized Access"})
+    params = _query(scope)
+    symbols = _symbols(params)
+    try:
+        since = _alert_since(scope, params)
+        timeout = min(float(params.get('timeout', 25)), 120.0)
+    except ValueError:
+        return await _send_json(send, 400, {"error": "Invalid 'since' or 'timeout' parameter"})
+
+    events, token = _subscribe_alerts(symbols)
+    try:
+        fresh, last_id = alert_engine.events_since(since, symbols)
+        if not fresh:
+            try:
+                fresh.append(await asyncio.wait_for(events.get(), timeout))
+            except asyncio.TimeoutError:
+                pass
+        while not events.empty():
+            fresh.append(events.get_nowait())
+        fresh = sorted({e['id']: e for e in fresh}.values(), key=lambda e: e['id'])
+        last_id = max([last_id] + [e['id'] for e in fresh])
+        await _send_json(send, 200, {"events": fresh, "last_event_id": last_id})
+    finally:
+        alert_engine.unsubscribe(token)
+
+
+async def _send_event(send, event, payload, event_id=None):
+    data = (f"id: {event_id}\n" if event_id is not None else "") + f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    data = data.encode('utf-8')
+    await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+STREAM_ROUTES = {
+    '/stream/ticks': _stream_ticks,
+    '/stream/ticks/poll': _poll_ticks,
+    '/stream/alerts': _stream_alerts,
+    '/stream/alerts/poll': _poll_alerts,
+}
+
+
+# ---------------------------------------------------------------------------
+# ASGI application
+# ---------------------------------------------------------------------------
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            loop = asyncio.get_running_loop()
+            connecting = loop.run_in_executor(wsgi_pool, connection.start)
+            if not FAST_START:
+                await connecting
+            prewarm.start()
+            stop_manager.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if prewarm.prewarmer is not None:
+                prewarm.prewarmer.stop()
+            if stop_manager.manager is not None:
+                stop_manager.manager.stop()
+            connection.stop()
+            wsgi_pool.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    handler = STREAM_ROUTES.get(scope['path'])
+    if handler is not None and scope['method'] == 'GET':
+        return await handler(scope, receive, send)
+    return await _handle_wsgi(scope, receive, send)
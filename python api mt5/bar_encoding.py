@@ -0,0 +1,99 @@
+"""
+Compact text encoding of OHLCV bars for LLM prompts.
+
+Per-bar JSON records repeat every key and print full prices and timestamps; this form
+prints each bar as one line of small integers:
+
+    # EURUSD H1 bars=100 digits=5 point=0.00001 tz=Asia/Jakarta
+    # prices: points from anchor 1.08650 | cols: open high low close tick_volume
+    @2024-05-27 01:00 step=1h
+    0 12 -8 5 1520
+    5 9 -14 -11 1432
+    ...
+
+Prices are integer points (``symbol_info.digits`` precision) relative to the anchor, the
+open of the first bar. A ``@`` line gives the open time and bar length of the lines
+below it. The first line after a ``@`` line is the bar at that time and later lines are
+``step`` apart. A new ``@`` line starts wherever bars are not contiguous (weekends,
+gaps) or the bar length changes.
+
+With ``coarsen=N`` the bars older than the last ``detail`` are merged N at a time
+(open of the first, high/low extremes, close of the last, summed volume), so a long
+history costs a fraction of the lines while recent price action keeps full resolution.
+"""
+from datetime import datetime
+import numpy as np
+from startup import lazy_import
+
+pytz = lazy_import('pytz')
+
+COLUMNS = 'open high low close tick_volume'
+
+
+def coarsen(rates, factor):
+    """Merge consecutive groups of ``factor`` bars (aligned to the newest bar)."""
+    if factor <= 1 or len(rates) < factor:
+        return rates
+    rates = rates[len(rates) % factor:]
+    groups = rates.reshape(-1, factor)
+    merged = np.empty(len(groups), dtype=rates.dtype)
+    merged['time'] = groups['time'][:, 0]
+    merged['open'] = groups['open'][:, 0]
+    merged['high'] = groups['high'].max(axis=1)
+    merged['low'] = groups['low'].min(axis=1)
+    merged['close'] = groups['close'][:, -1]
+    merged['tick_volume'] = groups['tick_volume'].sum(axis=1)
+    return merged
+
+
+def _blocks(rates, step):
+    """Split ``rates`` into runs of bars exactly ``step`` seconds apart."""
+    breaks = np.flatnonzero(np.diff(rates['time']) != step) + 1
+    return np.split(rates, breaks)
+
+
+def _step_label(seconds):
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400}d"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    return f"{seconds // 60}m"
+
+
+def encode(rates, symbol, timeframe, step, digits, tz='UTC', detail=None, factor=1):
+    """
+    Encode a MT5 rates array. ``step`` is the bar length in seconds; with ``factor`` > 1
+    all but the last ``detail`` bars are coarsened by that factor.
+    """
+    zone = pytz.timezone(tz)
+    point = 10.0 ** -digits
+    if not len(rates):
+        return f"# {symbol} {timeframe} bars=0 digits={digits} point={point:.{digits}f} tz={tz}\n"
+    anchor = float(rates['open'][0])
+
+    sections = []
+    if factor > 1 and detail is not None and len(rates) > detail:
+        old = coarsen(rates[:len(rates) - detail], factor)
+        if len(old):
+            sections.append((old, step * factor))
+        sections.append((rates[len(rates) - detail:], step))
+    else:
+        sections.append((rates, step))
+
+    lines = [
+        f"# {symbol} {timeframe} bars={sum(len(s) for s, _ in sections)} digits={digits} "
+        f"point={point:.{digits}f} tz={tz}",
+        f"# prices: points from anchor {anchor:.{digits}f} | cols: {COLUMNS}",
+    ]
+    for section, section_step in sections:
+        prices = np.rint((np.column_stack((section['open'], section['high'], section['low'], section['close']))
+                          - anchor) / point).astype(np.int64)
+        volumes = section['tick_volume'].astype(np.int64)
+        offset = 0
+        for block in _blocks(section, section_step):
+            opened = datetime.fromtimestamp(int(block['time'][0]), pytz.utc).astimezone(zone)
+            lines.append(f"@{opened:%Y-%m-%d %H:%M} step={_step_label(section_step)}")
+            for row, volume in zip(prices[offset:offset + len(block)].tolist(), volumes[offset:offset + len(block)].tolist()):
+                lines.append(f"{row[0]} {row[1]} {row[2]} {row[3]} {volume}")
+            offset += len(block)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,369 @@
+"""
+Endpoint benchmarks against the simulated terminal.
+
+Runs the data, history, trading, stop-rule, alert and session routes through the Flask
+test client with ``MT5_SIMULATOR=1`` at several payload sizes, and reports throughput and
+p50/p90/p99 latency. Time spent inside MetaTrader5 calls (from the
+``mt5api_terminal_call_duration_seconds`` histogram) is reported separately from the rest
+of the request (routing, pandas, serialization). The ``ohlcv_cold_*`` scenarios empty the
+bar cache before every request, so their terminal/app split reflects a full fetch; with
+``--concurrency`` above 1 the setups run up front and only the first request is cold.
+
+    python benchmarks/bench.py                                # print results
+    python benchmarks/bench.py --save benchmarks/baseline.json
+    python benchmarks/bench.py --compare benchmarks/baseline.json --threshold 0.2
+    python benchmarks/bench.py --only ohlcv --iterations 50 --latency-ms 1
+
+``--compare`` exits with status 1 when a scenario's p50 or p99 grew, or its throughput
+dropped, by more than ``--threshold`` (relative). A run in which any request of a
+scenario failed exits with status 1 and is not saved. Baselines are machine specific:
+record and compare on the same host.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import platform
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+os.environ['MT5_SIMULATOR'] = '1'
+os.environ.setdefault('MT5_SIM_TIME', '1717200000')
+os.environ.setdefault('API_SECRET_KEY', 'bench')
+# Synthetic load from one client would otherwise be throttled by the per-client rate limit
+os.environ.setdefault('ADMISSION_DISABLED', '1')
+os.environ.pop('MT5_TERMINALS_FILE', None)
+
+import numpy as np
+import mt5_simulator as sim
+import metrics
+from app import app
+from connection import connection
+from market_cache import bar_cache
+from routes.position import MAX_BATCH_MODIFICATIONS
+
+HEADERS = {'X-API-Key': os.environ['API_SECRET_KEY']}
+BAR_SIZES = (100, 1000, 10000)
+POSITION_SIZES = (1, 50, 500)
+HISTORY_TRADES = 500
+HISTORY_RANGE = {'from_date': '2024-01-01T00:00:00', 'to_date': '2024-07-01T00:00:00'}
+
+
+def _terminal_seconds():
+    return sum(total for _, total in metrics.TERMINAL_LATENCY._values.values())
+
+
+def _reset_positions(count):
+    """Start from exactly ``count`` open positions and no pending orders."""
+    sim.reset()
+    sim.initialize()
+    sim.seed_history(HISTORY_TRADES)
+    if count:
+        sim.seed_positions(count)
+
+
+def _first_position():
+    return sim.positions_get()[0]._asdict()
+
+
+def _pending_order():
+    tick = sim.symbol_info_tick('EURUSD')
+    result = sim.order_send({'action': sim.TRADE_ACTION_PENDING, 'symbol': 'EURUSD', 'volume': 0.01,
+                             'type': sim.ORDER_TYPE_BUY_LIMIT, 'price': round(tick.bid - 0.005, 5),
+                             'type_time': sim.ORDER_TIME_GTC, 'type_filling': sim.ORDER_FILLING_IOC})
+    return result.order
+
+
+def _history_ticket():
+    """Latest opening deal in the seeded history."""
+    deals = sim.history_deals_get(0, int(sim._sim.now()) + 86400)
+    return [deal for deal in deals if deal.entry == sim.DEAL_ENTRY_IN][-1]
+
+
+def _range(bars, timeframe_seconds=3600):
+    end = datetime.fromtimestamp(int(os.environ['MT5_SIM_TIME']), tz=timezone.utc)
+    start = end - timedelta(seconds=bars * timeframe_seconds)
+    return start.isoformat(), end.isoformat()
+
+
+def scenarios():
+    """(name, route, size, setup) tuples; ``setup()`` returns the test client request kwargs."""
+    items = [
+        ('health', '/health', None, lambda: {'method': 'GET', 'path': '/health'}),
+        ('metrics', '/metrics', None, lambda: {'method': 'GET', 'path': '/metrics'}),
+        ('symbol_info_tick', '/symbol_info_tick/<symbol>', None,
+         lambda: {'method': 'GET', 'path': '/symbol_info_tick/EURUSD'}),
+        ('symbol_info', '/symbol_info/<symbol>', None,
+         lambda: {'method': 'GET', 'path': '/symbol_info/EURUSD'}),
+        ('data_tick', '/data/tick/<symbol>', None, lambda: {'method': 'GET', 'path': '/data/tick/EURUSD'}),
+        ('last_error', '/last_error', None, lambda: {'method': 'GET', 'path': '/last_error'}),
+        ('last_error_str', '/last_error_str', None, lambda: {'method': 'GET', 'path': '/last_error_str'}),
+        ('analytics_performance', '/analytics/performance', HISTORY_TRADES,
+         lambda: {'method': 'GET', 'path': '/analytics/performance',
+                  'query_string': HISTORY_RANGE}),
+        ('get_deal_from_ticket', '/get_deal_from_ticket', None,
+         lambda: {'method': 'GET', 'path': '/get_deal_from_ticket',
+                  'query_string': {'ticket': _history_ticket().position_id, **HISTORY_RANGE}}),
+        ('get_order_from_ticket', '/get_order_from_ticket', None,
+         lambda: {'method': 'GET', 'path': '/get_order_from_ticket',
+                  'query_string': {'ticket': _history_ticket().order}}),
+        ('history_deals_get', '/history_deals_get', None,
+         lambda: {'method': 'GET', 'path': '/history_deals_get',
+                  'query_string': {'position': _history_ticket().position_id, **HISTORY_RANGE}}),
+        ('history_orders_get', '/history_orders_get', None,
+         lambda: {'method': 'GET', 'path': '/history_orders_get',
+                  'query_string': {'ticket': _history_ticket().order}}),
+        ('order_market', '/order', None,
+         lambda: {'method': 'POST', 'path': '/order',
+                  'json': {'symbol': 'EURUSD', 'volume': 0.01, 'type': 'ORDER_TYPE_BUY'}}),
+        ('order_cancel', '/order/cancel', None,
+         lambda: {'method': 'POST', 'path': '/order/cancel', 'json': {'ticket': _pending_order()}}),
+        ('sessions', '/sessions', None, lambda: {'method': 'GET', 'path': '/sessions'}),
+        ('sessions_symbol', '/sessions/<symbol>', None,
+         lambda: {'method': 'GET', 'path': '/sessions/EURUSD',
+                  'query_string': {'session': 'london', 'timeframe': 'M15', 'days': 5}}),
+        ('alerts_register', '/alerts', None,
+         lambda: {'method': 'POST', 'path': '/alerts',
+                  'json': {'id': 'bench', 'symbol': 'EURUSD', 'low': 1.0, 'high': 1.01, 'once': False}}),
+        ('alerts_events', '/alerts/events', None, lambda: {'method': 'GET', 'path': '/alerts/events'}),
+    ]
+
+    for bars in (100, 1000):
+        items.append((f'chart_{bars}', '/chart/<symbol>', bars,
+                      lambda bars=bars: {'method': 'GET', 'path': '/chart/EURUSD',
+                                         'query_string': {'timeframe': 'H1', 'count': bars,
+                                                          'overlays': 'fvg,sessions'}}))
+
+    for bars in BAR_SIZES:
+        items.append((f'ohlcv_{bars}', '/ohlcv', bars,
+                      lambda bars=bars: {'method': 'GET', 'path': '/ohlcv',
+                                         'query_string': {'symbol': 'EURUSD', 'timeframe': 'H1', 'count': bars}}))
+        items.append((f'ohlcv_cold_{bars}', '/ohlcv', bars,
+                      lambda bars=bars: _cold({'method': 'GET', 'path': '/ohlcv',
+                                               'query_string': {'symbol': 'EURUSD', 'timeframe': 'H1',
+                                                                'count': bars}})))
+        items.append((f'ohlcv_mtf_{bars}', '/ohlcv/mtf', bars,
+                      lambda bars=bars: {'method': 'GET', 'path': '/ohlcv/mtf',
+                                         'query_string': {'symbol': 'EURUSD', 'timeframes': 'H4,H1,M15',
+                                                          'count': bars}}))
+        items.append((f'fetch_data_pos_{bars}', '/fetch_data_pos', bars,
+                      lambda bars=bars: {'method': 'GET', 'path': '/fetch_data_pos',
+                                         'query_string': {'symbol': 'EURUSD', 'timeframe': 'H1', 'num_bars': bars}}))
+        start, end = _range(bars)
+        items.append((f'fetch_data_range_{bars}', '/fetch_data_range', bars,
+                      lambda start=start, end=end: {'method': 'GET', 'path': '/fetch_data_range',
+                                                    'query_string': {'symbol': 'EURUSD', 'timeframe': 'H1',
+                                                                     'start': start, 'end': end}}))
+
+    for count in POSITION_SIZES:
+        def positions(count=count):
+            if len(sim.positions_get() or ()) != count:
+                _reset_positions(count)
+            return {}
+
+        def with_positions(count, request):
+            def setup():
+                positions(count)
+                return request()
+            return setup
+
+        items.append((f'get_positions_{count}', '/get_positions', count,
+                      with_positions(count, lambda: {'method': 'GET', 'path': '/get_positions'})))
+        items.append((f'positions_total_{count}', '/positions_total', count,
+                      with_positions(count, lambda: {'method': 'GET', 'path': '/positions_total'})))
+        items.append((f'close_all_positions_{count}', '/close_all_positions', count,
+                      with_positions(count, lambda: {'method': 'POST', 'path': '/close_all_positions', 'json': {}})))
+        items.append((f'close_position_{count}', '/close_position', count,
+                      with_positions(count, lambda: {'method': 'POST', 'path': '/close_position',
+                                                     'json': {'position': _first_position()}})))
+        items.append((f'close_by_ticket_{count}', '/position/close_by_ticket', count,
+                      with_positions(count, lambda: {'method': 'POST', 'path': '/position/close_by_ticket',
+                                                     'json': {'ticket': _first_position()['ticket']}})))
+        items.append((f'modify_sl_tp_{count}', '/modify_sl_tp', count,
+                      with_positions(count, lambda: {'method': 'POST', 'path': '/modify_sl_tp',
+                                                     'json': _sl_tp_request()})))
+        items.append((f'modify_sl_tp_batch_{count}', '/modify_sl_tp/batch', count,
+                      with_positions(count, lambda: {'method': 'POST', 'path': '/modify_sl_tp/batch',
+                                                     'json': _sl_tp_batch_request()})))
+        items.append((f'stops_set_{count}', '/stops/<ticket>', count,
+                      with_positions(count, lambda: {'method': 'PUT',
+                                                     'path': f"/stops/{_first_position()['ticket']}",
+                                                     'json': STOP_RULES})))
+        items.append((f'stops_list_{count}', '/stops', count,
+                      with_positions(count, lambda: {'method': 'GET', 'path': '/stops'})))
+    return items
+
+
+def _cold(request):
+    """Empty the bar cache so the request fetches every bar from the terminal."""
+    bar_cache.clear()
+    return request
+
+
+STOP_RULES = {'break_even': {'trigger_points': 200, 'offset_points': 10},
+              'trailing': {'distance_points': 150, 'step_points': 10}}
+
+_sl_tp_steps = itertools.count()
+
+
+def _sl_tp_levels(position, distance):
+    direction = 1 if position['type'] == sim.ORDER_TYPE_BUY else -1
+    return {'position': position['ticket'], 'sl': round(position['price_open'] - direction * distance, 5),
+            'tp': round(position['price_open'] + direction * distance, 5)}
+
+
+def _sl_tp_request():
+    # A new distance every call, otherwise the terminal answers "No changes"
+    return _sl_tp_levels(_first_position(), 0.005 + (next(_sl_tp_steps) % 100) * 0.0001)
+
+
+def _sl_tp_batch_request():
+    distance = 0.005 + (next(_sl_tp_steps) % 100) * 0.0001
+    positions = [position._asdict() for position in sim.positions_get()[:MAX_BATCH_MODIFICATIONS]]
+    return {'modifications': [_sl_tp_levels(position, distance) for position in positions]}
+
+
+def run_scenario(client, setup, iterations, warmup, concurrency):
+    for _ in range(warmup):
+        client.open(headers=HEADERS, **setup())
+
+    requests = [setup() for _ in range(iterations)] if concurrency > 1 else None
+    latencies, sizes, errors = [], [], 0
+    terminal_before = _terminal_seconds()
+
+    def send(kwargs):
+        started = time.perf_counter()
+        response = client.open(headers=HEADERS, **kwargs)
+        elapsed = time.perf_counter() - started
+        return elapsed, len(response.data), response.status_code
+
+    wall_started = time.perf_counter()
+    if requests is not None:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(send, requests))
+    else:
+        outcomes = []
+        for _ in range(iterations):
+            kwargs = setup()
+            outcomes.append(send(kwargs))
+    # Sequential runs exclude the per-request setup (re-seeding positions) from throughput
+    wall = time.perf_counter() - wall_started if concurrency > 1 else sum(o[0] for o in outcomes)
+    terminal = _terminal_seconds() - terminal_before
+
+    for elapsed, size, status in outcomes:
+        latencies.append(elapsed)
+        sizes.append(size)
+        errors += status >= 400
+
+    latencies = np.array(latencies) * 1000
+    mean_ms = float(latencies.mean())
+    terminal_ms = terminal / iterations * 1000
+    return {
+        'requests': iterations,
+        'errors': int(errors),
+        'rps': round(iterations / wall, 2),
+        'mean_ms': round(mean_ms, 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p90_ms': round(float(np.percentile(latencies, 90)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'terminal_ms': round(terminal_ms, 3),
+        'app_ms': round(max(mean_ms - terminal_ms, 0.0), 3),
+        'response_bytes': int(np.mean(sizes)),
+    }
+
+
+def run(iterations, warmup, concurrency, latency_ms, only=None):
+    if latency_ms:
+        sim.configure(latency=latency_ms / 1000)
+    connection.start()
+    _reset_positions(0)
+    client = app.test_client()
+
+    results = {}
+    for name, route, size, setup in scenarios():
+        if only and not any(o in name for o in only):
+            continue
+        result = run_scenario(client, setup, iterations, warmup, concurrency)
+        results[name] = {'route': route, 'size': size, **result}
+        print(f"{name:<28} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+              f"p99 {result['p99_ms']:>8.2f} ms  terminal {result['terminal_ms']:>7.2f} ms  "
+              f"app {result['app_ms']:>7.2f} ms  {result['response_bytes']:>9} B"
+              + (f"  {result['errors']} errors" if result['errors'] else ''))
+    connection.stop()
+
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'concurrency': concurrency,
+            'latency_ms': latency_ms,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return a list of regression descriptions (empty when everything is within threshold)."""
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+        for key in ('p50_ms', 'p99_ms'):
+            if before[key] > 0 and now[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]:.2f} -> {now[key]:.2f} "
+                                   f"(+{(now[key] / before[key] - 1) * 100:.0f}%)")
+        if before['rps'] > 0 and now['rps'] < before['rps'] * (1 - threshold):
+            regressions.append(f"{name}: rps {before['rps']:.1f} -> {now['rps']:.1f} "
+                               f"({(now['rps'] / before['rps'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated latency of every MT5 call')
+    parser.add_argument('--only', action='append', help='run scenarios whose name contains this (repeatable)')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    current = run(args.iterations, args.warmup, args.concurrency, args.latency_ms, args.only)
+    failed = [name for name, result in current['results'].items() if result['errors']]
+    if failed:
+        # Error responses are usually much cheaper than the real work and would skew a baseline
+        print(f"\n{len(failed)} scenario(s) with errors: {', '.join(failed)}")
+        if args.save:
+            print(f"Not saving to {args.save}")
+        return 1
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Replay a traffic recording (``TRAFFIC_RECORD_FILE``, see ``traffic_recorder.py``) with its
+original timing, and report latency distributions per route.
+
+By default requests go to the Flask app in-process on the simulated terminal
+(``MT5_SIMULATOR=1``); ``--url`` sends them to a running server instead. Each request is
+issued at its recorded offset divided by ``--speed``, from a thread pool large enough for
+the recorded bursts, so concurrent cron stages contend the way they did in production.
+
+    python benchmarks/replay.py traffic.jsonl
+    python benchmarks/replay.py traffic.jsonl --speed 10 --positions 20
+    python benchmarks/replay.py traffic.jsonl --url http://127.0.0.1:5000 --api-key $API_SECRET_KEY
+    python benchmarks/replay.py traffic.jsonl --save replay.json
+    python benchmarks/replay.py traffic.jsonl --session -1
+
+A recording file can hold several sessions (one per server start). Offsets restart at 0
+in each, so sessions are replayed one after the other, ``SESSION_GAP`` seconds apart,
+or only the one picked with ``--session``.
+
+Recorded secrets were redacted, so the API key is supplied again with ``--api-key`` (or a
+throwaway key for the in-process run).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+import numpy as np
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_GAP = 1.0
+
+
+def load(path, limit=None, session=None):
+    """
+    Records of ``path`` on one timeline: each session in its recorded order, sessions one
+    after the other (``session`` picks one by index, e.g. -1 for the last).
+    """
+    sessions = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                sessions[record.get('session', 0)].append(record)
+    ordered = [sessions[key] for key in sorted(sessions)]
+    if session is not None:
+        ordered = [ordered[session]] if ordered else []
+
+    records = []
+    offset = 0.0
+    for items in ordered:
+        items.sort(key=lambda r: r['t'])
+        for record in items:
+            record['t'] += offset
+        records.extend(items)
+        offset = items[-1]['t'] + SESSION_GAP
+    return records[:limit] if limit else records
+
+
+class InProcessTarget:
+    """Sends requests to the Flask app on the simulated terminal."""
+
+    def __init__(self, api_key, positions=0, history=0, latency_ms=0.0):
+        sys.path.insert(0, API_DIR)
+        os.environ['MT5_SIMULATOR'] = '1'
+        os.environ['API_SECRET_KEY'] = api_key
+        # Every replayed request comes from one client; admission would answer the
+        # recorded bursts with 429s instead of serving them
+        os.environ.setdefault('ADMISSION_DISABLED', '1')
+        os.environ.pop('MT5_TERMINALS_FILE', None)
+        os.environ.pop('TRAFFIC_RECORD_FILE', None)
+        import mt5_simulator as sim
+        from app import app
+        from connection import connection
+
+        if latency_ms:
+            sim.configure(latency=latency_ms / 1000)
+        if history:
+            sim.seed_history(history)
+        if positions:
+            sim.seed_positions(positions)
+        connection.start()
+        self.app = app
+        self.adapter = app.url_map.bind('localhost')
+        self.api_key = api_key
+
+    def route(self, record):
+        try:
+            rule, _ = self.adapter.match(record['path'], method=record['method'], return_rule=True)
+            return rule.rule
+        except Exception:
+            return record['path']
+
+    def send(self, record):
+        headers = {**record.get('headers', {}), 'X-API-Key': self.api_key}
+        kwargs = {'method': record['method'], 'path': record['path'],
+                  'query_string': record.get('query') or None, 'headers': headers}
+        body = record.get('body')
+        if isinstance(body, (dict, list)):
+            kwargs['json'] = body
+        elif body is not None:
+            kwargs['data'] = body
+        with self.app.test_client() as client:
+            response = client.open(**kwargs)
+            return response.status_code, len(response.data)
+
+
+class HttpTarget:
+    """Sends requests to a running server."""
+
+    def __init__(self, url, api_key, timeout=60):
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def route(self, record):
+        return record['path']
+
+    def send(self, record):
+        url = self.url + record['path']
+        if record.get('query'):
+            url += '?' + urlencode(record['query'])
+        headers = {**record.get('headers', {}), 'X-API-Key': self.api_key}
+        body = record.get('body')
+        data = None
+        if isinstance(body, (dict, list)):
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif body is not None:
+            data = body.encode('utf-8')
+        request = Request(url, data=data, headers=headers, method=record['method'])
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, len(response.read())
+        except HTTPError as e:
+            return e.code, len(e.read())
+
+
+def _distribution(latencies):
+    values = np.array(latencies) * 1000
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def replay(records, target, speed=1.0, workers=64):
+    """Issue ``records`` on their recorded schedule; returns per-request outcomes."""
+    outcomes = []
+    lock = threading.Lock()
+    origin = records[0]['t'] if records else 0.0
+
+    def fire(record, due):
+        started = time.perf_counter()
+        try:
+            status, size = target.send(record)
+        except Exception as e:
+            status, size = 599, 0
+            print(f"{record['method']} {record['path']} failed: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - started
+        with lock:
+            outcomes.append({'route': f"{record['method']} {target.route(record)}", 'status': status,
+                             'latency': elapsed, 'lag': started - due, 'bytes': size,
+                             'recorded_ms': record.get('duration_ms')})
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='replay') as pool:
+        start = time.perf_counter()
+        for record in records:
+            due = start + (record['t'] - origin) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, record, due)
+    return outcomes, time.perf_counter() - start
+
+
+def report(outcomes, wall):
+    by_route = defaultdict(list)
+    for outcome in outcomes:
+        by_route[outcome['route']].append(outcome)
+
+    routes = {}
+    for route, items in sorted(by_route.items()):
+        recorded = [o['recorded_ms'] / 1000 for o in items if o.get('recorded_ms') is not None]
+        routes[route] = {
+            **_distribution([o['latency'] for o in items]),
+            'errors': sum(o['status'] >= 400 for o in items),
+            'recorded_p50_ms': _distribution(recorded)['p50_ms'] if recorded else None,
+            'mean_bytes': int(np.mean([o['bytes'] for o in items])),
+        }
+    return {
+        'requests': len(outcomes),
+        'wall_seconds': round(wall, 3),
+        'overall': _distribution([o['latency'] for o in outcomes]) if outcomes else {},
+        'schedule_lag_p99_ms': round(float(np.percentile([o['lag'] for o in outcomes], 99)) * 1000, 3)
+        if outcomes else 0.0,
+        'routes': routes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=1.0, help='time compression factor (10 = 10x faster)')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--session', type=int, help='replay only this recording session (index, -1 = last)')
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--url', help='replay against this server instead of the in-process simulator')
+    parser.add_argument('--api-key', default=os.environ.get('API_SECRET_KEY', 'replay'))
+    parser.add_argument('--positions', type=int, default=0, help='simulator: open positions to seed')
+    parser.add_argument('--history', type=int, default=500, help='simulator: closed trades to seed')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulator: latency of every MT5 call')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    try:
+        records = load(args.recording, args.limit, args.session)
+    except IndexError:
+        print(f"Recording has no session {args.session}")
+        return 1
+    if not records:
+        print("Recording is empty")
+        return 1
+    if args.url:
+        target = HttpTarget(args.url, args.api_key)
+    else:
+        target = InProcessTarget(args.api_key, args.positions, args.history, args.latency_ms)
+
+    span = records[-1]['t'] - records[0]['t']
+    print(f"Replaying {len(records)} requests spanning {span:.1f}s at {args.speed:g}x")
+    outcomes, wall = replay(records, target, args.speed, args.workers)
+    result = report(outcomes, wall)
+
+    print(f"{'route':<44} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'recorded p50':>13} errors")
+    for route, stats in result['routes'].items():
+        recorded = f"{stats['recorded_p50_ms']:.2f}" if stats['recorded_p50_ms'] is not None else '-'
+        print(f"{route:<44} {stats['count']:>6} {stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f} {recorded:>13} {stats['errors']}")
+    overall = result['overall']
+    print(f"overall: p50 {overall['p50_ms']:.2f} ms, p99 {overall['p99_ms']:.2f} ms, "
+          f"schedule lag p99 {result['schedule_lag_p99_ms']:.2f} ms, wall {result['wall_seconds']:.2f}s")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"Saved report to {args.save}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
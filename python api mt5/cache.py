@@ -0,0 +1,164 @@
+"""
+Response cache for read endpoints.
+
+``@cached(ttl, tags)`` stores successful (200) responses keyed by method, path, query
+string and the caller's identity (API key hash and ``X-MT5-Account``). Entries expire
+after ``ttl`` seconds and are evicted in LRU order once the cache holds more than
+``RESPONSE_CACHE_MAX_MB`` of response bodies. Write routes decorated with
+``@invalidates(tags)`` drop every entry carrying one of those tags after they run, so a
+new order or a closed position is visible on the next read. A view whose answer can
+still change (an open position, a range ending in the future) calls ``no_store()`` to
+serve the response without caching it.
+
+Set ``RESPONSE_CACHE_DISABLED=1`` to bypass the cache entirely.
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app, Response, g
+import metrics
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get('RESPONSE_CACHE_MAX_MB', 32)) * 1024 * 1024)
+DISABLED = os.environ.get('RESPONSE_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+# Rough per-entry bookkeeping cost (key tuple, entry tuple, OrderedDict node)
+ENTRY_OVERHEAD = 400
+
+
+def _identity():
+    key = request.headers.get('X-API-Key') or ''
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16] if key else 'anonymous'
+    return digest, request.headers.get('X-MT5-Account')
+
+
+def no_store():
+    """Do not cache the response of the current request."""
+    g.cache_no_store = True
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, enabled=not DISABLED):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._routes = {}
+
+    def _route_stats(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {"hits": 0, "misses": 0, "stores": 0}
+        return stats
+
+    def get(self, key, route):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._drop(key)
+                entry = None
+            stats = self._route_stats(route)
+            if entry is None:
+                stats["misses"] += 1
+            else:
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+        metrics.record_cache('response', entry is not None)
+        return entry
+
+    def put(self, key, route, ttl, tags, body, status, mimetype):
+        size = len(body) + ENTRY_OVERHEAD
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, frozenset(tags), body, status, mimetype, size)
+            self.bytes += size
+            self._route_stats(route)["stores"] += 1
+            while self.bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry[5]
+
+    def invalidate(self, *tags):
+        """Drop every entry tagged with any of ``tags``; returns the number dropped."""
+        wanted = set(tags)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] & wanted]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = sum(s["hits"] for s in self._routes.values())
+            misses = sum(s["misses"] for s in self._routes.values())
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "routes": {route: dict(stats) for route, stats in self._routes.items()},
+            }
+
+    def cached(self, ttl, tags=()):
+        """Cache the decorated view's 200 responses for ``ttl`` seconds."""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                route = request.url_rule.rule if request.url_rule is not None else request.path
+                key = (request.method, request.path, tuple(sorted(request.args.items(multi=True))), _identity())
+                entry = self.get(key, route)
+                if entry is not None:
+                    _, _, body, status, mimetype, _ = entry
+                    response = Response(body, status=status, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed and not g.pop('cache_no_store', False):
+                    self.put(key, route, ttl, tags, response.get_data(), response.status_code, response.mimetype)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+    def invalidates(self, *tags):
+        """Invalidate ``tags`` after the decorated (write) view has run."""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.invalidate(*tags)
+            return decorated_function
+        return decorator
+
+
+response_cache = ResponseCache()
+cached = response_cache.cached
+invalidates = response_cache.invalidates
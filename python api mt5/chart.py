@@ -0,0 +1,243 @@
+"""
+Server-side candlestick charts.
+
+``render_candles`` draws a PNG from plain OHLC arrays with matplotlib (Agg, no pyplot
+state) and optionally marks open fair value gaps and shades trading sessions. It runs
+in a ``ProcessPoolExecutor`` so rendering neither holds the GIL of the API process nor
+touches the terminal; workers only import this module, numpy and matplotlib.
+
+``ChartRenderer`` keeps an LRU of rendered images keyed by the request and by the time
+and tick volume of the last bar, so a chart is redrawn only when the market moved.
+Identical renders requested concurrently share one job.
+
+    CHART_WORKERS=2             render processes (0 renders in the request thread)
+    CHART_CACHE_SIZE=64         rendered images kept
+    CHART_RENDER_TIMEOUT=30     seconds
+"""
+import os
+import io
+import time
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get('CHART_WORKERS', 2))
+CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 64))
+RENDER_TIMEOUT = float(os.environ.get('CHART_RENDER_TIMEOUT', 30))
+
+OVERLAYS = ('fvg', 'sessions')
+MAX_FVG_ZONES = 10
+
+BULL_COLOR = '#26a69a'
+BEAR_COLOR = '#ef5350'
+SESSION_COLORS = {'asia': '#fff3e0', 'london': '#e3f2fd', 'new_york': '#e8f5e9'}
+
+RENDER_SECONDS = metrics.register(metrics.Histogram(
+    'mt5api_chart_render_seconds', 'Time spent rendering chart images (including the process pool hop).'))
+
+
+def fair_value_gaps(high, low, limit=MAX_FVG_ZONES):
+    """
+    Unfilled three-candle fair value gaps as ``(start_index, bottom, top, bullish)``.
+
+    A bullish gap is ``low[i] > high[i - 2]`` and stays open until a later low trades
+    back to its bottom; bearish gaps mirror that. The most recent ``limit`` are kept.
+    """
+    zones = []
+    for i in np.flatnonzero(low[2:] > high[:-2]) + 2:
+        bottom, top = high[i - 2], low[i]
+        if i + 1 >= len(low) or low[i + 1:].min() > bottom:
+            zones.append((int(i - 2), float(bottom), float(top), True))
+    for i in np.flatnonzero(high[2:] < low[:-2]) + 2:
+        bottom, top = high[i], low[i - 2]
+        if i + 1 >= len(high) or high[i + 1:].max() < top:
+            zones.append((int(i - 2), float(bottom), float(top), False))
+    zones.sort()
+    return zones[-limit:]
+
+
+def session_spans(sessions):
+    """Contiguous ``(name, first_index, last_index)`` runs of bars labelled with the same session."""
+    labels = np.asarray(sessions, dtype=object)
+    if not len(labels):
+        return []
+    edges = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    firsts = np.concatenate(([0], edges))
+    lasts = np.concatenate((edges, [len(labels)])) - 1
+    return [(labels[a], int(a), int(b)) for a, b in zip(firsts, lasts) if labels[a] is not None]
+
+
+def render_candles(title, times, opens, highs, lows, closes, overlays=(), sessions=(), width=1280, height=720):
+    """
+    Render a candlestick chart and return the PNG bytes. ``sessions`` is the session name
+    of each bar (None outside sessions, see ``sessions.calendar.label``).
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    ax = fig.add_subplot(1, 1, 1)
+    n = len(times)
+    x = np.arange(n)
+    up = closes >= opens
+    colors = np.where(up, BULL_COLOR, BEAR_COLOR)
+
+    if 'sessions' in overlays:
+        for name, first, last in session_spans(sessions):
+            ax.axvspan(first - 0.5, last + 0.5, color=SESSION_COLORS.get(name, '#f5f5f5'), zorder=0, lw=0)
+
+    if 'fvg' in overlays:
+        for start, bottom, top, bullish in fair_value_gaps(highs, lows):
+            ax.add_patch(Rectangle((start - 0.5, bottom), n - start, top - bottom, zorder=1, lw=0, alpha=0.25,
+                                   color=BULL_COLOR if bullish else BEAR_COLOR))
+
+    ax.vlines(x, lows, highs, colors=colors, linewidth=0.8, zorder=2)
+    body = np.abs(closes - opens)
+    # Doji: draw a hairline body instead of nothing
+    body = np.where(body > 0, body, (highs.max() - lows.min()) * 0.0005)
+    ax.bar(x, body, bottom=np.minimum(opens, closes), width=0.6, color=colors, zorder=3)
+
+    ax.set_xlim(-1, n)
+    ax.set_title(title, fontsize=10, loc='left')
+    ax.yaxis.tick_right()
+    ax.grid(True, color='#eeeeee', linewidth=0.5, zorder=0)
+    ticks = x[::max(1, n // 8)]
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([time.strftime('%m-%d %H:%M', time.gmtime(int(times[i]))) for i in ticks], fontsize=8)
+    ax.tick_params(axis='y', labelsize=8)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _import_matplotlib():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure  # noqa: F401
+
+
+class ChartRenderer:
+    def __init__(self, workers=WORKERS, cache_size=CACHE_SIZE, timeout=RENDER_TIMEOUT):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.available = importlib.util.find_spec('matplotlib') is not None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.renders = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def render(self, key, rates, title, overlays=(), sessions=(), width=1280, height=720):
+        """
+        PNG for ``rates`` (a MT5 rates array), reusing the cached image when ``key`` and
+        the last bar are unchanged. Returns ``(png, cache_hit)``.
+        """
+        key = key + (int(rates['time'][-1]), int(rates['tick_volume'][-1]))
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+            else:
+                job = self._pending.get(key)
+                owner = job is None
+                if owner:
+                    job = self._pending[key] = _Job()
+        metrics.record_cache('chart', png is not None)
+        if png is not None:
+            return png, True
+        if not owner:
+            return job.wait(self.timeout), False
+
+        started = time.perf_counter()
+        try:
+            args = (title, rates['time'], rates['open'], rates['high'], rates['low'], rates['close'],
+                    tuple(overlays), tuple(sessions), width, height)
+            if self.workers > 0:
+                png = self._executor().submit(render_candles, *args).result(timeout=self.timeout)
+            else:
+                png = render_candles(*args)
+        except BaseException as e:
+            job.fail(e)
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            RENDER_SECONDS.observe(time.perf_counter() - started)
+
+        with self._lock:
+            self._images[key] = png
+            self.renders += 1
+            while len(self._images) > self.cache_size:
+                self._images.popitem(last=False)
+        job.done(png)
+        return png, False
+
+    def warm_up(self):
+        """Start the render processes and import matplotlib in them, without caching anything."""
+        if not self.available or self.workers <= 0:
+            return
+        executor = self._executor()
+        for future in [executor.submit(_import_matplotlib) for _ in range(self.workers)]:
+            future.result(timeout=self.timeout)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "available": self.available,
+                "workers": self.workers,
+                "images": len(self._images),
+                "bytes": sum(len(png) for png in self._images.values()),
+                "hits": self.hits,
+                "renders": self.renders,
+            }
+
+
+class _Job:
+    """A render other requests for the same image wait on."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._png = None
+        self._error = None
+
+    def done(self, png):
+        self._png = png
+        self._event.set()
+
+    def fail(self, error):
+        self._error = error
+        self._event.set()
+
+    def wait(self, timeout):
+        if not self._event.wait(timeout):
+            raise TimeoutError("Chart render timed out")
+        if self._error is not None:
+            raise self._error
+        return self._png
+
+
+renderer = ChartRenderer()
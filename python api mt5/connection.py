@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+from terminal import mt5
+
+logger = logging.getLogger(__name__)
+
+
+class MT5Connection:
+    """
+    Owns the terminal connection for the whole process.
+
+    The terminal is initialized once at startup; a background thread then runs a cheap
+    liveness probe (``terminal_info``) and reconnects with exponential backoff when the
+    probe fails. Handlers call ``ensure_connected()``, which answers from the cached
+    state instead of calling ``mt5.initialize()`` on every request.
+    """
+
+    def __init__(self, probe_interval=5.0, min_backoff=1.0, max_backoff=60.0, init_kwargs=None):
+        self.probe_interval = probe_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.init_kwargs = init_kwargs
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.initialized = False
+        self.connected = False
+        self.last_probe = None
+        self.last_error = None
+        self.connected_since = None
+        self.reconnect_attempts = 0
+        self._next_attempt = 0.0
+        self._backoff = min_backoff
+
+    def start(self):
+        """
+        Initialize the terminal and start the background probe thread (idempotent).
+        Login details come from ``MT5_PATH``, ``MT5_LOGIN``, ``MT5_PASSWORD`` and
+        ``MT5_SERVER`` unless ``init_kwargs`` was given.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if mt5.pool is not None:
+            mt5.pool.start()
+            self.initialized = self.connected = True
+            self.connected_since = time.time()
+            return
+        if self.init_kwargs is None:
+            self.init_kwargs = _init_kwargs_from_env()
+        self._connect()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='mt5-connection', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.probe_interval)
+            self._thread = None
+
+    def ensure_connected(self):
+        """
+        Return True if the terminal is ready. When it is not, make at most one reconnect
+        attempt, respecting the current backoff so a burst of requests cannot hammer
+        ``mt5.initialize()``.
+        """
+        if mt5.pool is not None:
+            if not self.connected:
+                self.start()
+            return mt5.pool.ready()
+        if self.connected:
+            return True
+        if self._thread is None:
+            self.start()
+            return self.connected
+        if time.monotonic() < self._next_attempt:
+            return False
+        return self._connect()
+
+    def status(self):
+        """Cached readiness state; never touches the terminal."""
+        if mt5.pool is not None:
+            ready = mt5.pool.ready()
+            return {"mt5_initialized": ready, "mt5_connected": ready, **mt5.pool.status()}
+        return {
+            "mt5_initialized": self.initialized,
+            "mt5_connected": self.connected,
+            "connected_since": self.connected_since,
+            "last_probe": self.last_probe,
+            "last_error": self.last_error,
+            "reconnect_attempts": self.reconnect_attempts,
+        }
+
+    def _connect(self):
+        with self._lock:
+            if self.connected:
+                return True
+
+            self.initialized = bool(mt5.initialize(**self.init_kwargs))
+            if not self.initialized:
+                self.connected = False
+                self.last_error = mt5.last_error()
+            elif self._probe():
+                logger.info("MT5 connection established.")
+                self.connected_since = time.time()
+                self.reconnect_attempts = 0
+                self._backoff = self.min_backoff
+                self._next_attempt = 0.0
+                return True
+
+            self.reconnect_attempts += 1
+            self._next_attempt = time.monotonic() + self._backoff
+            logger.error("MT5 connection failed (attempt %s): %s. Retrying in %.1fs.",
+                         self.reconnect_attempts, self.last_error, self._backoff)
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            return False
+
+    def _probe(self):
+        info = mt5.terminal_info()
+        self.last_probe = time.time()
+        self.connected = info is not None and bool(info.connected)
+        self.last_error = None if self.connected else mt5.last_error()
+        return self.connected
+
+    def _run(self):
+        while not self._stop.wait(self.probe_interval):
+            try:
+                if self.connected and self._probe():
+                    continue
+                if self.connected_since is not None and not self.connected:
+                    logger.warning("MT5 liveness probe failed: %s", self.last_error)
+                    self.connected_since = None
+                if time.monotonic() >= self._next_attempt:
+                    self._connect()
+            except Exception:
+                logger.exception("Unexpected error in MT5 connection monitor")
+
+
+def _init_kwargs_from_env():
+    kwargs = {}
+    if os.environ.get('MT5_PATH'):
+        kwargs['path'] = os.environ['MT5_PATH']
+    if os.environ.get('MT5_LOGIN'):
+        kwargs['login'] = int(os.environ['MT5_LOGIN'])
+    if os.environ.get('MT5_PASSWORD'):
+        kwargs['password'] = os.environ['MT5_PASSWORD']
+    if os.environ.get('MT5_SERVER'):
+        kwargs['server'] = os.environ['MT5_SERVER']
+    return kwargs
+
+
+connection = MT5Connection(
+    probe_interval=float(os.environ.get('MT5_PROBE_INTERVAL', 5)),
+    max_backoff=float(os.environ.get('MT5_MAX_BACKOFF', 60)),
+)
@@ -1,5 +1,5 @@
 from enum import Enum
-import MetaTrader5 as mt5
+from terminal import mt5
 
 class MT5Timeframe(Enum):
     M1 = mt5.TIMEFRAME_M1       # 1-minute
@@ -12,6 +12,12 @@ class MT5Timeframe(Enum):
     W1 = mt5.TIMEFRAME_W1       # weekly
     MN1 = mt5.TIMEFRAME_MN1     # monthly
 
+# Bar length in seconds (MN1 approximated as 30 days)
+TIMEFRAME_SECONDS = {
+    'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800,
+    'H1': 3600, 'H4': 14400, 'D1': 86400, 'W1': 604800, 'MN1': 2592000,
+}
+
 TRADE_RETCODE_DESCRIPTION = {
     mt5.TRADE_RETCODE_REQUOTE: "Requote",
     mt5.TRADE_RETCODE_REJECT: "Request rejected",
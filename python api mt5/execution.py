@@ -0,0 +1,122 @@
+"""
+Market execution with an in-server requote retry.
+
+A market order or close answered with REQUOTE, PRICE_CHANGED or PRICE_OFF is re-priced
+from a fresh tick and sent again, instead of failing back to the bot and being retried
+over HTTP. The loop is bounded by:
+
+* ``max_retries`` extra attempts (``ORDER_RETRY_MAX``, default 3; 0 disables retries)
+* ``deadline_ms`` from the first attempt (``ORDER_RETRY_DEADLINE_MS``, default 1500)
+* ``max_slippage`` points of adverse movement from the reference price: the price the
+  caller asked for, or the price of the first attempt
+
+Every attempt is reported with its price, retcode and timing.
+"""
+import os
+import time
+import logging
+from terminal import mt5
+from constants import TRADE_RETCODE_DESCRIPTION
+from market_cache import symbol_specs
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = int(os.environ.get('ORDER_RETRY_MAX', 3))
+DEADLINE_MS = float(os.environ.get('ORDER_RETRY_DEADLINE_MS', 1500))
+RETRY_DELAY_MS = float(os.environ.get('ORDER_RETRY_DELAY_MS', 20))
+
+RETRY_RETCODES = frozenset((mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED,
+                            mt5.TRADE_RETCODE_PRICE_OFF))
+
+RETRIES = metrics.register(metrics.Counter(
+    'mt5api_order_retries_total', 'order_send attempts repeated after a requote, by outcome.', ('outcome',)))
+
+
+def market_price(tick, order_type):
+    """The price a market order of ``order_type`` fills at: ask for buys, bid for sells."""
+    return tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+
+
+def _options(value, default, cast):
+    return default if value is None else cast(value)
+
+
+def options_from(data):
+    """``max_slippage`` / ``deadline_ms`` / ``max_retries`` from a request body; raises ValueError."""
+    options = {}
+    for key, cast in (('max_slippage', float), ('deadline_ms', float), ('max_retries', int)):
+        if data.get(key) is not None:
+            try:
+                options[key] = cast(data[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"'{key}' must be a number")
+            if options[key] < 0:
+                raise ValueError(f"'{key}' must not be negative")
+    return options
+
+
+def send_market(request, max_slippage=None, deadline_ms=None, max_retries=None):
+    """
+    Send a TRADE_ACTION_DEAL ``request``, re-pricing and retrying on requotes.
+    Returns ``(result, attempts)``; ``result`` is the last ``order_send`` result (or
+    ``None``), ``attempts`` a list of dicts describing each try. ``sent`` is false on an
+    attempt that never reached the terminal (no price, or past ``max_slippage``); a sent
+    attempt whose ``order_send`` returned ``None`` carries the terminal's ``last_error``.
+    """
+    max_retries = _options(max_retries, MAX_RETRIES, int)
+    deadline = time.monotonic() + _options(deadline_ms, DEADLINE_MS, float) / 1000
+    max_slippage = _options(max_slippage, None, float)
+    request = dict(request)
+    symbol, order_type = request['symbol'], request['type']
+    is_buy = order_type == mt5.ORDER_TYPE_BUY
+    reference = request.get('price') or None
+    spec = symbol_specs.get(symbol)
+    point = spec.point if spec is not None else None
+
+    attempts = []
+    started = time.monotonic()
+
+    def attempt(price, retcode, comment, sent=True, **extra):
+        attempts.append({"attempt": len(attempts) + 1, "sent": sent, "price": price, "retcode": retcode,
+                         "comment": comment, "elapsed_ms": round((time.monotonic() - started) * 1000, 1), **extra})
+
+    result = None
+    while True:
+        tick = mt5.symbol_info_tick(symbol)
+        price = market_price(tick, order_type) if tick is not None else 0.0
+        if not price:
+            attempt(None, None, f"No price for {symbol}", sent=False)
+            break
+        if reference is None:
+            reference = price
+        if max_slippage is not None and point:
+            slippage = ((price - reference) if is_buy else (reference - price)) / point
+            if slippage > max_slippage + 1e-9:
+                attempt(price, None, f"Slippage {slippage:.1f} points exceeds {max_slippage:g}", sent=False)
+                RETRIES.inc('slippage')
+                break
+
+        request['price'] = price
+        result = mt5.order_send(request)
+        if result is not None:
+            retcode = result.retcode
+            attempt(price, retcode, result.comment)
+        else:
+            retcode = None
+            attempt(price, None, "order_send returned None", last_error=mt5.last_error())
+        if retcode not in RETRY_RETCODES:
+            if len(attempts) > 1:
+                RETRIES.inc('filled' if retcode == mt5.TRADE_RETCODE_DONE else 'failed')
+            break
+        if len(attempts) > max_retries:
+            RETRIES.inc('exhausted')
+            break
+        if time.monotonic() + RETRY_DELAY_MS / 1000 >= deadline:
+            RETRIES.inc('deadline')
+            break
+        logger.info("%s for %s at %s, retrying (attempt %d)", TRADE_RETCODE_DESCRIPTION.get(retcode, retcode),
+                    symbol, price, len(attempts) + 1)
+        time.sleep(RETRY_DELAY_MS / 1000)
+
+    return result, attempts
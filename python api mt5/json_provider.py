@@ -0,0 +1,69 @@
+"""
+Fast JSON provider for the Flask app (``app.json``), built on orjson.
+
+numpy arrays and scalars are serialized natively; pandas ``Timestamp``/``NaT``, MT5
+namedtuples (as objects, like ``._asdict()``), ``Decimal`` and sets go through
+``_default``. Output stays compatible with Flask's default provider: keys are sorted and
+dates are rendered as HTTP dates. NaN and infinity become ``null`` instead of invalid JSON.
+
+Without orjson installed the stdlib encoder is used with the same ``_default`` hook.
+"""
+import json
+import decimal
+from datetime import date
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if hasattr(o, '_asdict'):
+        return o._asdict()
+    if type(o).__name__ == 'NaTType':
+        # pd.NaT subclasses datetime, so it must be handled before the date branch
+        return None
+    if isinstance(o, date):
+        return http_date(o)
+    if hasattr(o, 'dtype') and hasattr(o, 'tolist'):
+        # numpy scalars / arrays (stdlib path, or dtypes orjson does not support)
+        return o.tolist()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def _options(self):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _default)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options())
+        return current_app.response_class(body + b'\n', mimetype=self.mimetype)
@@ -1,10 +1,15 @@
-import MetaTrader5 as mt5
-from datetime import datetime, timedelta
+from terminal import mt5
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict
-import pandas as pd
+from startup import lazy_import
 from constants import MT5Timeframe
+from connection import connection
+from execution import send_market
+from sessions import calendar, server_to_utc
 import logging
 
+pd = lazy_import('pandas')
+
 logger = logging.getLogger(__name__)
 
 def get_timeframe(timeframe_str: str) -> MT5Timeframe:
@@ -17,34 +22,26 @@ def get_timeframe(timeframe_str: str) -> MT5Timeframe:
         )
 
 
-def close_position(position, deviation=20, magic=0, comment='', type_filling=mt5.ORDER_FILLING_IOC):
+def close_position(position, deviation=20, magic=0, comment='', type_filling=mt5.ORDER_FILLING_IOC,
+                   attempts=None, **retry):
+    """
+    Close ``position`` at market, retrying requotes (see ``execution.send_market``;
+    ``retry`` takes its ``max_slippage`` / ``deadline_ms`` / ``max_retries``). The
+    attempts are appended to ``attempts`` when a list is given.
+    """
     if 'type' not in position or 'ticket' not in position:
         logger.error("Position dictionary missing 'type' or 'ticket' keys.")
         return None
 
+    # A position is closed by a deal in the opposite direction
     order_type_dict = {
-        0: mt5.ORDER_TYPE_BUY,
-        1: mt5.ORDER_TYPE_SELL
+        0: mt5.ORDER_TYPE_SELL,
+        1: mt5.ORDER_TYPE_BUY
     }
 
     position_type = position['type']
     if position_type not in order_type_dict:
-        logger.error(f"Unknown position type: {position_type}")
-        return None
-
-    tick = mt5.symbol_info_tick(position['symbol'])
-    if tick is None:
-        logger.error(f"Failed to get tick for symbol: {position['symbol']}")
-        return None
-
-    price_dict = {
-        0: tick.ask,  # Buy order uses Ask price
-        1: tick.bid   # Sell order uses Bid price
-    }
-
-    price = price_dict[position_type]
-    if price == 0.0:
-        logger.error(f"Invalid price retrieved for symbol: {position['symbol']}")
+        logger.error("Unknown position type: %s", position_type)
         return None
 
     request = {
@@ -53,7 +50,6 @@ def close_position(position, deviation=20, magic=0, comment='', type_filling=mt5
         "symbol": position['symbol'],
         "volume": position['volume'],  # FLOAT
         "type": order_type_dict[position_type],
-        "price": price,
         "deviation": deviation,  # INTEGER
         "magic": magic,          # INTEGER
         "comment": comment,
@@ -61,13 +57,20 @@ def close_position(position, deviation=20, magic=0, comment='', type_filling=mt5
         "type_filling": type_filling,
     }
 
-    order_result = mt5.order_send(request)
+    order_result, tries = send_market(request, **retry)
+    if attempts is not None:
+        attempts.extend(tries)
+
+    if order_result is None:
+        logger.error("Failed to close position %s: %s %s", position['ticket'], tries[-1]['comment'],
+                     tries[-1].get('last_error', ''))
+        return None
 
     if order_result.retcode != mt5.TRADE_RETCODE_DONE:
-        logger.error(f"Failed to close position {position['ticket']}: {order_result.comment}")
+        logger.error("Failed to close position %s: %s", position['ticket'], order_result.comment)
         return None
 
-    logger.info(f"Position {position['ticket']} closed successfully.")
+    logger.info("Position %s closed successfully.", position['ticket'])
     return order_result
 
 
@@ -93,7 +96,7 @@ def close_all_positions(order_type='all', magic=None, type_filling=mt5.ORDER_FIL
         # Filtering by order_type if not 'all'
         if order_type != 'all':
             if order_type not in order_type_dict:
-                logger.error(f"Invalid order_type: {order_type}. Must be 'BUY', 'SELL', or 'all'.")
+                logger.error("Invalid order_type: %s. Must be 'BUY', 'SELL', or 'all'.", order_type)
                 return []
             positions_df = positions_df[positions_df['type'] == order_type_dict[order_type]]
 
@@ -107,7 +110,7 @@ def close_all_positions(order_type='all', magic=None, type_filling=mt5.ORDER_FIL
             if order_result:
                 results.append(order_result)
             else:
-                logger.error(f"Failed to close position {position['ticket']}.")
+                logger.error("Failed to close position %s.", position['ticket'])
         
         return results
     else:
@@ -115,9 +118,9 @@ def close_all_positions(order_type='all', magic=None, type_filling=mt5.ORDER_FIL
         return []
 
 def get_positions(magic=None):
-    # First check if MT5 is initialized
-    if not mt5.initialize():
-        logger.error("Failed to initialize MT5.")
+    # First check if MT5 is connected
+    if not connection.ensure_connected():
+        logger.error("MT5 terminal is not connected.")
         return pd.DataFrame()
 
     total_positions = mt5.positions_total()
@@ -151,7 +154,7 @@ def get_deal_from_ticket(ticket, from_date=None, to_date=None):
 
     # Define default date range if not provided
     if from_date is None or to_date is None:
-        to_date = datetime.now(mt5.TIMEZONE)
+        to_date = datetime.now(timezone.utc)
         from_date = to_date - timedelta(minutes=15)  # Adjust based on polling interval
 
     # Convert datetime to MT5 time (integer)
@@ -161,7 +164,7 @@ def get_deal_from_ticket(ticket, from_date=None, to_date=None):
     # Retrieve deals using the specified date range and position
     deals = mt5.history_deals_get(from_timestamp, to_timestamp, position=ticket)
     if not deals:
-        logger.error(f"No deal history found for position ticket {ticket} between {from_date} and {to_date}.")
+        logger.error("No deal history found for position ticket %s between %s and %s.", ticket, from_date, to_date)
         return None
 
     # Convert deals to a DataFrame for easier processing
@@ -169,7 +172,7 @@ def get_deal_from_ticket(ticket, from_date=None, to_date=None):
 
     # Optional: Verify that all deals belong to the same symbol
     if not deals_df.empty and not all(deal == deals_df['symbol'].iloc[0] for deal in deals_df['symbol']):
-        logger.error(f"Inconsistent symbols found in deals for position ticket {ticket}.")
+        logger.error("Inconsistent symbols found in deals for position ticket %s.", ticket)
         return None
 
     # Extract relevant information
@@ -177,10 +180,10 @@ def get_deal_from_ticket(ticket, from_date=None, to_date=None):
         deal_details = {
             'ticket': ticket,
             'symbol': deals_df['symbol'].iloc[0],
-            'type': 'BUY' if deals_df['type'].iloc[0] == 'DEAL_TYPE_BUY' else 'SELL',
+            'type': 'BUY' if deals_df['type'].iloc[0] == mt5.DEAL_TYPE_BUY else 'SELL',
             'volume': deals_df['volume'].sum(),
-            'open_time': datetime.fromtimestamp(deals_df['time'].min(), tz=mt5.TIMEZONE),
-            'close_time': datetime.fromtimestamp(deals_df['time'].max(), tz=mt5.TIMEZONE),
+            'open_time': datetime.fromtimestamp(deals_df['time'].min(), tz=timezone.utc),
+            'close_time': datetime.fromtimestamp(deals_df['time'].max(), tz=timezone.utc),
             'open_price': deals_df['price'].iloc[0],
             'close_price': deals_df['price'].iloc[-1],
             'profit': deals_df['profit'].sum(),
@@ -201,10 +204,165 @@ def get_order_from_ticket(ticket):
     # Get the order history
     order = mt5.history_orders_get(ticket=ticket)
     if order is None or len(order) == 0:
-        logger.error(f"No order history found for ticket {ticket}")
+        logger.error("No order history found for ticket %s", ticket)
         return None
 
     # Convert order to a dictionary
     order_dict = order[0]._asdict()
 
     return order_dict
+
+
+DEAL_COLUMNS = ['ticket', 'order', 'time', 'type', 'entry', 'magic', 'position_id', 'volume',
+                'price', 'commission', 'swap', 'profit', 'fee', 'symbol']
+
+
+def _summarize_trades(trades):
+    net = trades['net_profit']
+    wins = net > 0
+    gross_profit = float(net[wins].sum())
+    gross_loss = float(-net[net < 0].sum())
+    average_r = trades['r_multiple'].mean()
+
+    equity = net.cumsum()
+    drawdown = equity.cummax().clip(lower=0) - equity
+
+    return {
+        'trades': int(len(trades)),
+        'wins': int(wins.sum()),
+        'losses': int((net < 0).sum()),
+        'win_rate': float(wins.mean()) if len(trades) else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'net_profit': float(net.sum()),
+        'profit_factor': gross_profit / gross_loss if gross_loss > 0 else None,
+        'expectancy': float(net.mean()) if len(trades) else 0.0,
+        'average_win': float(net[wins].mean()) if wins.any() else 0.0,
+        'average_loss': float(net[net < 0].mean()) if (net < 0).any() else 0.0,
+        'average_r': None if pd.isna(average_r) else float(average_r),
+        'max_drawdown': float(drawdown.max()) if len(trades) else 0.0,
+    }
+
+
+def _breakdown(trades, column):
+    net = trades['net_profit']
+    grouped = trades.assign(
+        win=net > 0,
+        gross_profit=net.clip(lower=0),
+        gross_loss=-net.clip(upper=0),
+    ).groupby(column)
+
+    stats = pd.DataFrame({
+        'trades': grouped.size(),
+        'wins': grouped['win'].sum(),
+        'net_profit': grouped['net_profit'].sum(),
+        'gross_profit': grouped['gross_profit'].sum(),
+        'gross_loss': grouped['gross_loss'].sum(),
+        'average_r': grouped['r_multiple'].mean(),
+    })
+    stats['win_rate'] = stats['wins'] / stats['trades']
+    stats['expectancy'] = stats['net_profit'] / stats['trades']
+
+    stats = stats.astype(object).where(stats.notna(), None)
+    return {str(key): {k: (v.item() if hasattr(v, 'item') else v) for k, v in row.items()}
+            for key, row in stats.to_dict(orient='index').items()}
+
+
+def get_performance_stats(from_date, to_date, symbol=None, magic=None):
+    """
+    Pair entry and exit deals by position id and compute aggregate trade statistics
+    (win rate, expectancy, R-multiples, equity curve and drawdown) in one pass.
+    A trade counts when its position is closed within the range; positions opened
+    before ``from_date`` get their earlier deals fetched by position id. Positions
+    reversed by a DEAL_ENTRY_INOUT deal (netting accounts) cannot be paired and are
+    excluded, counted in ``summary['excluded_reversals']``.
+    Returns None if the deal history could not be retrieved.
+    """
+    deals = mt5.history_deals_get(from_date, to_date)
+    if deals is None:
+        logger.error("Failed to retrieve deal history between %s and %s.", from_date, to_date)
+        return None
+    deals = list(deals)
+
+    # Closed in range but opened earlier: the opening deals are outside the window
+    opened = {deal.position_id for deal in deals if deal.entry == mt5.DEAL_ENTRY_IN}
+    earlier = {deal.position_id for deal in deals
+               if deal.entry in (mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY) and deal.position_id not in opened}
+    seen = {deal.ticket for deal in deals}
+    until = to_date.timestamp() if isinstance(to_date, datetime) else to_date
+    for position_id in earlier:
+        for deal in mt5.history_deals_get(position=position_id) or ():
+            if deal.ticket not in seen and deal.time <= until:
+                deals.append(deal)
+
+    deals_df = pd.DataFrame([deal._asdict() for deal in deals], columns=DEAL_COLUMNS)
+
+    # Only buy/sell deals belong to trades (skip balance, credit, etc.)
+    deals_df = deals_df[deals_df['type'].isin([mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL])]
+    if symbol is not None:
+        deals_df = deals_df[deals_df['symbol'] == symbol]
+    if magic is not None:
+        deals_df = deals_df[deals_df['magic'] == magic]
+
+    deals_df = deals_df.assign(
+        net=deals_df['profit'] + deals_df['commission'] + deals_df['swap'] + deals_df['fee'],
+        notional=deals_df['price'] * deals_df['volume'],
+    )
+    reversed_ids = deals_df.loc[deals_df['entry'] == mt5.DEAL_ENTRY_INOUT, 'position_id'].unique()
+    deals_df = deals_df[~deals_df['position_id'].isin(reversed_ids)]
+    is_entry = deals_df['entry'] == mt5.DEAL_ENTRY_IN
+
+    entries = deals_df[is_entry].groupby('position_id').agg(
+        symbol=('symbol', 'first'),
+        magic=('magic', 'first'),
+        type=('type', 'first'),
+        order=('order', 'first'),
+        open_time=('time', 'min'),
+        volume=('volume', 'sum'),
+        entry_notional=('notional', 'sum'),
+    )
+    exits = deals_df[~is_entry].groupby('position_id').agg(
+        close_time=('time', 'max'),
+        exit_volume=('volume', 'sum'),
+        exit_notional=('notional', 'sum'),
+    )
+    costs = deals_df.groupby('position_id')['net'].sum().rename('net_profit')
+
+    # Only fully paired (closed) positions count as trades
+    trades = entries.join(exits, how='inner').join(costs)
+    trades = trades[trades['exit_volume'] >= trades['volume'] - 1e-9].sort_values('close_time')
+    trades['open_price'] = trades['entry_notional'] / trades['volume']
+    trades['close_price'] = trades['exit_notional'] / trades['exit_volume']
+
+    # Initial risk comes from the stop loss of the opening order
+    orders = list(mt5.history_orders_get(from_date, to_date) or ())
+    known = {order.ticket for order in orders}
+    for ticket in trades['order']:
+        if ticket not in known:
+            orders.extend(mt5.history_orders_get(ticket=int(ticket)) or ())
+    order_sl = pd.Series({order.ticket: order.sl for order in orders}, dtype=float)
+    trades['sl'] = trades['order'].map(order_sl).fillna(0.0)
+
+    direction = trades['type'].map({mt5.DEAL_TYPE_BUY: 1.0, mt5.DEAL_TYPE_SELL: -1.0})
+    risk = (trades['open_price'] - trades['sl']).abs().where(trades['sl'] > 0)
+    trades['r_multiple'] = (trades['close_price'] - trades['open_price']) * direction / risk
+
+    # Daylight saving aware sessions, the same calendar as /sessions and the chart overlay
+    trades['session'] = pd.Series(calendar.label(server_to_utc(trades['open_time'])), index=trades.index).fillna('off_session')
+
+    equity = trades['net_profit'].cumsum()
+    equity_curve = pd.DataFrame({
+        'time': pd.to_datetime(trades['close_time'], unit='s', utc=True).dt.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'position_id': trades.index,
+        'profit': trades['net_profit'],
+        'equity': equity,
+        'drawdown': equity.cummax().clip(lower=0) - equity,
+    })
+
+    return {
+        'summary': {**_summarize_trades(trades), 'excluded_reversals': int(len(reversed_ids))},
+        'equity_curve': equity_curve.to_dict(orient='records'),
+        'by_symbol': _breakdown(trades, 'symbol'),
+        'by_session': _breakdown(trades, 'session'),
+        'by_magic': _breakdown(trades, 'magic'),
+    }
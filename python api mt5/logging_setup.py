@@ -0,0 +1,161 @@
+"""
+Non-blocking structured logging.
+
+Request threads only put log records on a bounded in-memory queue; a background
+``QueueListener`` formats them (JSON via ``python-json-logger`` by default) and writes
+them out. Messages logged with %-style arguments are formatted on the writer thread, and
+not at all when a record is filtered or sampled out. When the queue is full, records are
+dropped (and counted) rather than blocking a request.
+
+Every record carries the ``request_id`` of the request that produced it, taken from the
+``X-Request-ID`` header or generated, and echoed back on the response.
+
+    LOG_LEVEL=INFO              root level
+    LOG_FORMAT=json             json | text
+    LOG_FILE=/var/log/mt5.log   default: stdout
+    LOG_QUEUE_SIZE=10000
+    LOG_SAMPLE_INFO=0.1         keep 10% of INFO/DEBUG records (WARNING and above always kept)
+    LOG_ACCESS=1                one INFO access record per request (subject to sampling)
+"""
+import os
+import sys
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from flask import request, g
+import metrics
+
+_request_id = ContextVar('request_id', default=None)
+
+DROPPED = metrics.register(metrics.Counter(
+    'mt5api_log_records_dropped_total', 'Log records dropped because the log queue was full.'))
+
+_listener = None
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the current request id. Installed on the queue handler, so it runs
+    on the thread that logs, where the ContextVar holds that request's id.
+    """
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a ``rate`` fraction of records below WARNING; stamp the rate on kept records."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        if random.random() >= self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves message formatting to the listener."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+    def prepare(self, record):
+        # Render tracebacks now (the frames will be gone later); keep msg % args lazy
+        record = logging.makeLogRecord(record.__dict__)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if record.stack_info:
+            record.stack_info = str(record.stack_info)
+        return record
+
+
+def _formatter(fmt):
+    if fmt == 'json':
+        try:
+            from pythonjsonlogger import jsonlogger
+        except ImportError:
+            logging.getLogger(__name__).warning("python-json-logger is not installed, using text logs.")
+        else:
+            return jsonlogger.JsonFormatter(
+                '%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s',
+                rename_fields={'asctime': 'time', 'levelname': 'level', 'name': 'logger'})
+    return logging.Formatter('%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s')
+
+
+def configure_logging():
+    """Route the root logger through the queue (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_file = os.environ.get('LOG_FILE')
+    output = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler(sys.stdout)
+    output.setFormatter(_formatter(os.environ.get('LOG_FORMAT', 'json').lower()))
+
+    records = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    handler = NonBlockingQueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(float(os.environ.get('LOG_SAMPLE_INFO', 1.0))))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def init_app(app):
+    """Assign a correlation id to each request and emit a sampled access record."""
+    access_log = os.environ.get('LOG_ACCESS', '1').lower() in ('1', 'true', 'yes')
+    access_logger = logging.getLogger('mt5api.access')
+
+    @app.before_request
+    def _assign_request_id():
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+        g.request_id_token = _request_id.set(request_id)
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = _request_id.get()
+        if request_id is not None:
+            response.headers['X-Request-ID'] = request_id
+            if access_log and access_logger.isEnabledFor(logging.INFO):
+                access_logger.info("%s %s %s", request.method, request.path, response.status_code, extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round((time.perf_counter() - g.log_started) * 1000, 3),
+                })
+        return response
+
+    @app.teardown_request
+    def _clear_request_id(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            _request_id.reset(token)
@@ -0,0 +1,231 @@
+"""
+In-memory market data caches.
+
+``BarCache`` keeps the most recent bars per (account, symbol, timeframe). After the
+first full fetch, a request only asks the terminal for the last few bars (the forming
+bar and anything that closed since) and merges them into the cached series by open
+time, so a ``/ohlcv`` call for 500 bars costs a 3-bar terminal call. Requests arriving
+within ``BAR_CACHE_REFRESH_MS`` of the last refresh are served from memory.
+
+    BAR_CACHE_MAX_BARS=10000    bars kept per series
+    BAR_CACHE_REFRESH_MS=500    serve without touching the terminal inside this window
+    BAR_CACHE_DISABLED=1        always fetch the full series
+
+``SymbolSpecCache`` and ``TickCache`` do the same for ``symbol_info`` and
+``symbol_info_tick``.
+"""
+import os
+import time
+import threading
+import numpy as np
+import metrics
+from terminal import mt5, current_account
+from tick_stream import tick_stream
+
+MAX_BARS = int(os.environ.get('BAR_CACHE_MAX_BARS', 10000))
+REFRESH_SECONDS = float(os.environ.get('BAR_CACHE_REFRESH_MS', 500)) / 1000
+DISABLED = os.environ.get('BAR_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+# Bars re-read on every refresh: the forming bar plus a margin for bars that closed
+TAIL_BARS = 3
+
+
+class _Series:
+    __slots__ = ('rates', 'refreshed', 'complete')
+
+    def __init__(self, rates, refreshed, complete):
+        self.rates = rates
+        self.refreshed = refreshed
+        # True when the terminal returned fewer bars than asked: there is no older history
+        self.complete = complete
+
+
+class BarCache:
+    def __init__(self, max_bars=MAX_BARS, refresh_seconds=REFRESH_SECONDS, enabled=not DISABLED):
+        self.max_bars = max_bars
+        self.refresh_seconds = refresh_seconds
+        self.enabled = enabled
+        self._series = {}
+        self._lock = threading.Lock()
+        self.full_fetches = 0
+        self.tail_fetches = 0
+        self.memory_hits = 0
+
+    def rates(self, symbol, timeframe, count):
+        """
+        The last ``count`` bars of ``symbol`` as a MT5 rates array (oldest first), or
+        ``None`` when the terminal has no data. The array is shared: do not modify it.
+        """
+        if not self.enabled or count <= 0:
+            return mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+
+        key = (current_account(), symbol, timeframe)
+        with self._lock:
+            series = self._series.get(key)
+        now = time.monotonic()
+
+        covered = series is not None and (len(series.rates) >= count or series.complete)
+        if covered and now - series.refreshed < self.refresh_seconds:
+            self.memory_hits += 1
+            metrics.record_cache('bars', True)
+            return series.rates[-count:]
+
+        if covered:
+            tail = mt5.copy_rates_from_pos(symbol, timeframe, 0, TAIL_BARS)
+            merged = self._merge(series.rates, tail)
+            if merged is not None:
+                self.tail_fetches += 1
+                metrics.record_cache('bars', True)
+                self._store(key, merged, now, series.complete)
+                return merged[-count:]
+
+        # Cold series, more history wanted, or a gap the tail does not cover
+        metrics.record_cache('bars', False)
+        self.full_fetches += 1
+        requested = max(count, TAIL_BARS)
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, requested)
+        if rates is None or len(rates) == 0:
+            return rates
+        self._store(key, rates, now, len(rates) < requested)
+        return rates[-count:]
+
+    def _merge(self, cached, tail):
+        """Append ``tail`` to ``cached``; ``None`` if they do not overlap."""
+        if tail is None or len(tail) == 0 or len(cached) == 0:
+            return None
+        start = np.searchsorted(cached['time'], tail['time'][0])
+        if start >= len(cached) or cached['time'][start] != tail['time'][0]:
+            # Either bars are missing between the two, or the series was rewritten
+            return None
+        return np.concatenate((cached[:start], tail))
+
+    def _store(self, key, rates, refreshed, complete):
+        if len(rates) > self.max_bars:
+            rates = rates[-self.max_bars:]
+            complete = False
+        with self._lock:
+            self._series[key] = _Series(rates, refreshed, complete)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def stats(self):
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            "enabled": self.enabled,
+            "series": len(series),
+            "bars": sum(len(s.rates) for s in series),
+            "bytes": sum(s.rates.nbytes for s in series),
+            "full_fetches": self.full_fetches,
+            "tail_fetches": self.tail_fetches,
+            "memory_hits": self.memory_hits,
+        }
+
+
+
+class SymbolSpecCache:
+    """
+    ``symbol_info`` per (account, symbol), refreshed after ``SYMBOL_SPEC_TTL`` seconds.
+    Contract specs (digits, point, volume limits, filling modes) rarely change; the
+    bid / ask fields of a cached entry are as old as the entry.
+    """
+
+    def __init__(self, ttl=float(os.environ.get('SYMBOL_SPEC_TTL', 3600))):
+        self.ttl = ttl
+        self._specs = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        key = (current_account(), symbol)
+        with self._lock:
+            entry = self._specs.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            metrics.record_cache('symbol_spec', True)
+            return entry[1]
+        metrics.record_cache('symbol_spec', False)
+        return self.refresh(symbol)
+
+    def refresh(self, symbol):
+        info = mt5.symbol_info(symbol)
+        if info is not None:
+            with self._lock:
+                self._specs[(current_account(), symbol)] = (time.monotonic(), info)
+        return info
+
+    def clear(self):
+        with self._lock:
+            self._specs.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._specs), "ttl": self.ttl}
+
+
+class TickCache:
+    """
+    Latest tick per (account, symbol). Symbols being watched are kept current by
+    ``tick_stream`` (default terminal) and always served from memory; others are
+    re-read after ``TICK_CACHE_MS``.
+    """
+
+    def __init__(self, ttl=float(os.environ.get('TICK_CACHE_MS', 250)) / 1000):
+        self.ttl = ttl
+        self._ticks = {}
+        self._watched = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        account = current_account()
+        with self._lock:
+            entry = self._ticks.get((account, symbol))
+            watched = account is None and symbol in self._watched
+        if entry is not None and (watched or time.monotonic() - entry[0] < self.ttl):
+            metrics.record_cache('tick', True)
+            return entry[1]
+        metrics.record_cache('tick', False)
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is not None:
+            self._store(symbol, tick, account)
+        return tick
+
+    def _store(self, symbol, tick, account=None):
+        with self._lock:
+            self._ticks[(account, symbol)] = (time.monotonic(), tick)
+
+    def watch(self, symbols, seconds):
+        """Keep ``symbols`` streaming into the cache for the next ``seconds``."""
+        with self._lock:
+            symbols = [s for s in symbols if s not in self._watched]
+        if not symbols:
+            return
+        for symbol in symbols:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is not None:
+                self._store(symbol, tick)
+        token = tick_stream.subscribe(symbols, self._store)
+        with self._lock:
+            for symbol in symbols:
+                self._watched[symbol] = token
+        timer = threading.Timer(seconds, self._unwatch, (token,))
+        timer.daemon = True
+        timer.start()
+
+    def _unwatch(self, token):
+        tick_stream.unsubscribe(token)
+        with self._lock:
+            self._watched = {s: t for s, t in self._watched.items() if t != token}
+
+    def clear(self):
+        with self._lock:
+            self._ticks.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._ticks), "watched": sorted(self._watched), "ttl": self.ttl}
+
+
+bar_cache = BarCache()
+symbol_specs = SymbolSpecCache()
+tick_cache = TickCache()
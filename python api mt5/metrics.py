@@ -0,0 +1,195 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format (``GET /metrics``).
+
+Request latency, response bytes and in-flight requests are recorded by hooks that
+``init_app`` installs on the Flask app; terminal call latency is recorded by the MT5
+executor / terminal pool; caches report hits and misses through ``record_cache``.
+"""
+import time
+import bisect
+import threading
+from flask import request, g
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TERMINAL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are produced by ``callback() -> {labels: value}`` at render time."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, callback):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUEST_LATENCY = register(Histogram(
+    'mt5api_request_duration_seconds', 'HTTP request latency by route.',
+    ('blueprint', 'route', 'method', 'status')))
+REQUESTS_IN_FLIGHT = register(Gauge(
+    'mt5api_requests_in_flight', 'HTTP requests currently being served.', ('route',)))
+RESPONSE_BYTES = register(Counter(
+    'mt5api_response_bytes_total', 'Response body bytes sent by route.', ('route',)))
+TERMINAL_LATENCY = register(Histogram(
+    'mt5api_terminal_call_duration_seconds', 'Time spent inside MetaTrader5 calls by function.',
+    ('function',), TERMINAL_BUCKETS))
+TERMINAL_QUEUE_WAIT = register(Histogram(
+    'mt5api_terminal_queue_wait_seconds', 'Time terminal calls waited in the executor queue.',
+    ('priority',), TERMINAL_BUCKETS))
+TERMINAL_IN_FLIGHT = register(Gauge(
+    'mt5api_terminal_calls_in_flight', 'MetaTrader5 calls currently executing.', ('function',)))
+CACHE_REQUESTS = register(Counter(
+    'mt5api_cache_requests_total', 'Cache lookups by cache and result (hit/miss).', ('cache', 'result')))
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def cache_hit_ratios():
+    """Hit ratio per cache, derived from the lookup counters."""
+    caches = {labels[0] for labels in CACHE_REQUESTS._values}
+    ratios = {}
+    for cache in caches:
+        hits, misses = CACHE_REQUESTS.value(cache, 'hit'), CACHE_REQUESTS.value(cache, 'miss')
+        if hits + misses:
+            ratios[(cache,)] = round(hits / (hits + misses), 6)
+    return ratios
+
+
+register(CallbackGauge('mt5api_cache_hit_ratio', 'Cache hit ratio since start.', ('cache',), cache_hit_ratios))
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_app(app):
+    """Install request timing hooks on ``app``."""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = _route_label()
+        REQUESTS_IN_FLIGHT.inc(g.metrics_route)
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            route = g.metrics_route
+            REQUEST_LATENCY.observe(time.perf_counter() - start, request.blueprint or '', route,
+                                    request.method, str(response.status_code))
+            if not response.is_streamed:
+                RESPONSE_BYTES.inc(route, amount=response.content_length or 0)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        route = g.pop('metrics_route', None)
+        if route is not None:
+            REQUESTS_IN_FLIGHT.dec(route)
@@ -0,0 +1,962 @@
+"""
+Deterministic stand-in for the Windows-only ``MetaTrader5`` package.
+
+Prices are a pure function of (symbol, time), so the same clock always produces
+the same bars and ticks. Trading calls keep positions, pending orders and deal
+history in memory. Per-call latency and failure rates can be injected through
+``configure()`` or the ``MT5_SIM_*`` environment variables:
+
+    MT5_SIM_LATENCY_MS=2                         # every call
+    MT5_SIM_LATENCY_MS=order_send=30,copy_rates_from_pos=5
+    MT5_SIM_FAILURE_RATE=0.01                    # same syntax as latency
+    MT5_SIM_REQUOTE_RATE=0.1                     # market orders only
+    MT5_SIM_SEED=42
+    MT5_SIM_TIME=1717200000                      # freeze the clock
+    MT5_SIM_POSITIONS=20                         # open positions created by install()
+    MT5_SIM_HISTORY=500                          # closed trades created by install()
+
+Set ``MT5_SIMULATOR=1`` to make the API use it instead of the real package
+(``terminal.py`` calls ``install()`` before importing ``MetaTrader5``).
+"""
+import os
+import sys
+import math
+import time as _time
+import random
+import threading
+from collections import namedtuple
+from functools import wraps
+
+import numpy as np
+
+__version__ = '5.0.45'
+__author__ = 'simulator'
+
+# --- Timeframes ---------------------------------------------------------------
+TIMEFRAME_M1 = 1
+TIMEFRAME_M2 = 2
+TIMEFRAME_M3 = 3
+TIMEFRAME_M4 = 4
+TIMEFRAME_M5 = 5
+TIMEFRAME_M6 = 6
+TIMEFRAME_M10 = 10
+TIMEFRAME_M12 = 12
+TIMEFRAME_M15 = 15
+TIMEFRAME_M20 = 20
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 1 | 0x4000
+TIMEFRAME_H2 = 2 | 0x4000
+TIMEFRAME_H3 = 3 | 0x4000
+TIMEFRAME_H4 = 4 | 0x4000
+TIMEFRAME_H6 = 6 | 0x4000
+TIMEFRAME_H8 = 8 | 0x4000
+TIMEFRAME_H12 = 12 | 0x4000
+TIMEFRAME_D1 = 24 | 0x4000
+TIMEFRAME_W1 = 1 | 0x8000
+TIMEFRAME_MN1 = 1 | 0xC000
+
+# --- Tick copy flags ------------------------------------------------------------
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+TICK_FLAG_BID = 0x02
+TICK_FLAG_ASK = 0x04
+
+# --- Orders ---------------------------------------------------------------------
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+ORDER_TYPE_BUY_STOP_LIMIT = 6
+ORDER_TYPE_SELL_STOP_LIMIT = 7
+ORDER_TYPE_CLOSE_BY = 8
+
+ORDER_STATE_STARTED = 0
+ORDER_STATE_PLACED = 1
+ORDER_STATE_CANCELED = 2
+ORDER_STATE_PARTIAL = 3
+ORDER_STATE_FILLED = 4
+ORDER_STATE_REJECTED = 5
+ORDER_STATE_EXPIRED = 6
+
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_FILLING_BOC = 3
+
+ORDER_TIME_GTC = 0
+ORDER_TIME_DAY = 1
+ORDER_TIME_SPECIFIED = 2
+ORDER_TIME_SPECIFIED_DAY = 3
+
+ORDER_REASON_CLIENT = 0
+ORDER_REASON_EXPERT = 3
+
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+SYMBOL_TRADE_MODE_DISABLED = 0
+SYMBOL_TRADE_MODE_FULL = 4
+
+# --- Trade actions --------------------------------------------------------------
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+TRADE_ACTION_CLOSE_BY = 10
+
+# --- Positions and deals --------------------------------------------------------
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_TYPE_BALANCE = 2
+
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+
+# --- Return codes ---------------------------------------------------------------
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_CANCEL = 10007
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_DONE_PARTIAL = 10010
+TRADE_RETCODE_ERROR = 10011
+TRADE_RETCODE_TIMEOUT = 10012
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_TRADE_DISABLED = 10017
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_EXPIRATION = 10022
+TRADE_RETCODE_ORDER_CHANGED = 10023
+TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+TRADE_RETCODE_NO_CHANGES = 10025
+TRADE_RETCODE_SERVER_DISABLES_AT = 10026
+TRADE_RETCODE_CLIENT_DISABLES_AT = 10027
+TRADE_RETCODE_LOCKED = 10028
+TRADE_RETCODE_FROZEN = 10029
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_CONNECTION = 10031
+TRADE_RETCODE_ONLY_REAL = 10032
+TRADE_RETCODE_LIMIT_ORDERS = 10033
+TRADE_RETCODE_LIMIT_VOLUME = 10034
+TRADE_RETCODE_INVALID_ORDER = 10035
+TRADE_RETCODE_POSITION_CLOSED = 10036
+TRADE_RETCODE_INVALID_CLOSE_VOLUME = 10038
+TRADE_RETCODE_CLOSE_ORDER_EXIST = 10039
+TRADE_RETCODE_LIMIT_POSITIONS = 10040
+TRADE_RETCODE_REJECT_CANCEL = 10041
+TRADE_RETCODE_LONG_ONLY = 10042
+TRADE_RETCODE_SHORT_ONLY = 10043
+TRADE_RETCODE_CLOSE_ONLY = 10044
+TRADE_RETCODE_FIFO_CLOSE = 10045
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL = -10001
+RES_E_NO_IPC = -10004
+
+# --- Result types ---------------------------------------------------------------
+TerminalInfo = namedtuple('TerminalInfo', [
+    'community_account', 'community_connection', 'connected', 'dlls_allowed', 'trade_allowed',
+    'tradeapi_disabled', 'email_enabled', 'ftp_enabled', 'notifications_enabled', 'mqid',
+    'build', 'maxbars', 'codepage', 'ping_last', 'community_balance', 'retransmission',
+    'company', 'name', 'language', 'path', 'data_path', 'commondata_path'])
+
+AccountInfo = namedtuple('AccountInfo', [
+    'login', 'trade_mode', 'leverage', 'limit_orders', 'margin_so_mode', 'trade_allowed',
+    'trade_expert', 'margin_mode', 'currency_digits', 'fifo_close', 'balance', 'credit',
+    'profit', 'equity', 'margin', 'margin_free', 'margin_level', 'margin_so_call',
+    'margin_so_so', 'name', 'server', 'currency', 'company'])
+
+SymbolInfo = namedtuple('SymbolInfo', [
+    'custom', 'select', 'visible', 'time', 'digits', 'spread', 'spread_float',
+    'trade_stops_level', 'trade_freeze_level', 'trade_mode', 'filling_mode', 'order_mode',
+    'bid', 'ask', 'point', 'trade_tick_value', 'trade_tick_size', 'trade_contract_size',
+    'volume_min', 'volume_max', 'volume_step', 'currency_base', 'currency_profit',
+    'currency_margin', 'description', 'path', 'name'])
+
+Tick = namedtuple('Tick', ['time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags', 'volume_real'])
+
+TradePosition = namedtuple('TradePosition', [
+    'ticket', 'time', 'time_msc', 'time_update', 'time_update_msc', 'type', 'magic',
+    'identifier', 'reason', 'volume', 'price_open', 'sl', 'tp', 'price_current', 'swap',
+    'profit', 'symbol', 'comment', 'external_id'])
+
+TradeOrder = namedtuple('TradeOrder', [
+    'ticket', 'time_setup', 'time_setup_msc', 'time_done', 'time_done_msc', 'time_expiration',
+    'type', 'type_time', 'type_filling', 'state', 'magic', 'position_id', 'position_by_id',
+    'reason', 'volume_initial', 'volume_current', 'price_open', 'sl', 'tp', 'price_current',
+    'price_stoplimit', 'symbol', 'comment', 'external_id'])
+
+TradeDeal = namedtuple('TradeDeal', [
+    'ticket', 'order', 'time', 'time_msc', 'type', 'entry', 'magic', 'position_id', 'reason',
+    'volume', 'price', 'commission', 'swap', 'profit', 'fee', 'symbol', 'comment', 'external_id'])
+
+TradeRequest = namedtuple('TradeRequest', [
+    'action', 'magic', 'order', 'symbol', 'volume', 'price', 'stoplimit', 'sl', 'tp',
+    'deviation', 'type', 'type_filling', 'type_time', 'expiration', 'comment', 'position',
+    'position_by'])
+
+OrderSendResult = namedtuple('OrderSendResult', [
+    'retcode', 'deal', 'order', 'volume', 'price', 'bid', 'ask', 'comment', 'request_id',
+    'retcode_external', 'request'])
+
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                        ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'),
+                        ('real_volume', '<u8')])
+
+TICKS_DTYPE = np.dtype([('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'),
+                        ('volume', '<u8'), ('time_msc', '<i8'), ('flags', '<u4'),
+                        ('volume_real', '<f8')])
+
+# --- Simulated market -----------------------------------------------------------
+# name: (base price, digits, spread in points, stops level, contract size, description)
+SYMBOLS = {
+    'EURUSD': (1.0850, 5, 12, 10, 100000, 'Euro vs US Dollar'),
+    'GBPUSD': (1.2700, 5, 15, 10, 100000, 'Great Britain Pound vs US Dollar'),
+    'AUDUSD': (0.6600, 5, 14, 10, 100000, 'Australian Dollar vs US Dollar'),
+    'NZDUSD': (0.6100, 5, 18, 10, 100000, 'New Zealand Dollar vs US Dollar'),
+    'USDCAD': (1.3600, 5, 18, 10, 100000, 'US Dollar vs Canadian Dollar'),
+    'USDCHF': (0.9000, 5, 16, 10, 100000, 'US Dollar vs Swiss Franc'),
+    'USDJPY': (150.000, 3, 14, 10, 100000, 'US Dollar vs Japanese Yen'),
+    'EURJPY': (162.500, 3, 20, 10, 100000, 'Euro vs Japanese Yen'),
+    'GBPJPY': (190.000, 3, 25, 10, 100000, 'Great Britain Pound vs Japanese Yen'),
+    'XAUUSD': (2350.00, 2, 30, 20, 100, 'Gold vs US Dollar'),
+}
+
+_TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M2: 120, TIMEFRAME_M3: 180, TIMEFRAME_M4: 240,
+    TIMEFRAME_M5: 300, TIMEFRAME_M6: 360, TIMEFRAME_M10: 600, TIMEFRAME_M12: 720,
+    TIMEFRAME_M15: 900, TIMEFRAME_M20: 1200, TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H2: 7200, TIMEFRAME_H3: 10800, TIMEFRAME_H4: 14400,
+    TIMEFRAME_H6: 21600, TIMEFRAME_H8: 28800, TIMEFRAME_H12: 43200, TIMEFRAME_D1: 86400,
+    TIMEFRAME_W1: 604800, TIMEFRAME_MN1: 2592000,
+}
+
+
+def _parse_per_call(value, cast=float):
+    """Parse ``"5"`` or ``"order_send=30,copy_rates_from_pos=5"`` into a default and overrides."""
+    default, overrides = 0.0, {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            name, amount = part.split('=', 1)
+            overrides[name.strip()] = cast(amount)
+        else:
+            default = cast(part)
+    return default, overrides
+
+
+def _per_call(value):
+    if isinstance(value, tuple):
+        return value
+    if isinstance(value, dict):
+        overrides = dict(value)
+        return overrides.pop('*', 0.0), overrides
+    return value, {}
+
+
+_UNSET = object()
+
+
+class _Simulator:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+        self.configure(
+            latency=_parse_per_call(os.environ.get('MT5_SIM_LATENCY_MS')),
+            failure_rate=_parse_per_call(os.environ.get('MT5_SIM_FAILURE_RATE')),
+            requote_rate=float(os.environ.get('MT5_SIM_REQUOTE_RATE', 0)),
+            seed=int(os.environ.get('MT5_SIM_SEED', 0)),
+            frozen_time=float(os.environ['MT5_SIM_TIME']) if os.environ.get('MT5_SIM_TIME') else None,
+            latency_in_ms=True,
+        )
+
+    def reset(self):
+        with self.lock:
+            self.initialized = False
+            self.login = 50000000
+            self.server = 'Simulator-Demo'
+            self.path = None
+            self.balance = 10000.0
+            self.error = (RES_S_OK, 'Success')
+            self.next_ticket = 100000
+            self.positions = {}
+            self.orders = {}
+            self.history_orders = {}
+            self.history_deals = []
+            self.calls = {}
+
+    def configure(self, latency=None, failure_rate=None, requote_rate=None, seed=None,
+                  frozen_time=_UNSET, latency_in_ms=False):
+        with self.lock:
+            if latency is not None:
+                default, overrides = _per_call(latency)
+                scale = 0.001 if latency_in_ms else 1.0
+                self.latency = (default * scale, {k: v * scale for k, v in overrides.items()})
+            if failure_rate is not None:
+                self.failure_rate = _per_call(failure_rate)
+            if requote_rate is not None:
+                self.requote_rate = requote_rate
+            if seed is not None:
+                self.seed = seed
+                self.rng = random.Random(seed)
+            if frozen_time is not _UNSET:
+                self.frozen_time = frozen_time
+
+    def now(self):
+        return self.frozen_time if self.frozen_time is not None else _time.time()
+
+    def ticket(self):
+        self.next_ticket += 1
+        return self.next_ticket
+
+
+_sim = _Simulator()
+
+
+def configure(latency=None, failure_rate=None, requote_rate=None, seed=None, frozen_time=_UNSET):
+    """
+    Adjust the simulation at runtime. ``latency`` (seconds) and ``failure_rate`` accept a
+    number for every call or a dict of per-function values (key ``'*'`` for the default).
+    ``frozen_time`` pins the simulated clock to a unix timestamp; ``None`` lets it run again.
+    """
+    _sim.configure(latency=latency, failure_rate=failure_rate, requote_rate=requote_rate,
+                   seed=seed, frozen_time=frozen_time)
+
+
+def reset():
+    """Drop all positions, orders and history and disconnect."""
+    _sim.reset()
+
+
+def call_counts():
+    """Number of calls made to each simulated function since the last reset."""
+    return dict(_sim.calls)
+
+
+def _terminal_call(requires_connection=True):
+    def decorator(func):
+        name = func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            latency_default, latency_overrides = _sim.latency
+            delay = latency_overrides.get(name, latency_default)
+            if delay > 0:
+                _time.sleep(delay)
+            with _sim.lock:
+                _sim.calls[name] = _sim.calls.get(name, 0) + 1
+                if requires_connection and not _sim.initialized:
+                    _sim.error = (RES_E_NO_IPC, 'No IPC connection')
+                    return None
+                failure_default, failure_overrides = _sim.failure_rate
+                rate = failure_overrides.get(name, failure_default)
+                if rate > 0 and _sim.rng.random() < rate:
+                    _sim.error = (RES_E_INTERNAL_FAIL, f'Terminal: Simulated failure in {name}')
+                    return None
+                _sim.error = (RES_S_OK, 'Success')
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Deterministic price model --------------------------------------------------
+def _symbol_seed(symbol):
+    return sum((i + 1) * ord(c) for i, c in enumerate(symbol)) % 9973 + _sim.seed
+
+
+def _noise(t, seed):
+    # Cheap vectorised hash in [-1, 1]
+    x = np.sin(np.asarray(t, dtype=np.float64) * 12.9898 + seed * 78.233) * 43758.5453
+    return (x - np.floor(x)) * 2.0 - 1.0
+
+
+def _mid_price(symbol, t):
+    base, digits = SYMBOLS[symbol][0], SYMBOLS[symbol][1]
+    seed = _symbol_seed(symbol)
+    t = np.asarray(t, dtype=np.float64)
+    drift = (0.012 * np.sin(t / 604800.0 + seed)
+             + 0.004 * np.sin(t / 86400.0 + seed * 0.5)
+             + 0.0015 * np.sin(t / 3600.0 + seed * 0.25)
+             + 0.0003 * _noise(np.floor(t / 60.0), seed))
+    return np.round(base * (1.0 + drift), digits)
+
+
+def _bars(symbol, timeframe, open_times):
+    seconds = _TIMEFRAME_SECONDS[timeframe]
+    digits, spread = SYMBOLS[symbol][1], SYMBOLS[symbol][2]
+    seed = _symbol_seed(symbol)
+    open_times = np.asarray(open_times, dtype=np.int64)
+    opens = _mid_price(symbol, open_times)
+    closes = _mid_price(symbol, open_times + seconds - 1)
+    base = SYMBOLS[symbol][0]
+    wick = base * 0.0002 * math.sqrt(seconds / 60.0)
+    rates = np.empty(len(open_times), dtype=RATES_DTYPE)
+    rates['time'] = open_times
+    rates['open'] = opens
+    rates['close'] = closes
+    rates['high'] = np.round(np.maximum(opens, closes) + np.abs(_noise(open_times, seed + 1)) * wick, digits)
+    rates['low'] = np.round(np.minimum(opens, closes) - np.abs(_noise(open_times, seed + 2)) * wick, digits)
+    rates['tick_volume'] = (seconds // 2 + (np.abs(_noise(open_times, seed + 3)) * seconds).astype(np.int64))
+    rates['spread'] = spread
+    rates['real_volume'] = 0
+    return rates
+
+
+def _bar_open(t, seconds):
+    return int(t) - int(t) % seconds
+
+
+def _timestamp(value):
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return float(value)
+
+
+def _tick(symbol, t=None):
+    t = _sim.now() if t is None else t
+    digits, spread = SYMBOLS[symbol][1], SYMBOLS[symbol][2]
+    bid = float(_mid_price(symbol, t))
+    ask = round(bid + spread * 10 ** -digits, digits)
+    return Tick(int(t), bid, ask, 0.0, 0, int(t * 1000), TICK_FLAG_BID | TICK_FLAG_ASK, 0.0)
+
+
+# --- Terminal -------------------------------------------------------------------
+@_terminal_call(requires_connection=False)
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    _sim.initialized = True
+    _sim.path = path
+    if login is not None:
+        _sim.login = int(login)
+    if server is not None:
+        _sim.server = server
+    return True
+
+
+@_terminal_call(requires_connection=False)
+def login(login, password=None, server=None, timeout=None):
+    _sim.login = int(login)
+    if server is not None:
+        _sim.server = server
+    return _sim.initialized
+
+
+@_terminal_call(requires_connection=False)
+def shutdown():
+    _sim.initialized = False
+    return True
+
+
+def last_error():
+    return _sim.error
+
+
+@_terminal_call(requires_connection=False)
+def version():
+    if not _sim.initialized:
+        return None
+    return (500, 4000, '1 Jan 2024')
+
+
+@_terminal_call()
+def terminal_info():
+    return TerminalInfo(False, False, True, False, True, False, False, False, False, 0,
+                        4000, 100000, 0, 1000, 0.0, 0.0, 'Simulator Ltd.', 'MetaTrader 5 Simulator',
+                        'English', _sim.path or 'simulator', 'simulator', 'simulator')
+
+
+@_terminal_call()
+def account_info():
+    floating = sum(_position_profit(p) for p in _sim.positions.values())
+    equity = _sim.balance + floating
+    return AccountInfo(_sim.login, 0, 100, 200, 0, True, True, 2, 2, False, _sim.balance, 0.0,
+                       floating, equity, 0.0, equity, 0.0, 50.0, 30.0, 'Simulator',
+                       _sim.server, 'USD', 'Simulator Ltd.')
+
+
+# --- Symbols --------------------------------------------------------------------
+@_terminal_call()
+def symbols_total():
+    return len(SYMBOLS)
+
+
+@_terminal_call()
+def symbols_get(group=None):
+    return tuple(_symbol_info(name) for name in SYMBOLS)
+
+
+@_terminal_call()
+def symbol_select(symbol, enable=True):
+    return symbol in SYMBOLS
+
+
+def _symbol_info(symbol):
+    base, digits, spread, stops, contract, description = SYMBOLS[symbol]
+    tick = _tick(symbol)
+    point = 10 ** -digits
+    return SymbolInfo(False, True, True, tick.time, digits, spread, True, stops, 0,
+                      SYMBOL_TRADE_MODE_FULL, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC, 127,
+                      tick.bid, tick.ask, point, 1.0, point, float(contract), 0.01, 100.0, 0.01,
+                      symbol[:3], symbol[3:], symbol[:3], description, f'Forex\\{symbol}', symbol)
+
+
+@_terminal_call()
+def symbol_info(symbol):
+    if symbol not in SYMBOLS:
+        _sim.error = (RES_E_NOT_FOUND, 'Terminal: Not found')
+        return None
+    return _symbol_info(symbol)
+
+
+@_terminal_call()
+def symbol_info_tick(symbol):
+    if symbol not in SYMBOLS:
+        _sim.error = (RES_E_NOT_FOUND, 'Terminal: Not found')
+        return None
+    return _tick(symbol)
+
+
+# --- Market data ----------------------------------------------------------------
+def _check_series(symbol, timeframe):
+    if symbol not in SYMBOLS or timeframe not in _TIMEFRAME_SECONDS:
+        _sim.error = (RES_E_INVALID_PARAMS, 'Terminal: Invalid params')
+        return False
+    return True
+
+
+@_terminal_call()
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    if not _check_series(symbol, timeframe):
+        return None
+    seconds = _TIMEFRAME_SECONDS[timeframe]
+    last_open = _bar_open(_sim.now(), seconds) - int(start_pos) * seconds
+    opens = last_open - np.arange(int(count) - 1, -1, -1, dtype=np.int64) * seconds
+    return _bars(symbol, timeframe, opens)
+
+
+@_terminal_call()
+def copy_rates_from(symbol, timeframe, date_from, count):
+    if not _check_series(symbol, timeframe):
+        return None
+    seconds = _TIMEFRAME_SECONDS[timeframe]
+    last_open = _bar_open(min(_timestamp(date_from), _sim.now()), seconds)
+    opens = last_open - np.arange(int(count) - 1, -1, -1, dtype=np.int64) * seconds
+    return _bars(symbol, timeframe, opens)
+
+
+@_terminal_call()
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    if not _check_series(symbol, timeframe):
+        return None
+    seconds = _TIMEFRAME_SECONDS[timeframe]
+    start = _bar_open(_timestamp(date_from) + seconds - 1, seconds)
+    end = min(_timestamp(date_to), _sim.now())
+    opens = np.arange(start, int(end) + 1, seconds, dtype=np.int64)
+    return _bars(symbol, timeframe, opens)
+
+
+def _ticks(symbol, times):
+    digits, spread = SYMBOLS[symbol][1], SYMBOLS[symbol][2]
+    ticks = np.empty(len(times), dtype=TICKS_DTYPE)
+    ticks['time'] = times
+    ticks['bid'] = _mid_price(symbol, times)
+    ticks['ask'] = np.round(ticks['bid'] + spread * 10 ** -digits, digits)
+    ticks['last'] = 0.0
+    ticks['volume'] = 0
+    ticks['time_msc'] = times * 1000
+    ticks['flags'] = TICK_FLAG_BID | TICK_FLAG_ASK
+    ticks['volume_real'] = 0.0
+    return ticks
+
+
+@_terminal_call()
+def copy_ticks_from(symbol, date_from, count, flags):
+    if symbol not in SYMBOLS:
+        _sim.error = (RES_E_INVALID_PARAMS, 'Terminal: Invalid params')
+        return None
+    start = int(_timestamp(date_from))
+    count = max(0, min(int(count), int(_sim.now()) - start + 1))
+    return _ticks(symbol, np.arange(start, start + count, dtype=np.int64))
+
+
+@_terminal_call()
+def copy_ticks_range(symbol, date_from, date_to, flags):
+    if symbol not in SYMBOLS:
+        _sim.error = (RES_E_INVALID_PARAMS, 'Terminal: Invalid params')
+        return None
+    end = min(_timestamp(date_to), _sim.now())
+    return _ticks(symbol, np.arange(int(_timestamp(date_from)), int(end) + 1, dtype=np.int64))
+
+
+# --- Positions and orders -------------------------------------------------------
+def _position_profit(position):
+    tick = _tick(position.symbol)
+    contract = SYMBOLS[position.symbol][4]
+    if position.type == POSITION_TYPE_BUY:
+        return round((tick.bid - position.price_open) * position.volume * contract, 2)
+    return round((position.price_open - tick.ask) * position.volume * contract, 2)
+
+
+def _live_position(position):
+    tick = _tick(position.symbol)
+    current = tick.bid if position.type == POSITION_TYPE_BUY else tick.ask
+    return position._replace(price_current=current, profit=_position_profit(position))
+
+
+def _filter(items, symbol=None, group=None, ticket=None):
+    if ticket is not None:
+        items = [item for item in items if item.ticket == ticket]
+    if symbol is not None:
+        items = [item for item in items if item.symbol == symbol]
+    if group:
+        pattern = group.strip('*')
+        items = [item for item in items if pattern in item.symbol]
+    return tuple(items)
+
+
+@_terminal_call()
+def positions_total():
+    return len(_sim.positions)
+
+
+@_terminal_call()
+def positions_get(symbol=None, group=None, ticket=None):
+    return _filter([_live_position(p) for p in _sim.positions.values()], symbol, group, ticket)
+
+
+@_terminal_call()
+def orders_total():
+    return len(_sim.orders)
+
+
+@_terminal_call()
+def orders_get(symbol=None, group=None, ticket=None):
+    return _filter(list(_sim.orders.values()), symbol, group, ticket)
+
+
+def _history_range(args, kwargs):
+    date_from = kwargs.get('date_from', args[0] if len(args) > 0 else None)
+    date_to = kwargs.get('date_to', args[1] if len(args) > 1 else None)
+    if date_from is None or date_to is None:
+        return None, None
+    return _timestamp(date_from), _timestamp(date_to)
+
+
+@_terminal_call()
+def history_orders_total(date_from, date_to):
+    return len([o for o in _sim.history_orders.values()
+                if _timestamp(date_from) <= o.time_setup <= _timestamp(date_to)])
+
+
+@_terminal_call()
+def history_orders_get(*args, group=None, ticket=None, position=None, **kwargs):
+    start, end = _history_range(args, kwargs)
+    orders = list(_sim.history_orders.values())
+    if start is not None:
+        orders = [o for o in orders if start <= o.time_setup <= end]
+    if position is not None:
+        orders = [o for o in orders if o.position_id == position]
+    return _filter(orders, group=group, ticket=ticket)
+
+
+@_terminal_call()
+def history_deals_total(date_from, date_to):
+    return len([d for d in _sim.history_deals if _timestamp(date_from) <= d.time <= _timestamp(date_to)])
+
+
+@_terminal_call()
+def history_deals_get(*args, group=None, ticket=None, position=None, **kwargs):
+    start, end = _history_range(args, kwargs)
+    deals = _sim.history_deals
+    if start is not None:
+        deals = [d for d in deals if start <= d.time <= end]
+    if position is not None:
+        deals = [d for d in deals if d.position_id == position]
+    return _filter(deals, group=group, ticket=ticket)
+
+
+# --- Trading --------------------------------------------------------------------
+def _request_tuple(request):
+    fields = {name: request.get(name, 0) for name in TradeRequest._fields}
+    fields['symbol'] = request.get('symbol', '')
+    fields['comment'] = request.get('comment', '')
+    return TradeRequest(**fields)
+
+
+def _result(request, retcode, deal=0, order=0, volume=0.0, price=0.0, comment=None):
+    symbol = request.get('symbol')
+    tick = _tick(symbol) if symbol in SYMBOLS else Tick(0, 0.0, 0.0, 0.0, 0, 0, 0, 0.0)
+    if comment is None:
+        comment = 'Request executed' if retcode == TRADE_RETCODE_DONE else f'Retcode {retcode}'
+    return OrderSendResult(retcode, deal, order, volume, price, tick.bid, tick.ask, comment,
+                           _sim.next_ticket, 0, _request_tuple(request))
+
+
+def _validate_volume(symbol, volume):
+    steps = round(volume / 0.01, 8)
+    return 0.01 <= volume <= 100.0 and abs(steps - round(steps)) < 1e-6
+
+
+def _validate_stops(symbol, order_type, price, sl, tp):
+    digits, stops = SYMBOLS[symbol][1], SYMBOLS[symbol][3]
+    distance = stops * 10 ** -digits
+    is_buy = order_type in (ORDER_TYPE_BUY, ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_BUY_STOP, ORDER_TYPE_BUY_STOP_LIMIT)
+    if sl:
+        if (is_buy and sl > price - distance) or (not is_buy and sl < price + distance):
+            return False
+    if tp:
+        if (is_buy and tp < price + distance) or (not is_buy and tp > price - distance):
+            return False
+    return True
+
+
+def _record_deal(order_ticket, position_id, deal_type, entry, volume, price, magic, symbol,
+                 comment, profit=0.0):
+    now = _sim.now()
+    deal = TradeDeal(_sim.ticket(), order_ticket, int(now), int(now * 1000), deal_type, entry,
+                     magic, position_id, ORDER_REASON_EXPERT, volume, price,
+                     -round(3.5 * volume, 2), 0.0, profit, 0.0, symbol, comment, '')
+    _sim.history_deals.append(deal)
+    return deal
+
+
+def _record_order(request, order_type, volume, price, state, position_id=0):
+    now = _sim.now()
+    ticket = _sim.ticket()
+    order = TradeOrder(ticket, int(now), int(now * 1000), int(now), int(now * 1000), 0, order_type,
+                       request.get('type_time', ORDER_TIME_GTC), request.get('type_filling', ORDER_FILLING_FOK),
+                       state, request.get('magic', 0), position_id or ticket, 0, ORDER_REASON_EXPERT,
+                       volume, 0.0 if state == ORDER_STATE_FILLED else volume, price,
+                       request.get('sl', 0.0), request.get('tp', 0.0), price,
+                       request.get('stoplimit', 0.0), request['symbol'], request.get('comment', ''), '')
+    return order
+
+
+def _deal(request):
+    symbol = request['symbol']
+    order_type = request.get('type')
+    volume = float(request.get('volume', 0))
+    tick = _tick(symbol)
+    price = tick.ask if order_type == ORDER_TYPE_BUY else tick.bid
+
+    if request.get('type_filling', ORDER_FILLING_FOK) not in (ORDER_FILLING_FOK, ORDER_FILLING_IOC):
+        return _result(request, TRADE_RETCODE_INVALID_FILL, comment='Unsupported filling mode')
+    if _sim.requote_rate > 0 and _sim.rng.random() < _sim.requote_rate:
+        return _result(request, TRADE_RETCODE_REQUOTE, comment='Requote')
+    requested = request.get('price')
+    if requested:
+        point = 10 ** -SYMBOLS[symbol][1]
+        if abs(requested - price) > request.get('deviation', 0) * point + point / 2:
+            return _result(request, TRADE_RETCODE_PRICE_CHANGED, comment='Prices changed')
+
+    position_ticket = request.get('position')
+    if position_ticket:
+        position = _sim.positions.get(position_ticket)
+        if position is None:
+            return _result(request, TRADE_RETCODE_POSITION_CLOSED, comment='Position doesn\'t exist')
+        if volume > position.volume + 1e-9:
+            return _result(request, TRADE_RETCODE_INVALID_CLOSE_VOLUME, comment='Invalid close volume')
+        order = _record_order(request, order_type, volume, price, ORDER_STATE_FILLED, position_ticket)
+        _sim.history_orders[order.ticket] = order
+        closed = position._replace(volume=volume)
+        profit = _position_profit(closed)
+        deal = _record_deal(order.ticket, position_ticket, order_type, DEAL_ENTRY_OUT, volume, price,
+                            position.magic, symbol, request.get('comment', ''), profit)
+        _sim.balance += profit + deal.commission
+        remaining = round(position.volume - volume, 2)
+        if remaining > 0:
+            _sim.positions[position_ticket] = position._replace(volume=remaining)
+        else:
+            del _sim.positions[position_ticket]
+        return _result(request, TRADE_RETCODE_DONE, deal.ticket, order.ticket, volume, price)
+
+    sl, tp = request.get('sl', 0.0), request.get('tp', 0.0)
+    if not _validate_stops(symbol, order_type, price, sl, tp):
+        return _result(request, TRADE_RETCODE_INVALID_STOPS, comment='Invalid stops')
+    order = _record_order(request, order_type, volume, price, ORDER_STATE_FILLED)
+    _sim.history_orders[order.ticket] = order
+    deal = _record_deal(order.ticket, order.ticket, order_type, DEAL_ENTRY_IN, volume, price,
+                        request.get('magic', 0), symbol, request.get('comment', ''))
+    _sim.balance += deal.commission
+    now = _sim.now()
+    _sim.positions[order.ticket] = TradePosition(
+        order.ticket, int(now), int(now * 1000), int(now), int(now * 1000), order_type,
+        request.get('magic', 0), order.ticket, ORDER_REASON_EXPERT, volume, price, sl, tp, price,
+        0.0, 0.0, symbol, request.get('comment', ''), '')
+    return _result(request, TRADE_RETCODE_DONE, deal.ticket, order.ticket, volume, price)
+
+
+def _pending(request):
+    price = request.get('price', 0.0)
+    if not price or price <= 0:
+        return _result(request, TRADE_RETCODE_INVALID_PRICE, comment='Invalid price')
+    if not _validate_stops(request['symbol'], request.get('type'), price,
+                           request.get('sl', 0.0), request.get('tp', 0.0)):
+        return _result(request, TRADE_RETCODE_INVALID_STOPS, comment='Invalid stops')
+    order = _record_order(request, request.get('type'), float(request.get('volume', 0)), price,
+                          ORDER_STATE_PLACED)
+    _sim.orders[order.ticket] = order
+    return _result(request, TRADE_RETCODE_DONE, 0, order.ticket, order.volume_initial, price)
+
+
+def _sltp(request):
+    position = _sim.positions.get(request.get('position'))
+    if position is None:
+        return _result(request, TRADE_RETCODE_POSITION_CLOSED, comment='Position doesn\'t exist')
+    sl, tp = request.get('sl', 0.0), request.get('tp', 0.0)
+    if sl == position.sl and tp == position.tp:
+        return _result(request, TRADE_RETCODE_NO_CHANGES, comment='No changes')
+    tick = _tick(position.symbol)
+    current = tick.bid if position.type == POSITION_TYPE_BUY else tick.ask
+    if not _validate_stops(position.symbol, position.type, current, sl, tp):
+        return _result(request, TRADE_RETCODE_INVALID_STOPS, comment='Invalid stops')
+    _sim.positions[position.ticket] = position._replace(sl=sl, tp=tp, time_update=int(_sim.now()))
+    return _result(request, TRADE_RETCODE_DONE)
+
+
+def _remove(request):
+    order = _sim.orders.pop(request.get('order'), None)
+    if order is None:
+        return _result(request, TRADE_RETCODE_INVALID_ORDER, comment='Order doesn\'t exist')
+    _sim.history_orders[order.ticket] = order._replace(state=ORDER_STATE_CANCELED, time_done=int(_sim.now()))
+    return _result(request, TRADE_RETCODE_DONE, 0, order.ticket)
+
+
+def _modify(request):
+    order = _sim.orders.get(request.get('order'))
+    if order is None:
+        return _result(request, TRADE_RETCODE_INVALID_ORDER, comment='Order doesn\'t exist')
+    _sim.orders[order.ticket] = order._replace(
+        price_open=request.get('price', order.price_open),
+        sl=request.get('sl', order.sl), tp=request.get('tp', order.tp))
+    return _result(request, TRADE_RETCODE_DONE, 0, order.ticket)
+
+
+_ACTIONS = {
+    TRADE_ACTION_DEAL: _deal,
+    TRADE_ACTION_PENDING: _pending,
+    TRADE_ACTION_SLTP: _sltp,
+    TRADE_ACTION_REMOVE: _remove,
+    TRADE_ACTION_MODIFY: _modify,
+}
+
+
+@_terminal_call()
+def order_check(request):
+    return _result(request, 0, comment='Done')
+
+
+@_terminal_call()
+def order_send(request):
+    action = _ACTIONS.get(request.get('action'))
+    if action is None:
+        return _result(request, TRADE_RETCODE_INVALID, comment='Invalid request')
+    symbol = request.get('symbol')
+    if action in (_deal, _pending):
+        if symbol not in SYMBOLS:
+            return _result(request, TRADE_RETCODE_INVALID, comment='Invalid symbol')
+        if not _validate_volume(symbol, float(request.get('volume', 0))):
+            return _result(request, TRADE_RETCODE_INVALID_VOLUME, comment='Invalid volume')
+    return action(request)
+
+
+@_terminal_call()
+def order_calc_margin(action, symbol, volume, price):
+    if symbol not in SYMBOLS:
+        return None
+    return round(volume * SYMBOLS[symbol][4] * price / 100.0, 2)
+
+
+@_terminal_call()
+def order_calc_profit(action, symbol, volume, price_open, price_close):
+    if symbol not in SYMBOLS:
+        return None
+    direction = 1 if action == ORDER_TYPE_BUY else -1
+    return round((price_close - price_open) * direction * volume * SYMBOLS[symbol][4], 2)
+
+
+# --- Seeding helpers ------------------------------------------------------------
+def seed_positions(count, symbols=None, magic=23400):
+    """Open ``count`` deterministic market positions spread over ``symbols``."""
+    symbols = symbols or list(SYMBOLS)
+    with _sim.lock:
+        for i in range(count):
+            symbol = symbols[i % len(symbols)]
+            order_type = ORDER_TYPE_BUY if i % 2 == 0 else ORDER_TYPE_SELL
+            _deal({'action': TRADE_ACTION_DEAL, 'symbol': symbol, 'volume': 0.01 * (1 + i % 5),
+                   'type': order_type, 'magic': magic, 'comment': f'seed {i}',
+                   'type_filling': ORDER_FILLING_IOC})
+
+
+def seed_history(trades, days=30, symbols=None, magic=23400):
+    """Write ``trades`` closed round trips spread over the last ``days`` days into the history."""
+    symbols = symbols or list(SYMBOLS)
+    rng = random.Random(_sim.seed)
+    with _sim.lock:
+        end = _sim.now()
+        for i in range(trades):
+            symbol = symbols[i % len(symbols)]
+            digits = SYMBOLS[symbol][1]
+            point = 10 ** -digits
+            open_time = end - days * 86400 + i * (days * 86400 / max(trades, 1))
+            close_time = open_time + rng.randint(15, 600) * 60
+            direction = 1 if i % 2 == 0 else -1
+            order_type = ORDER_TYPE_BUY if direction == 1 else ORDER_TYPE_SELL
+            open_price = float(_mid_price(symbol, open_time))
+            close_price = float(_mid_price(symbol, close_time))
+            sl = round(open_price - direction * 200 * point, digits)
+            volume = 0.01 * (1 + i % 5)
+            profit = round((close_price - open_price) * direction * volume * SYMBOLS[symbol][4], 2)
+            order_ticket = _sim.ticket()
+            _sim.history_orders[order_ticket] = TradeOrder(
+                order_ticket, int(open_time), int(open_time * 1000), int(open_time), int(open_time * 1000),
+                0, order_type, ORDER_TIME_GTC, ORDER_FILLING_IOC, ORDER_STATE_FILLED, magic, order_ticket,
+                0, ORDER_REASON_EXPERT, volume, 0.0, open_price, sl, 0.0, open_price, 0.0, symbol, '', '')
+            _sim.history_deals.append(TradeDeal(
+                _sim.ticket(), order_ticket, int(open_time), int(open_time * 1000), order_type, DEAL_ENTRY_IN,
+                magic, order_ticket, ORDER_REASON_EXPERT, volume, open_price, -round(3.5 * volume, 2),
+                0.0, 0.0, 0.0, symbol, '', ''))
+            close_order = _sim.ticket()
+            _sim.history_deals.append(TradeDeal(
+                _sim.ticket(), close_order, int(close_time), int(close_time * 1000), 1 - order_type,
+                DEAL_ENTRY_OUT, magic, order_ticket, ORDER_REASON_EXPERT, volume, close_price,
+                -round(3.5 * volume, 2), 0.0, profit, 0.0, symbol, '', ''))
+        _sim.history_deals.sort(key=lambda d: d.time)
+
+
+def install():
+    """
+    Register this module as ``MetaTrader5`` so every later ``import MetaTrader5`` gets the
+    simulator, and seed the positions / history requested by ``MT5_SIM_POSITIONS`` and
+    ``MT5_SIM_HISTORY``.
+    """
+    module = sys.modules[__name__]
+    if sys.modules.get('MetaTrader5') is module:
+        return module
+    sys.modules['MetaTrader5'] = module
+    history = int(os.environ.get('MT5_SIM_HISTORY', 0))
+    if history:
+        seed_history(history)
+    positions = int(os.environ.get('MT5_SIM_POSITIONS', 0))
+    if positions:
+        seed_positions(positions)
+    return module
@@ -0,0 +1,221 @@
+"""
+Cache pre-warmer aligned with the bot's analysis schedule.
+
+A background thread fills the bar, tick and symbol spec caches ``lead_seconds`` before
+each analysis window, and once right after start-up, so the first request of a stage is
+served from memory instead of starting cold against the terminal. Ticks of the
+configured pairs keep streaming into the tick cache for ``watch_seconds`` after each
+warm-up.
+
+When a window draws charts, the chart render processes are started as well. Rendered
+images themselves are not pre-warmed: they are keyed by the tick volume of the forming
+bar, so an image drawn ahead of a window is stale by the first request.
+
+Windows are given in UTC, the same clock as the bot's cron jobs in ``index.js``.
+``PREWARM_FILE`` points to a JSON file; without one the bot's default schedule is used
+with the pairs from ``SUPPORTED_PAIRS``:
+
+    {
+      "pairs": ["USDJPY", "GBPUSD"],
+      "lead_seconds": 60,
+      "watch_seconds": 300,
+      "bars": 200,
+      "windows": [
+        {"name": "stage1", "at": "05:00", "timeframes": ["M15"], "charts": ["H4", "H1", "M15"]},
+        {"name": "stage3", "at": "07:00", "until": "12:30", "every_minutes": 30,
+         "days": ["mon", "tue", "wed", "thu", "fri"], "timeframes": ["M15"]}
+      ]
+    }
+
+Set ``PREWARM_DISABLED=1`` to turn it off.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from connection import connection
+from constants import MT5Timeframe
+from market_cache import bar_cache, symbol_specs, tick_cache
+from chart import renderer
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('PREWARM_DISABLED', '').lower() not in ('1', 'true', 'yes')
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+WEEKDAYS = DAYS[:5]
+
+# Mirrors the cron jobs and data requests of index.js / analysisHandler.js
+DEFAULT_CONFIG = {
+    'lead_seconds': 60,
+    'watch_seconds': 300,
+    'bars': 200,
+    'chart_bars': 120,
+    'windows': [
+        {'name': 'stage1', 'at': '05:00', 'timeframes': ['M15', 'H4', 'H1'], 'charts': ['H4', 'H1', 'M15']},
+        {'name': 'stage2', 'at': '06:30', 'timeframes': ['M15', 'M5'], 'charts': ['M15', 'M5']},
+        {'name': 'stage2_final', 'at': '09:00', 'timeframes': ['M15', 'M5'], 'charts': ['M15', 'M5']},
+        {'name': 'stage3', 'at': '07:00', 'until': '12:30', 'every_minutes': 30,
+         'timeframes': ['M15', 'M5'], 'charts': ['M15', 'M5']},
+    ],
+}
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class Window:
+    def __init__(self, name, at, until=None, every_minutes=None, days=WEEKDAYS, timeframes=(), charts=()):
+        self.name = name
+        self.days = {DAYS.index(day.lower()[:3]) for day in days}
+        self.timeframes = [tf.upper() for tf in timeframes]
+        self.charts = [tf.upper() for tf in charts]
+        for tf in self.timeframes + self.charts:
+            MT5Timeframe[tf]
+        start = _minutes(at)
+        end = _minutes(until) if until else start
+        step = int(every_minutes) if every_minutes else max(1, end - start + 1)
+        self.times = list(range(start, end + 1, step))
+
+    def occurrences(self, day):
+        """Start times (UTC datetimes) of this window on ``day``."""
+        if day.weekday() not in self.days:
+            return []
+        midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        return [midnight + timedelta(minutes=m) for m in self.times]
+
+
+class Prewarmer:
+    def __init__(self, config):
+        self.pairs = [p.upper() for p in config['pairs']]
+        self.lead = float(config.get('lead_seconds', 60))
+        self.watch = float(config.get('watch_seconds', 300))
+        self.bars = int(config.get('bars', 200))
+        self.chart_bars = int(config.get('chart_bars', 120))
+        self.windows = [Window(**window) for window in config['windows']]
+        self.next_run = None
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get('PREWARM_FILE')
+        if path:
+            with open(path, encoding='utf-8') as f:
+                config = json.load(f)
+        else:
+            config = dict(DEFAULT_CONFIG)
+        if 'pairs' not in config:
+            pairs = os.environ.get('SUPPORTED_PAIRS', 'USDJPY,USDCHF,GBPUSD')
+            config['pairs'] = [p.strip() for p in pairs.split(',') if p.strip()]
+        return cls(config)
+
+    def next_window(self, now):
+        """``(warm_at, window)`` of the next window whose warm-up time is after ``now``."""
+        upcoming = []
+        for offset in range(8):
+            day = now + timedelta(days=offset)
+            for window in self.windows:
+                for start in window.occurrences(day):
+                    warm_at = start - timedelta(seconds=self.lead)
+                    if warm_at > now:
+                        upcoming.append((warm_at, window))
+            if upcoming:
+                return min(upcoming, key=lambda item: item[0])
+        return None
+
+    def warm(self, window_name, timeframes, charts):
+        """Fill the caches for every pair; returns a summary of the run."""
+        started = time.perf_counter()
+        errors = 0
+        for pair in self.pairs:
+            try:
+                symbol_specs.refresh(pair)
+                for tf in timeframes:
+                    count = max(self.bars, self.chart_bars) if tf in charts else self.bars
+                    bar_cache.rates(pair, MT5Timeframe[tf].value, count)
+            except Exception:
+                errors += 1
+                logger.exception("Pre-warm of %s failed for %s", window_name, pair)
+        if charts:
+            try:
+                renderer.warm_up()
+            except Exception:
+                errors += 1
+                logger.exception("Chart renderer warm-up for %s failed", window_name)
+        tick_cache.watch(self.pairs, self.lead + self.watch)
+        self.last_run = {
+            "window": window_name,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "errors": errors,
+        }
+        logger.info("Pre-warmed %s for %d pairs in %.0f ms", window_name, len(self.pairs),
+                    self.last_run["duration_ms"])
+        return self.last_run
+
+    def _everything(self):
+        timeframes = sorted({tf for w in self.windows for tf in w.timeframes + w.charts})
+        charts = sorted({tf for w in self.windows for tf in w.charts})
+        return timeframes, charts
+
+    def _run(self):
+        while not connection.ensure_connected():
+            if self._stop.wait(5):
+                return
+        self.warm('startup', *self._everything())
+
+        while not self._stop.is_set():
+            upcoming = self.next_window(datetime.now(timezone.utc))
+            if upcoming is None:
+                logger.warning("Pre-warm schedule has no upcoming windows; stopping")
+                return
+            warm_at, window = upcoming
+            self.next_run = {"window": window.name, "at": warm_at.isoformat()}
+            if self._stop.wait(max(0.0, (warm_at - datetime.now(timezone.utc)).total_seconds())):
+                return
+            self.warm(window.name, window.timeframes + [tf for tf in window.charts if tf not in window.timeframes],
+                      window.charts)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "pairs": self.pairs,
+            "windows": [w.name for w in self.windows],
+            "next_run": self.next_run,
+            "last_run": self.last_run,
+        }
+
+
+prewarmer = None
+
+
+def start():
+    """Start the pre-warmer unless disabled; safe to call more than once."""
+    global prewarmer
+    if not ENABLED or prewarmer is not None:
+        return prewarmer
+    try:
+        prewarmer = Prewarmer.from_env()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.error("Pre-warm disabled, invalid configuration: %s", e)
+        return None
+    prewarmer.start()
+    return prewarmer
+
+
+def stats():
+    return prewarmer.stats() if prewarmer is not None else {"enabled": False}
@@ -0,0 +1,185 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries ``X-Profile: stacks`` or ``X-Profile: pstats``
+together with a valid ``X-API-Key``, or at random for a ``PROFILE_SAMPLE_RATE`` fraction
+of requests (mode ``PROFILE_MODE``). Finished profiles are kept in a ring buffer of the
+last ``PROFILE_BUFFER_SIZE`` entries and served by ``/debug/profiles``.
+
+``stacks`` samples the handler thread every ``PROFILE_INTERVAL_MS`` and produces
+collapsed stacks (input for flamegraph.pl / speedscope). ``pstats`` runs cProfile on the
+handler thread and can be downloaded as a ``.pstats`` file for snakeviz or ``pstats``.
+"""
+import io
+import os
+import sys
+import time
+import random
+import marshal
+import pstats
+import cProfile
+import itertools
+import threading
+from collections import Counter, deque
+from flask import request, g
+from auth import is_authorized
+
+PROFILE_HEADER = 'X-Profile'
+MODES = ('stacks', 'pstats')
+
+SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+DEFAULT_MODE = os.environ.get('PROFILE_MODE', 'stacks')
+BUFFER_SIZE = int(os.environ.get('PROFILE_BUFFER_SIZE', 50))
+SAMPLE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+
+_ids = itertools.count(1)
+_profiles = deque(maxlen=BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    """Samples one thread's stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+def _requested_mode():
+    mode = request.headers.get(PROFILE_HEADER)
+    if mode is not None:
+        mode = mode.strip().lower() or DEFAULT_MODE
+        if mode in MODES and is_authorized(request.headers.get('X-API-Key')):
+            return mode
+        return None
+    if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+        return DEFAULT_MODE
+    return None
+
+
+def _start():
+    mode = _requested_mode()
+    if mode is None:
+        return
+    if mode == 'pstats':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    g.profile = (mode, profiler, time.time(), time.perf_counter())
+
+
+def _finish(status):
+    mode, profiler, started, start_counter = g.pop('profile')
+    duration = time.perf_counter() - start_counter
+    entry = {
+        "id": next(_ids),
+        "mode": mode,
+        "method": request.method,
+        "path": request.path,
+        "route": request.url_rule.rule if request.url_rule is not None else None,
+        "status": status,
+        "started": started,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    if mode == 'pstats':
+        profiler.disable()
+        profiler.create_stats()
+        entry["pstats"] = marshal.dumps(profiler.stats)
+    else:
+        profiler.stop()
+        entry["samples"] = profiler.samples
+        entry["collapsed"] = profiler.collapsed()
+    with _lock:
+        _profiles.append(entry)
+    return entry["id"]
+
+
+def list_profiles():
+    """Summaries of the buffered profiles, newest first."""
+    with _lock:
+        entries = list(_profiles)
+    return [{k: v for k, v in e.items() if k not in ('pstats', 'collapsed')} for e in reversed(entries)]
+
+
+def get_profile(profile_id):
+    with _lock:
+        for entry in _profiles:
+            if entry["id"] == profile_id:
+                return entry
+    return None
+
+
+def pstats_text(entry, limit=60, sort='cumulative'):
+    """Render a pstats profile as the familiar text table."""
+    stream = io.StringIO()
+    stats = pstats.Stats(_MarshalledStats(entry["pstats"]), stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class _MarshalledStats:
+    """Adapter so ``pstats.Stats`` can load stats that were captured in memory."""
+
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+def clear():
+    with _lock:
+        _profiles.clear()
+
+
+def init_app(app):
+    """Install the profiling hooks on ``app``."""
+
+    @app.before_request
+    def _start_profile():
+        _start()
+
+    @app.after_request
+    def _finish_profile(response):
+        if 'profile' in g:
+            response.headers['X-Profile-Id'] = str(_finish(response.status_code))
+        return response
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        if 'profile' in g:
+            _finish(500)
@@ -0,0 +1,163 @@
+from flask import Blueprint, jsonify, request
+import logging
+from swagger import swag_from
+from auth import api_key_required
+from terminal import current_account
+from alerts import engine, parse_alert
+
+alerts_bp = Blueprint('alerts', __name__)
+logger = logging.getLogger(__name__)
+
+ALERT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'symbol': {'type': 'string'},
+        'price': {'type': 'number', 'description': 'Price level (or give low and high for a zone).'},
+        'low': {'type': 'number'},
+        'high': {'type': 'number'},
+        'name': {'type': 'string', 'description': 'Label returned with the events, e.g. "H1 bullish FVG".'},
+        'events': {'type': 'array', 'items': {'type': 'string', 'enum': ['touch', 'cross']}},
+        'once': {'type': 'boolean', 'default': True, 'description': 'Remove the alert after its first event.'},
+        'ttl_seconds': {'type': 'number'},
+        'id': {'type': 'string', 'description': 'Optional id; registering the same id again replaces the alert.'}
+    },
+    'required': ['symbol']
+}
+
+
+@alerts_bp.route('/alerts', methods=['POST'])
+@api_key_required
+@swag_from({
+    'tags': ['Alerts'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {'alerts': {'type': 'array', 'items': ALERT_SCHEMA}}
+            }
+        }
+    ],
+    'responses': {
+        200: {'description': 'Registered alerts.'},
+        400: {'description': 'Invalid alert.'}
+    }
+})
+def register_alerts():
+    """
+    Register Price Alerts
+    ---
+    description: Register price levels or zones (one object or {"alerts":[...]}). Every tick is checked against them and touch / cross events are published on /stream/alerts (SSE), /stream/alerts/poll and /alerts/events.
+    """
+    if current_account() is not None:
+        return jsonify({"error": "Alerts are only available for the default terminal"}), 400
+    data = request.get_json(force=True, silent=True)
+    items = data.get('alerts') if isinstance(data, dict) and 'alerts' in data else [data]
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'alerts' must be a non-empty list"}), 400
+    try:
+        registered = engine.add([parse_alert(item) for item in items])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    logger.info("Registered %d price alerts", len(registered))
+    return jsonify({"alerts": registered})
+
+
+@alerts_bp.route('/alerts', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Alerts'],
+    'parameters': [
+        {
+            'name': 'symbol',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Only the alerts of this symbol.'
+        }
+    ],
+    'responses': {
+        200: {'description': 'Registered alerts.'}
+    }
+})
+def list_alerts():
+    """
+    List Price Alerts
+    ---
+    description: Registered price alerts with the side of the zone the price is on.
+    """
+    return jsonify({"alerts": engine.all(request.args.get('symbol')), "last_event_id": engine.stats()["last_event_id"]})
+
+
+@alerts_bp.route('/alerts', methods=['DELETE'])
+@alerts_bp.route('/alerts/<string:alert_id>', methods=['DELETE'])
+@api_key_required
+@swag_from({
+    'tags': ['Alerts'],
+    'parameters': [
+        {
+            'name': 'symbol',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Remove every alert of this symbol (all alerts when neither an id nor a symbol is given).'
+        }
+    ],
+    'responses': {
+        200: {'description': 'Number of alerts removed.'},
+        404: {'description': 'Alert not found.'}
+    }
+})
+def delete_alerts(alert_id=None):
+    """
+    Remove Price Alerts
+    ---
+    description: Remove one alert by id, the alerts of a symbol, or all alerts.
+    """
+    removed = engine.remove(alert_id, request.args.get('symbol'))
+    if alert_id is not None and not removed:
+        return jsonify({"error": f"Alert '{alert_id}' not found"}), 404
+    return jsonify({"removed": removed})
+
+
+@alerts_bp.route('/alerts/events', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Alerts'],
+    'parameters': [
+        {
+            'name': 'since',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 0,
+            'description': 'Return events with an id above this one (last_event_id of the previous call).'
+        },
+        {
+            'name': 'symbols',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma separated symbols to filter on.'
+        }
+    ],
+    'responses': {
+        200: {'description': 'Alert events, oldest first, and the last event id.'},
+        400: {'description': 'Invalid parameters.'}
+    }
+})
+def alert_events():
+    """
+    Alert Events
+    ---
+    description: Touch and cross events from the recent event buffer; returns at once. To wait for the next event use the ASGI server's /stream/alerts/poll (long poll) or /stream/alerts (SSE), which do not hold a worker thread or an admission slot.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "Invalid 'since' parameter"}), 400
+    symbols = {s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()}
+    events, last_id = engine.events_since(since, symbols)
+    return jsonify({"events": events, "last_event_id": last_id})
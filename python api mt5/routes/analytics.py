@@ -0,0 +1,143 @@
+from flask import Blueprint, jsonify, request
+import logging
+from datetime import datetime, timedelta, timezone
+from swagger import swag_from
+from auth import api_key_required
+from lib import get_performance_stats
+
+analytics_bp = Blueprint('analytics', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _utc(value):
+    """Parse an ISO date; dates without an offset are taken as UTC."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+@analytics_bp.route('/analytics/performance', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Analytics'],
+    'parameters': [
+        {
+            'name': 'from_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'format': 'date-time',
+            'description': 'Start date in ISO format. Defaults to 30 days before to_date.'
+        },
+        {
+            'name': 'to_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'format': 'date-time',
+            'description': 'End date in ISO format. Defaults to now.'
+        },
+        {
+            'name': 'symbol',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Only include trades on this symbol.'
+        },
+        {
+            'name': 'magic',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Only include trades with this magic number.'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Performance statistics computed successfully.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'from_date': {'type': 'string', 'format': 'date-time'},
+                    'to_date': {'type': 'string', 'format': 'date-time'},
+                    'summary': {
+                        'type': 'object',
+                        'properties': {
+                            'trades': {'type': 'integer'},
+                            'wins': {'type': 'integer'},
+                            'losses': {'type': 'integer'},
+                            'win_rate': {'type': 'number'},
+                            'gross_profit': {'type': 'number'},
+                            'gross_loss': {'type': 'number'},
+                            'net_profit': {'type': 'number'},
+                            'profit_factor': {'type': 'number'},
+                            'expectancy': {'type': 'number'},
+                            'average_win': {'type': 'number'},
+                            'average_loss': {'type': 'number'},
+                            'average_r': {'type': 'number'},
+                            'max_drawdown': {'type': 'number'},
+                            'excluded_reversals': {'type': 'integer', 'description': 'Positions reversed by an in/out deal (netting accounts), left out.'}
+                        }
+                    },
+                    'equity_curve': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'time': {'type': 'string', 'format': 'date-time'},
+                                'position_id': {'type': 'integer'},
+                                'profit': {'type': 'number'},
+                                'equity': {'type': 'number'},
+                                'drawdown': {'type': 'number'}
+                            }
+                        }
+                    },
+                    'by_symbol': {'type': 'object'},
+                    'by_session': {'type': 'object'},
+                    'by_magic': {'type': 'object'}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid parameter format.'
+        },
+        404: {
+            'description': 'Failed to get deal history.'
+        },
+        500: {
+            'description': 'Internal server error.'
+        }
+    }
+})
+def performance_endpoint():
+    """
+    Get Trading Performance
+    ---
+    description: Pair entry and exit deals by position and return aggregate statistics, equity curve and breakdowns by symbol, session and magic number. A trade is counted when its position is closed within the range, including positions opened before from_date.
+    """
+    try:
+        from_str = request.args.get('from_date')
+        to_str = request.args.get('to_date')
+        symbol = request.args.get('symbol')
+        magic = request.args.get('magic')
+
+        to_date = _utc(to_str) if to_str else datetime.now(timezone.utc)
+        from_date = _utc(from_str) if from_str else to_date - timedelta(days=30)
+        magic = int(magic) if magic is not None else None
+
+        if from_date > to_date:
+            return jsonify({"error": "from_date must be before to_date"}), 400
+
+        stats = get_performance_stats(from_date, to_date, symbol=symbol, magic=magic)
+        if stats is None:
+            return jsonify({"error": "Failed to get deal history"}), 404
+
+        return jsonify({
+            "from_date": from_date.isoformat(),
+            "to_date": to_date.isoformat(),
+            **stats
+        })
+
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid parameter format"}), 400
+    except Exception as e:
+        logger.error("Error in analytics/performance: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
@@ -0,0 +1,77 @@
+from flask import Blueprint, jsonify
+from swagger import swag_from
+from auth import api_key_required
+from cache import response_cache
+from market_cache import bar_cache, symbol_specs, tick_cache
+from chart import renderer
+
+cache_bp = Blueprint('cache', __name__)
+
+@cache_bp.route('/cache/stats', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Cache'],
+    'responses': {
+        200: {
+            'description': 'Response cache statistics.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'enabled': {'type': 'boolean'},
+                    'entries': {'type': 'integer'},
+                    'bytes': {'type': 'integer'},
+                    'max_bytes': {'type': 'integer'},
+                    'hits': {'type': 'integer'},
+                    'misses': {'type': 'integer'},
+                    'hit_ratio': {'type': 'number'},
+                    'evictions': {'type': 'integer'},
+                    'invalidations': {'type': 'integer'},
+                    'routes': {'type': 'object'},
+                    'bars': {'type': 'object'},
+                    'symbol_specs': {'type': 'object'},
+                    'ticks': {'type': 'object'},
+                    'charts': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+def cache_stats():
+    """
+    Response Cache Statistics
+    ---
+    description: Size, hit ratio, evictions and invalidations of the response cache, with hits / misses / stores per route, plus the bar, symbol spec, tick and rendered chart caches.
+    responses:
+      200:
+        description: Response cache statistics.
+    """
+    stats = response_cache.stats()
+    stats['bars'] = bar_cache.stats()
+    stats['symbol_specs'] = symbol_specs.stats()
+    stats['ticks'] = tick_cache.stats()
+    stats['charts'] = renderer.stats()
+    return jsonify(stats)
+
+@cache_bp.route('/cache', methods=['DELETE'])
+@api_key_required
+@swag_from({
+    'tags': ['Cache'],
+    'responses': {
+        200: {'description': 'Response, bar and chart caches cleared.'}
+    }
+})
+def clear_cache():
+    """
+    Clear Response Cache
+    ---
+    description: Drop every cached response, bar series, symbol spec, tick and rendered chart.
+    responses:
+      200:
+        description: Response, bar and chart caches cleared.
+    """
+    response_cache.clear()
+    bar_cache.clear()
+    symbol_specs.clear()
+    tick_cache.clear()
+    renderer.clear()
+    return jsonify({"message": "Cache cleared"})
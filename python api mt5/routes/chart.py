@@ -0,0 +1,126 @@
+from flask import Blueprint, jsonify, request, Response
+import logging
+from swagger import swag_from
+from terminal import current_account
+from connection import connection
+from lib import get_timeframe
+from sessions import calendar, server_to_utc
+from market_cache import bar_cache
+from chart import renderer, OVERLAYS
+
+chart_bp = Blueprint('chart', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_CHART_BARS = 1000
+
+@chart_bp.route('/chart/<string:symbol>', methods=['GET'])
+@swag_from({
+    'tags': ['Data'],
+    'produces': ['image/png'],
+    'parameters': [
+        {
+            'name': 'symbol',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Symbol name (e.g., EURUSD).'
+        },
+        {
+            'name': 'timeframe',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'default': 'H1',
+            'description': 'Timeframe for the chart (e.g., M15, H1, H4).'
+        },
+        {
+            'name': 'count',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 100,
+            'description': f'Number of candles to draw (max {MAX_CHART_BARS}).'
+        },
+        {
+            'name': 'overlays',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma-separated overlays: fvg (open fair value gaps), sessions (Asia / London / New York shading).'
+        },
+        {
+            'name': 'width',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 1280,
+            'description': 'Image width in pixels (320-2560).'
+        },
+        {
+            'name': 'height',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 720,
+            'description': 'Image height in pixels (240-1600).'
+        }
+    ],
+    'responses': {
+        200: {'description': 'PNG candlestick chart.'},
+        400: {'description': 'Invalid request parameters.'},
+        404: {'description': 'Failed to get rates data.'},
+        501: {'description': 'Chart rendering is not available (matplotlib is not installed).'},
+        503: {'description': 'MT5 terminal not connected.'},
+        500: {'description': 'Internal server error.'}
+    }
+})
+def get_chart(symbol):
+    """
+    Candlestick Chart
+    ---
+    description: Render the last bars of a symbol as a PNG candlestick chart, optionally with fair value gaps and trading sessions. Images are cached until a new tick changes the last bar.
+    """
+    try:
+        if not renderer.available:
+            return jsonify({"error": "Chart rendering requires matplotlib"}), 501
+
+        timeframe = request.args.get('timeframe', 'H1').upper()
+        count = int(request.args.get('count', 100))
+        width = int(request.args.get('width', 1280))
+        height = int(request.args.get('height', 720))
+        overlays = sorted({o.strip().lower() for o in request.args.get('overlays', '').split(',') if o.strip()})
+
+        unknown = [o for o in overlays if o not in OVERLAYS]
+        if unknown:
+            return jsonify({"error": f"Unknown overlays: {', '.join(unknown)}. Valid options are: {', '.join(OVERLAYS)}."}), 400
+        if not 1 <= count <= MAX_CHART_BARS:
+            return jsonify({"error": f"'count' must be between 1 and {MAX_CHART_BARS}"}), 400
+        if not (320 <= width <= 2560 and 240 <= height <= 1600):
+            return jsonify({"error": "'width' must be 320-2560 and 'height' 240-1600"}), 400
+
+        mt5_timeframe = get_timeframe(timeframe)
+
+        if not connection.ensure_connected():
+            return jsonify({"error": "MT5 terminal not connected"}), 503
+
+        rates = bar_cache.rates(symbol, mt5_timeframe, count)
+        if rates is None or len(rates) == 0:
+            return jsonify({"error": f"Failed to get rates data for {symbol}"}), 404
+
+        key = (current_account(), symbol, timeframe, count, tuple(overlays), width, height)
+        sessions = calendar.label(server_to_utc(rates['time'])) if 'sessions' in overlays else ()
+        png, hit = renderer.render(key, rates, f"{symbol} {timeframe}", overlays, sessions, width, height)
+
+        response = Response(png, mimetype='image/png')
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        response.headers['X-Chart-Last-Bar'] = str(int(rates['time'][-1]))
+        return response
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError:
+        logger.error("Chart render for %s timed out", symbol)
+        return jsonify({"error": "Chart render timed out"}), 504
+    except Exception as e:
+        logger.exception("Error in /chart for %s", symbol)
+        return jsonify({"error": "Internal server error"}), 500
@@ -1,15 +1,125 @@
-from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from flask import Blueprint, jsonify, request, current_app, Response
+from terminal import mt5
+from connection import connection
 import logging
+import numpy as np
 from datetime import datetime
-import pytz
-import pandas as pd
-from flasgger import swag_from
+from swagger import swag_from
+from startup import lazy_import
 from lib import get_timeframe
+from market_cache import bar_cache, symbol_specs, tick_cache
+from constants import TIMEFRAME_SECONDS
+import bar_encoding
+import metrics
+
+pytz = lazy_import('pytz')
+pd = lazy_import('pandas')
 
 data_bp = Blueprint('data', __name__)
 logger = logging.getLogger(__name__)
 
+COMPACT_BYTES_SAVED = metrics.register(metrics.Counter(
+    'mt5api_compact_bytes_saved_total', 'Response bytes saved by format=compact versus JSON records (estimated).',
+    ('route',)))
+
+# Bars serialized to estimate the JSON size of a compact response
+SIZE_SAMPLE_BARS = 20
+
+# Query parameters shared by the bar endpoints
+COMPACT_PARAMETERS = [
+    {
+        'name': 'format',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'default': 'json',
+        'description': "'json' (records) or 'compact' (text for LLM prompts: integer point deltas from an anchor price, see bar_encoding.py)."
+    },
+    {
+        'name': 'coarsen',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'default': 1,
+        'description': 'format=compact only: merge bars older than the last `detail` bars this many at a time.'
+    },
+    {
+        'name': 'detail',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'default': 50,
+        'description': 'format=compact only: number of most recent bars kept at full resolution when coarsening.'
+    }
+]
+
+
+def _utc_records(rates):
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df.to_dict(orient='records')
+
+
+def _jakarta_records(rates):
+    # Konversi ke DataFrame Pandas agar mudah diolah
+    df = pd.DataFrame(rates)
+
+    # --- BLOK PERUBAHAN ZONA WAKTU DIMULAI DI SINI ---
+
+    # 1. Konversi kolom waktu dari Unix timestamp ke datetime yang sadar-UTC
+    df['time'] = pd.to_datetime(df['time'], unit='s', utc=True)
+
+    # 2. Tentukan zona waktu Jakarta
+    jakarta_tz = pytz.timezone('Asia/Jakarta')
+
+    # 3. Konversi kolom 'time' dari UTC ke zona waktu Jakarta
+    df['time'] = df['time'].dt.tz_convert(jakarta_tz)
+
+    # 4. (Opsional) Format ulang ke string agar lebih rapi dan konsisten
+    df['time'] = df['time'].dt.strftime('%Y-%m-%d %H:%M:%S %Z')
+
+    # --- BLOK PERUBAHAN ZONA WAKTU SELESAI ---
+    return df.to_dict(orient='records')
+
+
+def _bars_response(rates, to_records, symbol, timeframe, tz):
+    """
+    JSON records (``to_records(rates)``), or the compact text encoding of ``rates`` when
+    ``format=compact``. The compact path never builds the full records: the JSON size it
+    reports is estimated from the last ``SIZE_SAMPLE_BARS`` bars.
+    """
+    output = request.args.get('format', 'json').lower()
+    if output == 'json':
+        return jsonify(to_records(rates))
+    if output != 'compact':
+        return jsonify({"error": f"Invalid format: '{output}'. Valid options are: json, compact."}), 400
+
+    try:
+        factor = int(request.args.get('coarsen', 1))
+        detail = int(request.args.get('detail', 50))
+    except ValueError:
+        return jsonify({"error": "'coarsen' and 'detail' must be integers"}), 400
+    if factor < 1 or detail < 0:
+        return jsonify({"error": "'coarsen' must be at least 1 and 'detail' not negative"}), 400
+    info = symbol_specs.get(symbol)
+    digits = info.digits if info is not None else 5
+
+    text = bar_encoding.encode(rates, symbol, timeframe.upper(), TIMEFRAME_SECONDS[timeframe.upper()], digits,
+                               tz=tz, detail=detail, factor=factor).encode('utf-8')
+    sample = rates[-SIZE_SAMPLE_BARS:]
+    if len(sample):
+        json_bytes = round(len(current_app.json.dumps(to_records(sample))) * len(rates) / len(sample)) + 1
+    else:
+        json_bytes = len(b'[]\n')
+    saved = max(0, json_bytes - len(text))
+    COMPACT_BYTES_SAVED.inc(request.path, saved)
+
+    response = Response(text, mimetype='text/plain')
+    response.headers['X-JSON-Bytes'] = str(json_bytes)
+    response.headers['X-Bytes-Saved'] = str(saved)
+    return response
+
+
 @data_bp.route('/fetch_data_pos', methods=['GET'])
 @swag_from({
     'tags': ['Data'],
@@ -37,7 +147,7 @@ logger = logging.getLogger(__name__)
             'default': 100,
             'description': 'Number of bars to fetch.'
         }
-    ],
+    ] + COMPACT_PARAMETERS,
     'responses': {
         200: {
             'description': 'Data fetched successfully.',
@@ -89,15 +199,12 @@ def fetch_data_pos_endpoint():
         if rates is None:
             return jsonify({"error": "Failed to get rates data"}), 404
         
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        return jsonify(df.to_dict(orient='records'))
+        return _bars_response(rates, _utc_records, symbol, timeframe, 'UTC')
     
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in fetch_data_pos: {str(e)}")
+        logger.error("Error in fetch_data_pos: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @data_bp.route('/fetch_data_range', methods=['GET'])
@@ -135,7 +242,7 @@ def fetch_data_pos_endpoint():
             'format': 'date-time',
             'description': 'End datetime in ISO format.'
         }
-    ],
+    ] + COMPACT_PARAMETERS,
     'responses': {
         200: {
             'description': 'Data fetched successfully.',
@@ -192,15 +299,12 @@ def fetch_data_range_endpoint():
         if rates is None:
             return jsonify({"error": "Failed to get rates data"}), 404
         
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        return jsonify(df.to_dict(orient='records'))
+        return _bars_response(rates, _utc_records, symbol, timeframe, 'UTC')
     
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        logger.error(f"Error in fetch_data_range: {str(e)}")
+        logger.error("Error in fetch_data_range: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 # =======================================================
@@ -213,12 +317,12 @@ def get_tick_data(symbol):
     """
     try:
         # Pastikan koneksi ke MT5 aktif
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /data/tick")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /data/tick")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
 
         # Ambil informasi tick terakhir untuk simbol yang diminta
-        tick_info = mt5.symbol_info_tick(symbol)
+        tick_info = tick_cache.get(symbol)
 
         # Jika simbol tidak valid atau tidak ada data, kembalikan error 404
         if tick_info is None:
@@ -233,7 +337,7 @@ def get_tick_data(symbol):
         return jsonify(tick_data)
 
     except Exception as e:
-        logger.exception(f"CRITICAL ERROR in /data/tick for symbol {symbol}")
+        logger.exception("CRITICAL ERROR in /data/tick for symbol %s", symbol)
         return jsonify({"error": "Internal server error"}), 500
 
 
@@ -268,7 +372,7 @@ def get_tick_data(symbol):
             'default': 100,
             'description': 'Number of bars (candles) to fetch.'
         }
-    ],
+    ] + COMPACT_PARAMETERS,
     'responses': {
         200: {
             'description': 'OHLCV data fetched successfully.',
@@ -322,40 +426,153 @@ def get_ohlcv_data():
         if mt5_timeframe is None:
             return jsonify({"error": f"Invalid timeframe: {timeframe_str}"}), 400
         
-        # Ambil data dari MetaTrader 5
-        # Argumen ke-3 (0) berarti mulai dari bar saat ini (paling baru)
-        rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, count)
+        # Ambil data dari cache bar (hanya bar terakhir yang diminta ulang ke MetaTrader 5)
+        rates = bar_cache.rates(symbol, mt5_timeframe, count)
         
         # Jika MT5 tidak mengembalikan data (misal simbol salah)
         if rates is None or len(rates) == 0:
-            logger.error(f"Could not retrieve rates for {symbol} on timeframe {timeframe_str}")
+            logger.error("Could not retrieve rates for %s on timeframe %s", symbol, timeframe_str)
             return jsonify({"error": f"Failed to get OHLCV data for {symbol}"}), 404
         
-        # Konversi ke DataFrame Pandas agar mudah diolah
-        df = pd.DataFrame(rates)
-        
-        # --- BLOK PERUBAHAN ZONA WAKTU DIMULAI DI SINI ---
+        # Kembalikan data dalam format JSON (atau teks ringkas dengan format=compact)
+        return _bars_response(rates, _jakarta_records, symbol, timeframe_str, 'Asia/Jakarta')
+    
+    except ValueError:
+        # Error jika 'count' bukan angka integer
+        return jsonify({"error": "Invalid 'count' parameter. Must be an integer."}), 400
+    except Exception as e:
+        logger.error("Error in /ohlcv endpoint: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@data_bp.route('/ohlcv/mtf', methods=['GET'])
+@swag_from({
+    'tags': ['Data'],
+    'summary': 'Get aligned multi-timeframe OHLCV data',
+    'description': 'Retrieve OHLCV bars for several timeframes in one call, with index arrays mapping every bar of a lower timeframe to the bar of each higher timeframe that contains it.',
+    'parameters': [
+        {
+            'name': 'symbol',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Symbol name to fetch data for (e.g., EURUSD).'
+        },
+        {
+            'name': 'timeframes',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'default': 'H4,H1,M15',
+            'description': 'Comma-separated timeframes (e.g., H4,H1,M15).'
+        },
+        {
+            'name': 'count',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 100,
+            'description': 'Number of bars to fetch per timeframe.'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Aligned OHLCV data fetched successfully.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'symbol': {'type': 'string'},
+                    'timezone': {'type': 'string'},
+                    'timeframes': {'type': 'array', 'items': {'type': 'string'}},
+                    'series': {
+                        'type': 'object',
+                        'description': 'OHLCV records per timeframe, in the same format as /ohlcv.'
+                    },
+                    'parents': {
+                        'type': 'object',
+                        'description': 'parents[lower][higher][i] is the index in series[higher] of the bar containing series[lower][i], or -1 when it is outside the fetched range.'
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid or missing request parameters.'
+        },
+        404: {
+            'description': 'Failed to get rates data from MT5, symbol might be invalid.'
+        },
+        500: {
+            'description': 'Internal server error.'
+        }
+    }
+})
+def get_ohlcv_mtf_data():
+    """
+    Get Aligned Multi-Timeframe OHLCV Data
+    ---
+    description: Retrieve OHLCV data for several timeframes with lower-to-higher timeframe bar mappings.
+    """
+    try:
+        symbol = request.args.get('symbol')
+        if not symbol:
+            return jsonify({"error": "Parameter 'symbol' is required"}), 400
+        try:
+            count = int(request.args.get('count', 100))
+        except ValueError:
+            return jsonify({"error": "Invalid 'count' parameter. Must be an integer."}), 400
+        if not 1 <= count <= bar_cache.max_bars:
+            return jsonify({"error": f"'count' must be between 1 and {bar_cache.max_bars}"}), 400
 
-        # 1. Konversi kolom waktu dari Unix timestamp ke datetime yang sadar-UTC
-        df['time'] = pd.to_datetime(df['time'], unit='s', utc=True)
+        names = [tf.strip().upper() for tf in request.args.get('timeframes', 'H4,H1,M15').split(',') if tf.strip()]
+        if not names:
+            return jsonify({"error": "Parameter 'timeframes' is empty"}), 400
+        try:
+            mt5_timeframes = {tf: get_timeframe(tf) for tf in names}
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        # Highest timeframe first
+        names = sorted(set(names), key=lambda tf: -TIMEFRAME_SECONDS[tf])
 
-        # 2. Tentukan zona waktu Jakarta
-        jakarta_tz = pytz.timezone('Asia/Jakarta')
+        rates = {}
+        for tf in names:
+            rates[tf] = bar_cache.rates(symbol, mt5_timeframes[tf], count)
+            if rates[tf] is None or len(rates[tf]) == 0:
+                logger.error("Could not retrieve rates for %s on timeframe %s", symbol, tf)
+                return jsonify({"error": f"Failed to get OHLCV data for {symbol} ({tf})"}), 404
 
-        # 3. Konversi kolom 'time' dari UTC ke zona waktu Jakarta
-        df['time'] = df['time'].dt.tz_convert(jakarta_tz)
+        # Map each bar to the higher-timeframe bar whose [open, open + length) contains its open time
+        parents = {}
+        for i, lower in enumerate(names):
+            child_times = rates[lower]['time']
+            parents[lower] = {}
+            for higher in names[:i]:
+                parent_times = rates[higher]['time']
+                # Bar end: the next bar's open, capped at the nominal length (MN1 is approximate)
+                ends = np.append(parent_times[1:], np.iinfo(np.int64).max)
+                ends = np.minimum(ends, parent_times + TIMEFRAME_SECONDS[higher])
+                index = np.searchsorted(parent_times, child_times, side='right') - 1
+                outside = (index < 0) | (child_times >= ends[np.maximum(index, 0)])
+                parents[lower][higher] = np.where(outside, -1, index)
 
-        # 4. (Opsional) Format ulang ke string agar lebih rapi dan konsisten
-        df['time'] = df['time'].dt.strftime('%Y-%m-%d %H:%M:%S %Z')
-        
-        # --- BLOK PERUBAHAN ZONA WAKTU SELESAI ---
+        # One timezone conversion for every series
+        all_times = pd.to_datetime(np.concatenate([rates[tf]['time'] for tf in names]), unit='s', utc=True)
+        labels = all_times.tz_convert(pytz.timezone('Asia/Jakarta')).strftime('%Y-%m-%d %H:%M:%S %Z')
+        series = {}
+        offset = 0
+        for tf in names:
+            df = pd.DataFrame(rates[tf])
+            df['time'] = labels[offset:offset + len(df)]
+            offset += len(df)
+            series[tf] = df.to_dict(orient='records')
+
+        return jsonify({
+            "symbol": symbol,
+            "timezone": "Asia/Jakarta",
+            "timeframes": names,
+            "series": series,
+            "parents": parents,
+        })
 
-        # Kembalikan data dalam format JSON
-        return jsonify(df.to_dict(orient='records'))
-    
-    except ValueError:
-        # Error jika 'count' bukan angka integer
-        return jsonify({"error": "Invalid 'count' parameter. Must be an integer."}), 400
     except Exception as e:
-        logger.error(f"Error in /ohlcv endpoint: {str(e)}")
+        logger.error("Error in /ohlcv/mtf endpoint: %s", e)
         return jsonify({"error": "Internal server error"}), 500
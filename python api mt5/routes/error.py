@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify
 import logging
-import MetaTrader5 as mt5
-from flasgger import swag_from
+from terminal import mt5
+from swagger import swag_from
 
 error_bp = Blueprint('error', __name__)
 logger = logging.getLogger(__name__)
@@ -35,7 +35,7 @@ def last_error_endpoint():
         error = mt5.last_error()
         return jsonify({"error_code": error[0], "error_message": error[1]})
     except Exception as e:
-        logger.error(f"Error in last_error: {str(e)}")
+        logger.error("Error in last_error: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @error_bp.route('/last_error_str', methods=['GET'])
@@ -66,5 +66,5 @@ def last_error_str_endpoint():
         error_code, error_str = mt5.last_error()
         return jsonify({"error_message": error_str})
     except Exception as e:
-        logger.error(f"Error in last_error_str: {str(e)}")
+        logger.error("Error in last_error_str: %s", e)
         return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
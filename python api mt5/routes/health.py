@@ -1,6 +1,12 @@
 from flask import Blueprint, jsonify
-import MetaTrader5 as mt5
-from flasgger import swag_from
+from swagger import swag_from
+from connection import connection
+from terminal import executor
+import startup
+from admission import controller as admission
+import prewarm
+import stop_manager
+from alerts import engine as alert_engine
 
 health_bp = Blueprint('health', __name__)
 
@@ -15,7 +21,17 @@ health_bp = Blueprint('health', __name__)
                 'properties': {
                     'status': {'type': 'string'},
                     'mt5_connected': {'type': 'boolean'},
-                    'mt5_initialized': {'type': 'boolean'}
+                    'mt5_initialized': {'type': 'boolean'},
+                    'connected_since': {'type': 'number'},
+                    'last_probe': {'type': 'number'},
+                    'last_error': {'type': 'array', 'items': {}},
+                    'reconnect_attempts': {'type': 'integer'},
+                    'executor': {'type': 'object'},
+                    'startup': {'type': 'object'},
+                    'admission': {'type': 'object'},
+                    'prewarm': {'type': 'object'},
+                    'stops': {'type': 'object'},
+                    'alerts': {'type': 'object'}
                 }
             }
         }
@@ -25,14 +41,19 @@ def health_check():
     """
     Health Check Endpoint
     ---
-    description: Check the health status of the application and MT5 connection.
+    description: Check the health status of the application and MT5 connection. Answers from the state cached by the connection monitor and never blocks on the terminal.
     responses:
       200:
         description: Health check successful
     """
-    initialized = mt5.initialize() if mt5 is not None else False
+    status = connection.status()
     return jsonify({
-        "status": "healthy",
-        "mt5_connected": mt5 is not None,
-        "mt5_initialized": initialized
+        "status": "healthy" if status["mt5_connected"] else "degraded",
+        **status,
+        "executor": executor.stats(),
+        "startup": startup.report(),
+        "admission": admission.stats(),
+        "prewarm": prewarm.stats(),
+        "stops": stop_manager.stats(),
+        "alerts": alert_engine.stats()
     }), 200
\ No newline at end of file
@@ -1,14 +1,28 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from terminal import mt5
+import time
 import logging
 from datetime import datetime
-from flasgger import swag_from
+from swagger import swag_from
+from cache import cached, no_store
 from lib import get_deal_from_ticket, get_order_from_ticket
 
 history_bp = Blueprint('history', __name__)
 logger = logging.getLogger(__name__)
 
+
+# Deal times are broker server time, which can run hours ahead of UTC
+FINAL_RANGE_AGE = 24 * 3600
+
+
+def _cache_if_closed(ticket):
+    """Skip caching while position ``ticket`` is open: its history can still change
+    without any write route invalidating it (e.g. a broker-side SL/TP close)."""
+    if mt5.positions_get(ticket=ticket):
+        no_store()
+
 @history_bp.route('/get_deal_from_ticket', methods=['GET'])
+@cached(60, tags=('history',))
 @swag_from({
     'tags': ['History'],
     'parameters': [
@@ -18,6 +32,22 @@ logger = logging.getLogger(__name__)
             'type': 'integer',
             'required': True,
             'description': 'Ticket number to retrieve deal information.'
+        },
+        {
+            'name': 'from_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'format': 'date-time',
+            'description': 'Start of the search window in ISO format (default: 15 minutes before now).'
+        },
+        {
+            'name': 'to_date',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'format': 'date-time',
+            'description': 'End of the search window in ISO format (default: now).'
         }
     ],
     'responses': {
@@ -42,7 +72,7 @@ logger = logging.getLogger(__name__)
             }
         },
         400: {
-            'description': 'Invalid ticket format.'
+            'description': 'Invalid ticket or date format.'
         },
         404: {
             'description': 'Failed to get deal information.'
@@ -64,19 +94,28 @@ def get_deal_from_ticket_endpoint():
             return jsonify({"error": "Ticket parameter is required"}), 400
         
         ticket = int(ticket)
-        deal = get_deal_from_ticket(ticket)
+        from_date = request.args.get('from_date')
+        to_date = request.args.get('to_date')
+        if bool(from_date) != bool(to_date):
+            return jsonify({"error": "from_date and to_date must be given together"}), 400
+        if from_date:
+            from_date = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
+            to_date = datetime.fromisoformat(to_date.replace('Z', '+00:00'))
+        deal = get_deal_from_ticket(ticket, from_date or None, to_date or None)
         if deal is None:
             return jsonify({"error": "Failed to get deal information"}), 404
-        
+
+        _cache_if_closed(ticket)
         return jsonify(deal)
     
     except ValueError:
-        return jsonify({"error": "Invalid ticket format"}), 400
+        return jsonify({"error": "Invalid ticket or date format"}), 400
     except Exception as e:
-        logger.error(f"Error in get_deal_from_ticket: {str(e)}")
+        logger.error("Error in get_deal_from_ticket: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @history_bp.route('/get_order_from_ticket', methods=['GET'])
+@cached(60, tags=('history',))
 @swag_from({
     'tags': ['History'],
     'parameters': [
@@ -125,16 +164,18 @@ def get_order_from_ticket_endpoint():
         order = get_order_from_ticket(ticket)
         if order is None:
             return jsonify({"error": "Failed to get order information"}), 404
-        
+
+        _cache_if_closed(ticket)
         return jsonify(order)
     
     except ValueError:
         return jsonify({"error": "Invalid ticket format"}), 400
     except Exception as e:
-        logger.error(f"Error in get_order_from_ticket: {str(e)}")
+        logger.error("Error in get_order_from_ticket: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @history_bp.route('/history_deals_get', methods=['GET'])
+@cached(60, tags=('history',))
 @swag_from({
     'tags': ['History'],
     'parameters': [
@@ -209,16 +250,19 @@ def history_deals_get_endpoint():
         if deals is None:
             return jsonify({"error": "Failed to get deals history"}), 404
         
+        if to_timestamp > time.time() - FINAL_RANGE_AGE:
+            _cache_if_closed(position)
         deals_list = [deal._asdict() for deal in deals]
         return jsonify(deals_list)
     
     except ValueError:
         return jsonify({"error": "Invalid parameter format"}), 400
     except Exception as e:
-        logger.error(f"Error in history_deals_get: {str(e)}")
+        logger.error("Error in history_deals_get: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @history_bp.route('/history_orders_get', methods=['GET'])
+@cached(60, tags=('history',))
 @swag_from({
     'tags': ['History'],
     'parameters': [
@@ -268,11 +312,12 @@ def history_orders_get_endpoint():
         if orders is None:
             return jsonify({"error": "Failed to get orders history"}), 404
         
+        _cache_if_closed(ticket)
         orders_list = [order._asdict() for order in orders]
         return jsonify(orders_list)
     
     except ValueError:
         return jsonify({"error": "Invalid ticket format"}), 400
     except Exception as e:
-        logger.error(f"Error in history_orders_get: {str(e)}")
+        logger.error("Error in history_orders_get: %s", e)
         return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
@@ -0,0 +1,27 @@
+from flask import Blueprint, Response
+from swagger import swag_from
+import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics')
+@swag_from({
+    'tags': ['Health'],
+    'produces': ['text/plain'],
+    'responses': {
+        200: {
+            'description': 'Metrics in Prometheus text exposition format',
+            'schema': {'type': 'string'}
+        }
+    }
+})
+def get_metrics():
+    """
+    Prometheus Metrics
+    ---
+    description: Request latency histograms per route, MT5 call latency histograms per function, in-flight gauges, executor queue depth, cache hit ratios and response byte counters.
+    responses:
+      200:
+        description: Metrics in Prometheus text exposition format
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
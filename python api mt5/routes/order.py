@@ -1,8 +1,14 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from terminal import mt5, trade_priority
+from connection import connection
 import logging
-from flasgger import swag_from
+from swagger import swag_from
+from cache import invalidates
 from auth import api_key_required
+from market_cache import symbol_specs, tick_cache
+import trade_validation
+import execution
+from trade_validation import OrderRejected
 
 order_bp = Blueprint('order', __name__)
 logger = logging.getLogger(__name__)
@@ -16,11 +22,13 @@ ORDER_TYPE_MAPPING = {
 
 @order_bp.route('/order', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 def trade_order_endpoint():
     try:
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /order")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /order")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
         data = request.get_json(force=True)
         if not data: return jsonify({"error": "Request body tidak boleh kosong"}), 400
         required_fields = ['symbol', 'volume', 'type']
@@ -33,28 +41,56 @@ def trade_order_endpoint():
         if trade_action == mt5.TRADE_ACTION_PENDING:
             if 'price' not in data or data['price'] <= 0: return jsonify({"error": "Parameter 'price' wajib untuk pending order"}), 400
             request_data["price"] = data['price']
+        elif data.get('price', 0) > 0:
+            # Reference for max_slippage; the order itself is priced from a fresh tick
+            request_data["price"] = data['price']
+        try:
+            retry = execution.options_from(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         if 'sl' in data and data['sl'] > 0: request_data["sl"] = data['sl']
         if 'tp' in data and data['tp'] > 0: request_data["tp"] = data['tp']
-        result = mt5.order_send(request_data)
+        adjustments = []
+        if trade_validation.enabled():
+            spec = symbol_specs.get(data['symbol'])
+            tick = tick_cache.get(data['symbol'])
+            if spec is None or tick is None: return jsonify({"error": f"Simbol '{data['symbol']}' tidak ditemukan"}), 404
+            try:
+                request_data, adjustments = trade_validation.normalize_order(request_data, spec, tick)
+            except OrderRejected as e:
+                logger.warning("Order rejected before order_send: %s", e)
+                return jsonify({"error": f"Order rejected: {e}", "field": e.field}), 400
+            if adjustments: logger.info("Order for %s normalized: %s", data['symbol'], adjustments)
+        if trade_action == mt5.TRADE_ACTION_DEAL:
+            result, attempts = execution.send_market(request_data, **retry)
+        else:
+            result, attempts = mt5.order_send(request_data), []
+        if attempts and not attempts[-1]['sent'] and result is None:
+            # Not sent: no price or already past max_slippage
+            logger.error("Order for %s not sent: %s", data['symbol'], attempts[-1]['comment'])
+            return jsonify({"error": f"Order failed: {attempts[-1]['comment']}", "adjustments": adjustments, "attempts": attempts}), 400
         if result is None:
-            logger.error(f"Gagal mengirim permintaan order. mt5.order_send() mengembalikan None.")
-            last_error = mt5.last_error()
-            return jsonify({"error": "Failed to send request. order_send() returned None.", "last_error": last_error}), 500
+            logger.error("Gagal mengirim permintaan order. mt5.order_send() mengembalikan None.")
+            last_error = attempts[-1]['last_error'] if attempts else mt5.last_error()
+            return jsonify({"error": "Failed to send request. order_send() returned None.", "last_error": last_error, "attempts": attempts}), 500
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Order send failed. Retcode: {result.retcode}, Comment: {result.comment}")
-            return jsonify({"error": f"Order failed: {result.comment}", "result": result._asdict()}), 400
-        return jsonify({"message": "Order sent successfully", "result": result._asdict()})
+            logger.error("Order send failed. Retcode: %s, Comment: %s", result.retcode, result.comment)
+            error = attempts[-1]['comment'] if attempts and not attempts[-1]['sent'] else result.comment
+            return jsonify({"error": f"Order failed: {error}", "result": result._asdict(), "adjustments": adjustments, "attempts": attempts}), 400
+        return jsonify({"message": "Order sent successfully", "result": result._asdict(), "adjustments": adjustments, "attempts": attempts})
     except Exception:
         logger.exception("CRITICAL ERROR in /order endpoint")
         return jsonify({"error": "Internal server error"}), 500
 
 @order_bp.route('/order/cancel', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 def cancel_pending_order():
     try:
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /order/cancel")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /order/cancel")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
         data = request.get_json(force=True)
         if not data or 'ticket' not in data: return jsonify({"error": "Nomor 'ticket' wajib diisi"}), 400
         ticket = data['ticket']
@@ -64,13 +100,13 @@ def cancel_pending_order():
         }
         result = mt5.order_send(cancel_request)
         if result is None:
-            logger.error(f"Gagal mengirim permintaan cancel untuk tiket #{ticket}. mt5.order_send() mengembalikan None.")
+            logger.error("Gagal mengirim permintaan cancel untuk tiket #%s. mt5.order_send() mengembalikan None.", ticket)
             last_error = mt5.last_error()
             return jsonify({"error": "Failed to send cancel request. order_send() returned None.", "last_error": last_error}), 500
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Gagal membatalkan order #{ticket}. Code: {result.retcode}")
+            logger.error("Gagal membatalkan order #%s. Code: %s", ticket, result.retcode)
             return jsonify({"error": f"Gagal membatalkan order: {result.comment}", "result": result._asdict()}), 500
         return jsonify({"message": f"Order #{ticket} berhasil dibatalkan.", "result": result._asdict()})
     except Exception:
-        logger.exception(f"CRITICAL ERROR in /order/cancel endpoint")
+        logger.exception("CRITICAL ERROR in /order/cancel endpoint")
         return jsonify({"error": "Internal server error"}), 500
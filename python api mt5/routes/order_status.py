@@ -1,7 +1,8 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from terminal import mt5
+from connection import connection
 import logging
-from flasgger import swag_from
+from swagger import swag_from
 from auth import api_key_required
 
 order_status_bp = Blueprint('order_status', __name__)
@@ -56,9 +57,9 @@ def get_order_status_endpoint(ticket):
     This endpoint checks both active positions and pending orders.
     """
     try:
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /order/status")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /order/status")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
         
         # Check if it's an active position first
         positions = mt5.positions_get(ticket=ticket)
@@ -67,7 +68,7 @@ def get_order_status_endpoint(ticket):
             position_dict = position._asdict()
             position_dict['status'] = 'ACTIVE'
             position_dict['state'] = 'FILLED'
-            logger.info(f"Order #{ticket} found as active position")
+            logger.info("Order #%s found as active position", ticket)
             return jsonify(position_dict), 200
         
         # Check if it's a pending order
@@ -76,7 +77,7 @@ def get_order_status_endpoint(ticket):
             order = orders[0]
             order_dict = order._asdict()
             order_dict['status'] = 'PENDING'
-            logger.info(f"Order #{ticket} found as pending order")
+            logger.info("Order #%s found as pending order", ticket)
             return jsonify(order_dict), 200
         
         # Check historical orders/deals (order was executed or cancelled)
@@ -102,7 +103,7 @@ def get_order_status_endpoint(ticket):
             else:
                 order_dict['status'] = 'UNKNOWN'
             
-            logger.info(f"Order #{ticket} found in history with status: {order_dict['status']}")
+            logger.info("Order #%s found in history with status: %s", ticket, order_dict['status'])
             return jsonify(order_dict), 200
         
         # Check historical deals
@@ -112,11 +113,11 @@ def get_order_status_endpoint(ticket):
             deal_dict = deal._asdict()
             deal_dict['status'] = 'CLOSED'
             deal_dict['ticket'] = ticket
-            logger.info(f"Order #{ticket} found as closed deal")
+            logger.info("Order #%s found as closed deal", ticket)
             return jsonify(deal_dict), 200
         
         # Order not found anywhere
-        logger.warning(f"Order #{ticket} not found in any MT5 records")
+        logger.warning("Order #%s not found in any MT5 records", ticket)
         return jsonify({
             "error": f"Order with ticket #{ticket} not found",
             "ticket": ticket,
@@ -124,7 +125,7 @@ def get_order_status_endpoint(ticket):
         }), 404
         
     except Exception as e:
-        logger.exception(f"CRITICAL ERROR in /order/status/{ticket} endpoint")
+        logger.exception("CRITICAL ERROR in /order/status/%s endpoint", ticket)
         return jsonify({"error": "Internal server error"}), 500
 
 @order_status_bp.route('/order/status', methods=['GET'])
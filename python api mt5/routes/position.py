@@ -1,15 +1,24 @@
 from flask import Blueprint, jsonify, request
-import MetaTrader5 as mt5
+from types import SimpleNamespace
+from terminal import mt5, trade_priority
+from connection import connection
 import logging
 from lib import close_position, close_all_positions, get_positions
-from flasgger import swag_from
+from swagger import swag_from
+from cache import cached, invalidates
 from auth import api_key_required
+from market_cache import symbol_specs, tick_cache
+import trade_validation
+import execution
+from trade_validation import OrderRejected
 
 position_bp = Blueprint('position', __name__)
 logger = logging.getLogger(__name__)
 
 @position_bp.route('/close_position', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 @swag_from({
     'tags': ['Position'],
     'parameters': [
@@ -29,7 +38,10 @@ logger = logging.getLogger(__name__)
                             'volume': {'type': 'number'}
                         },
                         'required': ['type', 'ticket', 'symbol', 'volume']
-                    }
+                    },
+                    'max_slippage': {'type': 'number', 'description': 'Maximum adverse price movement in points across requote retries.'},
+                    'deadline_ms': {'type': 'number', 'description': 'Stop retrying requotes after this many milliseconds.'},
+                    'max_retries': {'type': 'integer', 'description': 'Maximum number of requote retries.'}
                 },
                 'required': ['position']
             }
@@ -42,6 +54,7 @@ logger = logging.getLogger(__name__)
                 'type': 'object',
                 'properties': {
                     'message': {'type': 'string'},
+                    'attempts': {'type': 'array', 'items': {'type': 'object'}},
                     'result': {
                         'type': 'object',
                         'properties': {
@@ -75,18 +88,30 @@ def close_position_endpoint():
         if not data or 'position' not in data:
             return jsonify({"error": "Position data is required"}), 400
         
-        result = close_position(data['position'])
+        try:
+            retry = execution.options_from(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        attempts = []
+        result = close_position(data['position'], attempts=attempts, **retry)
         if result is None:
-            return jsonify({"error": "Failed to close position"}), 400
+            if attempts and attempts[-1]['sent'] and attempts[-1]['retcode'] is None:
+                # Reached the terminal but order_send() returned None
+                return jsonify({"error": "Failed to close position. order_send() returned None.",
+                                "last_error": attempts[-1]['last_error'], "attempts": attempts}), 500
+            return jsonify({"error": "Failed to close position", "attempts": attempts}), 400
         
-        return jsonify({"message": "Position closed successfully", "result": result._asdict()})
+        return jsonify({"message": "Position closed successfully", "result": result._asdict(), "attempts": attempts})
     
     except Exception as e:
-        logger.error(f"Error in close_position: {str(e)}")
+        logger.error("Error in close_position: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @position_bp.route('/close_all_positions', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 @swag_from({
     'tags': ['Position'],
     'parameters': [
@@ -156,21 +181,23 @@ def close_all_positions_endpoint():
         })
     
     except Exception as e:
-        logger.error(f"Error in close_all_positions: {str(e)}")
+        logger.error("Error in close_all_positions: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 # TEMPELKAN KODE BARU INI
 @position_bp.route('/modify_sl_tp', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 def modify_sl_tp_endpoint():
     """
     Memodifikasi Stop Loss (SL) dan Take Profit (TP) untuk posisi yang berjalan.
     """
     position_ticket = None
     try:
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /modify_sl_tp")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /modify_sl_tp")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
 
         data = request.get_json(force=True)
         if not data or 'position' not in data:
@@ -188,6 +215,18 @@ def modify_sl_tp_endpoint():
         if not pos:
             return jsonify({"error": f"Posisi dengan tiket {position_ticket} tidak ditemukan."}), 404
 
+        # Validasi & pembulatan SL/TP terhadap spesifikasi simbol sebelum dikirim ke terminal
+        adjustments = []
+        if trade_validation.enabled():
+            spec = symbol_specs.get(pos[0].symbol)
+            tick = tick_cache.get(pos[0].symbol)
+            if spec is not None and tick is not None:
+                try:
+                    sl, tp, adjustments = trade_validation.normalize_sltp(pos[0], sl, tp, spec, tick)
+                except OrderRejected as e:
+                    logger.warning("SL/TP for #%s rejected before order_send: %s", position_ticket, e)
+                    return jsonify({"error": f"SL/TP rejected: {e}", "field": e.field}), 400
+
         request_data = {
             "action": mt5.TRADE_ACTION_SLTP,
             "position": position_ticket,
@@ -199,7 +238,7 @@ def modify_sl_tp_endpoint():
         result = mt5.order_send(request_data)
 
         if result is None:
-            logger.error(f"Gagal mengirim permintaan SL/TP untuk tiket #{position_ticket}. mt5.order_send() mengembalikan None.")
+            logger.error("Gagal mengirim permintaan SL/TP untuk tiket #%s. mt5.order_send() mengembalikan None.", position_ticket)
             last_error = mt5.last_error()
             return jsonify({
                 "error": "Failed to send SL/TP request to terminal. order_send() returned None.",
@@ -207,13 +246,174 @@ def modify_sl_tp_endpoint():
             }), 500
 
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Gagal memodifikasi SL/TP untuk #{position_ticket}. Comment: {result.comment}")
+            logger.error("Gagal memodifikasi SL/TP untuk #%s. Comment: %s", position_ticket, result.comment)
             return jsonify({"error": f"Gagal memodifikasi SL/TP: {result.comment}", "result": result._asdict()}), 500
         
-        return jsonify({"message": f"SL/TP untuk posisi #{position_ticket} berhasil dimodifikasi.", "result": result._asdict()})
+        return jsonify({"message": f"SL/TP untuk posisi #{position_ticket} berhasil dimodifikasi.", "result": result._asdict(), "adjustments": adjustments})
 
     except Exception as e:
-        logger.exception(f"CRITICAL ERROR in /modify_sl_tp endpoint for ticket #{position_ticket}")
+        logger.exception("CRITICAL ERROR in /modify_sl_tp endpoint for ticket #%s", position_ticket)
+        return jsonify({"error": "Internal server error"}), 500
+
+MAX_BATCH_MODIFICATIONS = 200
+
+@position_bp.route('/modify_sl_tp/batch', methods=['POST'])
+@api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
+@swag_from({
+    'tags': ['Position'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'modifications': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'position': {'type': 'integer'},
+                                'sl': {'type': 'number', 'description': 'New SL; omit to keep the current one, 0 removes it.'},
+                                'tp': {'type': 'number', 'description': 'New TP; omit to keep the current one, 0 removes it.'}
+                            },
+                            'required': ['position']
+                        }
+                    }
+                },
+                'required': ['modifications']
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Outcome of every modification, in request order.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'results': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'position': {'type': 'integer'},
+                                'status': {'type': 'string', 'enum': ['done', 'unchanged', 'rejected', 'not_found', 'failed']},
+                                'sl': {'type': 'number'},
+                                'tp': {'type': 'number'},
+                                'retcode': {'type': 'integer'},
+                                'error': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'summary': {'type': 'object'}
+                }
+            }
+        },
+        400: {'description': 'Invalid request body.'},
+        503: {'description': 'MT5 terminal not connected.'},
+        500: {'description': 'Internal server error.'}
+    }
+})
+def modify_sl_tp_batch_endpoint():
+    """
+    Modify SL/TP of Many Positions
+    ---
+    description: Change the SL and/or TP of many positions in one request. Symbols and current levels come from a single positions snapshot, modifications that would not change anything are skipped, and the rest are sent back-to-back. Every item gets its own outcome.
+    """
+    try:
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /modify_sl_tp/batch")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
+
+        data = request.get_json(force=True, silent=True) or {}
+        items = data.get('modifications')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "'modifications' must be a non-empty list"}), 400
+        if len(items) > MAX_BATCH_MODIFICATIONS:
+            return jsonify({"error": f"At most {MAX_BATCH_MODIFICATIONS} modifications per request"}), 400
+        requested = []
+        for item in items:
+            if not isinstance(item, dict) or 'position' not in item:
+                return jsonify({"error": "Every modification needs a 'position' ticket"}), 400
+            # Tickets may arrive as JSON strings; the positions snapshot is keyed by int
+            position = item['position']
+            try:
+                if isinstance(position, bool) or (isinstance(position, float) and not position.is_integer()):
+                    raise ValueError
+                ticket = int(position)
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Invalid position ticket: {position!r}"}), 400
+            if 'sl' not in item and 'tp' not in item:
+                return jsonify({"error": f"Modification for #{ticket} needs 'sl' or 'tp'"}), 400
+            try:
+                # None keeps the current level
+                requested.append((ticket, float(item['sl']) if 'sl' in item else None,
+                                  float(item['tp']) if 'tp' in item else None))
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Invalid SL/TP value for #{ticket}"}), 400
+
+        positions = {p.ticket: p for p in mt5.positions_get() or ()}
+        # Levels set earlier in this batch (a ticket may appear more than once)
+        levels = {}
+        specs, ticks = {}, {}
+        results = []
+        for ticket, sl, tp in requested:
+            pos = positions.get(ticket)
+            if pos is None:
+                results.append({"position": ticket, "status": "not_found", "error": f"Posisi dengan tiket {ticket} tidak ditemukan."})
+                continue
+            current_sl, current_tp = levels.get(ticket, (pos.sl, pos.tp))
+            sl = current_sl if sl is None else sl
+            tp = current_tp if tp is None else tp
+            entry = {"position": ticket, "symbol": pos.symbol}
+            # Only levels that change are validated: a no-op is never rejected
+            if sl == current_sl and tp == current_tp:
+                results.append({**entry, "sl": sl, "tp": tp, "status": "unchanged"})
+                continue
+
+            if trade_validation.enabled():
+                if pos.symbol not in specs:
+                    specs[pos.symbol] = symbol_specs.get(pos.symbol)
+                    ticks[pos.symbol] = tick_cache.get(pos.symbol)
+                spec, tick = specs[pos.symbol], ticks[pos.symbol]
+                if spec is not None and tick is not None:
+                    try:
+                        current = SimpleNamespace(type=pos.type, sl=current_sl, tp=current_tp)
+                        sl, tp, adjustments = trade_validation.normalize_sltp(current, sl, tp, spec, tick)
+                    except OrderRejected as e:
+                        results.append({**entry, "status": "rejected", "error": str(e), "field": e.field})
+                        continue
+                    if adjustments:
+                        entry["adjustments"] = adjustments
+
+            entry.update(sl=sl, tp=tp)
+            if sl == current_sl and tp == current_tp:
+                # Normalization rounded the request back to the current levels
+                results.append({**entry, "status": "unchanged"})
+                continue
+
+            result = mt5.order_send({"action": mt5.TRADE_ACTION_SLTP, "position": ticket, "symbol": pos.symbol, "sl": sl, "tp": tp})
+            if result is None:
+                results.append({**entry, "status": "failed", "error": "order_send() returned None", "last_error": mt5.last_error()})
+            elif result.retcode != mt5.TRADE_RETCODE_DONE:
+                results.append({**entry, "status": "failed", "retcode": result.retcode, "error": result.comment})
+            else:
+                levels[ticket] = (sl, tp)
+                results.append({**entry, "status": "done", "retcode": result.retcode})
+
+        summary = {}
+        for entry in results:
+            summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+        failed = len(results) - summary.get("done", 0) - summary.get("unchanged", 0)
+        if failed:
+            logger.warning("SL/TP batch: %s", summary)
+        return jsonify({"results": results, "summary": summary})
+
+    except Exception:
+        logger.exception("CRITICAL ERROR in /modify_sl_tp/batch endpoint")
         return jsonify({"error": "Internal server error"}), 500
 
 @position_bp.route('/get_positions', methods=['GET'])
@@ -288,11 +488,12 @@ def get_positions_endpoint():
         return jsonify(positions_df.to_dict(orient='records')), 200
     
     except Exception as e:
-        logger.error(f"Error in get_positions: {str(e)}")
+        logger.error("Error in get_positions: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 @position_bp.route('/positions_total', methods=['GET'])
 @api_key_required
+@cached(1, tags=('positions',))
 @swag_from({
     'tags': ['Position'],
     'responses': {
@@ -327,7 +528,7 @@ def positions_total_endpoint():
         return jsonify({"total": total})
     
     except Exception as e:
-        logger.error(f"Error in positions_total: {str(e)}")
+        logger.error("Error in positions_total: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 
@@ -341,15 +542,17 @@ def positions_total_endpoint():
 # =======================================================
 @position_bp.route('/position/close_by_ticket', methods=['POST'])
 @api_key_required
+@trade_priority
+@invalidates('positions', 'orders', 'history')
 def close_position_by_ticket_simple():
     """
     Menutup posisi trading hanya berdasarkan nomor tiket.
     """
     ticket = None
     try:
-        if not mt5.initialize():
-            logger.error("MT5 initialize failed on /position/close_by_ticket")
-            return jsonify({"error": "MT5 initialize failed"}), 500
+        if not connection.ensure_connected():
+            logger.error("MT5 not connected on /position/close_by_ticket")
+            return jsonify({"error": "MT5 terminal not connected"}), 503
         
         data = request.get_json(force=True)
         if not data or 'ticket' not in data: return jsonify({"error": "Nomor 'ticket' wajib diisi"}), 400
@@ -361,30 +564,36 @@ def close_position_by_ticket_simple():
         
         position = position[0]
         order_type_close = mt5.ORDER_TYPE_SELL if position.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
-        tick = mt5.symbol_info_tick(position.symbol)
-        
-        if tick is None: return jsonify({"error": "Gagal mendapatkan harga tick"}), 500
-        
-        price = tick.ask if order_type_close == mt5.ORDER_TYPE_SELL else tick.bid
-        close_request = {"action": mt5.TRADE_ACTION_DEAL, "position": ticket, "symbol": position.symbol, "volume": position.volume, "type": order_type_close, "price": price, "deviation": 20, "comment": f"Closed by API #{ticket}", "type_time": mt5.ORDER_TIME_GTC, "type_filling": mt5.ORDER_FILLING_IOC}
+        try:
+            retry = execution.options_from(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Priced (and re-priced on requotes) from a fresh tick by send_market
+        close_request = {"action": mt5.TRADE_ACTION_DEAL, "position": ticket, "symbol": position.symbol, "volume": position.volume, "type": order_type_close, "deviation": 20, "comment": f"Closed by API #{ticket}", "type_time": mt5.ORDER_TIME_GTC, "type_filling": mt5.ORDER_FILLING_IOC}
         
-        result = mt5.order_send(close_request)
+        result, attempts = execution.send_market(close_request, **retry)
 
         # INI PERBAIKANNYA - MENAMBAHKAN PENGECEKAN 'None'
         if result is None:
-            logger.error(f"Gagal mengirim permintaan close untuk tiket #{ticket}. mt5.order_send() mengembalikan None.")
-            last_error = mt5.last_error()
+            if not attempts[-1]['sent']:
+                # Not sent: no tick or already past max_slippage
+                return jsonify({"error": f"Gagal menutup posisi: {attempts[-1]['comment']}", "attempts": attempts}), 500
+            logger.error("Gagal mengirim permintaan close untuk tiket #%s. mt5.order_send() mengembalikan None.", ticket)
+            last_error = attempts[-1]['last_error']
             return jsonify({
                 "error": "Failed to send close request to terminal. order_send() returned None.",
-                "last_error": last_error
+                "last_error": last_error,
+                "attempts": attempts
             }), 500
 
         if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Gagal menutup posisi #{ticket}. Comment: {result.comment}")
-            return jsonify({"error": f"Gagal menutup posisi: {result.comment}", "result": result._asdict()}), 500
+            error = attempts[-1]['comment'] if not attempts[-1]['sent'] else result.comment
+            logger.error("Gagal menutup posisi #%s. Comment: %s", ticket, error)
+            return jsonify({"error": f"Gagal menutup posisi: {error}", "result": result._asdict(), "attempts": attempts}), 500
         
-        return jsonify({"message": f"Posisi #{ticket} berhasil ditutup.", "result": result._asdict()})
+        return jsonify({"message": f"Posisi #{ticket} berhasil ditutup.", "result": result._asdict(), "attempts": attempts})
         
     except Exception as e:
-        logger.exception(f"CRITICAL ERROR in /position/close_by_ticket endpoint for ticket #{ticket}")
+        logger.exception("CRITICAL ERROR in /position/close_by_ticket endpoint for ticket #%s", ticket)
         return jsonify({"error": "Internal server error"}), 500
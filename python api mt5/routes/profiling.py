@@ -0,0 +1,125 @@
+from flask import Blueprint, jsonify, request, Response
+import logging
+from swagger import swag_from
+from auth import api_key_required
+import profiling
+
+profiling_bp = Blueprint('profiling', __name__)
+logger = logging.getLogger(__name__)
+
+@profiling_bp.route('/debug/profiles', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Debug'],
+    'responses': {
+        200: {
+            'description': 'Buffered request profiles, newest first.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'profiles': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'integer'},
+                                'mode': {'type': 'string', 'enum': ['stacks', 'pstats']},
+                                'method': {'type': 'string'},
+                                'path': {'type': 'string'},
+                                'route': {'type': 'string'},
+                                'status': {'type': 'integer'},
+                                'started': {'type': 'number'},
+                                'duration_ms': {'type': 'number'},
+                                'samples': {'type': 'integer'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+})
+def list_profiles_endpoint():
+    """
+    List Request Profiles
+    ---
+    description: Profiles are captured for requests sent with an `X-Profile` header (`stacks` or `pstats`) and a valid API key, or for a `PROFILE_SAMPLE_RATE` fraction of all requests. The id of a captured profile is returned in the `X-Profile-Id` response header.
+    responses:
+      200:
+        description: Buffered request profiles, newest first.
+    """
+    return jsonify({"profiles": profiling.list_profiles()})
+
+@profiling_bp.route('/debug/profiles/<int:profile_id>', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Debug'],
+    'parameters': [
+        {
+            'name': 'profile_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'Profile id from the X-Profile-Id response header.'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['collapsed', 'pstats', 'text'],
+            'required': False,
+            'description': 'collapsed (stacks mode, default), pstats (binary file) or text (pstats table).'
+        }
+    ],
+    'responses': {
+        200: {'description': 'Profile data.'},
+        400: {'description': 'Format not available for this profile.'},
+        404: {'description': 'Profile not found (it may have been evicted from the buffer).'}
+    }
+})
+def get_profile_endpoint(profile_id):
+    """
+    Fetch Request Profile
+    ---
+    description: Download one profile as collapsed stacks (for flamegraph.pl or speedscope), a binary .pstats file (for snakeviz or the pstats module) or a text table.
+    responses:
+      200:
+        description: Profile data.
+    """
+    entry = profiling.get_profile(profile_id)
+    if entry is None:
+        return jsonify({"error": f"Profile {profile_id} not found"}), 404
+
+    fmt = request.args.get('format', 'collapsed' if entry["mode"] == 'stacks' else 'text')
+    if fmt == 'collapsed' and 'collapsed' in entry:
+        return Response(entry["collapsed"], mimetype='text/plain')
+    if fmt == 'pstats' and 'pstats' in entry:
+        return Response(entry["pstats"], mimetype='application/octet-stream',
+                        headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.pstats'})
+    if fmt == 'text' and 'pstats' in entry:
+        try:
+            return Response(profiling.pstats_text(entry), mimetype='text/plain')
+        except Exception as e:
+            logger.error("Error rendering profile %s: %s", profile_id, e)
+            return jsonify({"error": "Internal server error"}), 500
+    return jsonify({"error": f"Format '{fmt}' is not available for a {entry['mode']} profile"}), 400
+
+@profiling_bp.route('/debug/profiles', methods=['DELETE'])
+@api_key_required
+@swag_from({
+    'tags': ['Debug'],
+    'responses': {
+        200: {'description': 'Profile buffer cleared.'}
+    }
+})
+def clear_profiles_endpoint():
+    """
+    Clear Request Profiles
+    ---
+    description: Drop every buffered profile.
+    responses:
+      200:
+        description: Profile buffer cleared.
+    """
+    profiling.clear()
+    return jsonify({"message": "Profiles cleared"})
@@ -0,0 +1,206 @@
+from flask import Blueprint, jsonify, request
+import logging
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from swagger import swag_from
+from connection import connection
+from constants import TIMEFRAME_SECONDS
+from lib import get_timeframe
+from market_cache import bar_cache, symbol_specs
+from sessions import calendar, server_to_utc, slice_sessions, utc_iso, SESSIONS
+
+session_bp = Blueprint('session', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_SESSION_DAYS = 60
+
+@session_bp.route('/sessions', methods=['GET'])
+@swag_from({
+    'tags': ['Data'],
+    'responses': {
+        200: {
+            'description': 'Session definitions and today\'s boundaries in UTC.',
+            'schema': {'type': 'object'}
+        }
+    }
+})
+def list_sessions():
+    """
+    Trading Sessions
+    ---
+    description: List the trading sessions and ICT killzones with their local definition and today's UTC start and end (daylight saving aware).
+    """
+    today = calendar.today()
+    return jsonify({
+        name: {"start_local": start.strftime('%H:%M'), "end_local": end.strftime('%H:%M'), **today[name]}
+        for name, (tz, start, end) in SESSIONS.items()
+    })
+
+@session_bp.route('/sessions/<string:symbol>', methods=['GET'])
+@swag_from({
+    'tags': ['Data'],
+    'parameters': [
+        {
+            'name': 'symbol',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Symbol name (e.g., EURUSD).'
+        },
+        {
+            'name': 'session',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Session or killzone name (see GET /sessions), e.g. london, new_york_killzone.'
+        },
+        {
+            'name': 'days',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'default': 5,
+            'description': f'Number of most recent sessions with bars (max {MAX_SESSION_DAYS}).'
+        },
+        {
+            'name': 'timeframe',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'default': 'M15',
+            'description': 'Intraday timeframe of the bars (M1 to H4).'
+        },
+        {
+            'name': 'include_bars',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'default': False,
+            'description': 'Include the bars of every session.'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Session statistics, newest last.',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'symbol': {'type': 'string'},
+                    'session': {'type': 'string'},
+                    'timeframe': {'type': 'string'},
+                    'sessions': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'date': {'type': 'string'},
+                                'start': {'type': 'string', 'format': 'date-time'},
+                                'end': {'type': 'string', 'format': 'date-time'},
+                                'open': {'type': 'number'},
+                                'high': {'type': 'number'},
+                                'low': {'type': 'number'},
+                                'close': {'type': 'number'},
+                                'high_time': {'type': 'string', 'format': 'date-time'},
+                                'low_time': {'type': 'string', 'format': 'date-time'},
+                                'range_points': {'type': 'integer'},
+                                'tick_volume': {'type': 'integer'},
+                                'bars': {'type': 'integer'},
+                                'in_progress': {'type': 'boolean'}
+                            }
+                        }
+                    },
+                    'truncated': {'type': 'boolean', 'description': 'Present when fewer than `days` sessions fit in the bar cache limit.'},
+                    'warning': {'type': 'string'}
+                }
+            }
+        },
+        400: {'description': 'Invalid request parameters.'},
+        404: {'description': 'Failed to get rates data.'},
+        503: {'description': 'MT5 terminal not connected.'},
+        500: {'description': 'Internal server error.'}
+    }
+})
+def get_session_stats(symbol):
+    """
+    Session Statistics
+    ---
+    description: Bars, range and high / low of a trading session or killzone over the last N days, sliced from cached bars with a precomputed daylight saving aware session calendar. Times are UTC; bar times are converted from the broker server time zone (MT5_SERVER_TZ).
+    """
+    try:
+        name = request.args.get('session', '').lower()
+        if name not in SESSIONS:
+            return jsonify({"error": f"Invalid session: '{name}'. Valid options are: {', '.join(SESSIONS)}."}), 400
+        timeframe = request.args.get('timeframe', 'M15').upper()
+        days = int(request.args.get('days', 5))
+        include_bars = request.args.get('include_bars', 'false').lower() in ('1', 'true', 'yes')
+        mt5_timeframe = get_timeframe(timeframe)
+        step = TIMEFRAME_SECONDS[timeframe]
+        if step >= TIMEFRAME_SECONDS['D1']:
+            return jsonify({"error": "Sessions need an intraday timeframe (M1 to H4)"}), 400
+        if not 1 <= days <= MAX_SESSION_DAYS:
+            return jsonify({"error": f"'days' must be between 1 and {MAX_SESSION_DAYS}"}), 400
+
+        if not connection.ensure_connected():
+            return jsonify({"error": "MT5 terminal not connected"}), 503
+
+        latest = bar_cache.rates(symbol, mt5_timeframe, 1)
+        if latest is None or len(latest) == 0:
+            return jsonify({"error": f"Failed to get rates data for {symbol}"}), 404
+        last_time = int(server_to_utc(latest['time'][-1:])[0])
+
+        # Enough calendar days for `days` sessions across weekends, one extra for overnight sessions
+        last_day = datetime.fromtimestamp(last_time, timezone.utc).date()
+        first_day = last_day - timedelta(days=days * 7 // 5 + 3)
+        session_days, starts, ends = calendar.boundaries(name, first_day, last_day)
+        needed = (last_time - int(starts[0])) // step + 1
+        rates = bar_cache.rates(symbol, mt5_timeframe, min(bar_cache.max_bars, needed))
+        if rates is None or len(rates) == 0:
+            return jsonify({"error": f"Failed to get rates data for {symbol}"}), 404
+
+        times = server_to_utc(rates['time'])
+        lo, hi = slice_sessions(times, starts, ends)
+        present = np.flatnonzero(hi > lo)[-days:]
+
+        info = symbol_specs.get(symbol)
+        point = info.point if info is not None else 0.00001
+        result = []
+        for i in present:
+            bars, bar_times = rates[lo[i]:hi[i]], times[lo[i]:hi[i]]
+            high_at, low_at = int(bars['high'].argmax()), int(bars['low'].argmin())
+            high, low = float(bars['high'][high_at]), float(bars['low'][low_at])
+            entry = {
+                "date": session_days[i].isoformat(),
+                "start": utc_iso(starts[i]),
+                "end": utc_iso(ends[i]),
+                "open": float(bars['open'][0]),
+                "high": high,
+                "low": low,
+                "close": float(bars['close'][-1]),
+                "high_time": utc_iso(bar_times[high_at]),
+                "low_time": utc_iso(bar_times[low_at]),
+                "range_points": int(round((high - low) / point)),
+                "tick_volume": int(bars['tick_volume'].sum()),
+                "bars": len(bars),
+                "in_progress": bool(ends[i] > last_time + step),
+            }
+            if include_bars:
+                entry["rates"] = [
+                    {"time": utc_iso(at), "open": float(bar['open']), "high": float(bar['high']),
+                     "low": float(bar['low']), "close": float(bar['close']), "tick_volume": int(bar['tick_volume'])}
+                    for bar, at in zip(bars, bar_times)
+                ]
+            result.append(entry)
+
+        response = {"symbol": symbol, "session": name, "timeframe": timeframe, "sessions": result}
+        if needed > bar_cache.max_bars and len(result) < days:
+            # The bar cache holds fewer bars than `days` sessions span on this timeframe
+            response["truncated"] = True
+            response["warning"] = (f"Only {len(result)} of {days} sessions fit in {bar_cache.max_bars} {timeframe} bars; "
+                                   f"use a higher timeframe or fewer days")
+        return jsonify(response)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in /sessions for %s", symbol)
+        return jsonify({"error": "Internal server error"}), 500
@@ -0,0 +1,139 @@
+from flask import Blueprint, jsonify, request
+import logging
+from swagger import swag_from
+from connection import connection
+from auth import api_key_required
+from terminal import current_account
+import stop_manager
+
+stops_bp = Blueprint('stops', __name__)
+logger = logging.getLogger(__name__)
+
+RULE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'break_even': {
+            'type': 'object',
+            'properties': {
+                'trigger_points': {'type': 'number', 'description': 'Profit in points that moves the SL to break-even.'},
+                'offset_points': {'type': 'number', 'description': 'Points in profit beyond the open price for the new SL.'}
+            }
+        },
+        'trailing': {
+            'type': 'object',
+            'properties': {
+                'distance_points': {'type': 'number', 'description': 'Distance of the SL behind the price.'},
+                'start_points': {'type': 'number', 'description': 'Profit in points before trailing starts (default distance_points).'},
+                'step_points': {'type': 'number', 'description': 'Minimum SL improvement per modification.'}
+            }
+        },
+        'partial_tp': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'trigger_points': {'type': 'number'},
+                    'fraction': {'type': 'number', 'description': 'Fraction of the volume to close (0-1).'}
+                }
+            }
+        }
+    }
+}
+
+
+def _unavailable():
+    if stop_manager.manager is None:
+        return jsonify({"error": "Stop manager is disabled"}), 503
+    if current_account() is not None:
+        return jsonify({"error": "Stop rules are only available for the default terminal"}), 400
+    return None
+
+
+@stops_bp.route('/stops', methods=['GET'])
+@api_key_required
+@swag_from({
+    'tags': ['Position'],
+    'responses': {
+        200: {'description': 'Managed positions with their rules and state.'},
+        503: {'description': 'Stop manager disabled.'}
+    }
+})
+def list_stop_rules():
+    """
+    List Stop Rules
+    ---
+    description: Positions managed by the server-side stop manager, with their break-even, trailing and partial take-profit rules and the last action taken.
+    """
+    error = _unavailable()
+    if error:
+        return error
+    # The list replaces the managed-position count from stats()
+    return jsonify({**stop_manager.stats(), "positions": stop_manager.manager.all()})
+
+
+@stops_bp.route('/stops/<int:ticket>', methods=['GET', 'PUT', 'DELETE'])
+@api_key_required
+@swag_from({
+    'tags': ['Position'],
+    'parameters': [
+        {
+            'name': 'ticket',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'Position ticket.'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'description': 'Rules for PUT; replaces the rules of the position.',
+            'schema': RULE_SCHEMA
+        }
+    ],
+    'responses': {
+        200: {'description': 'Rules of the position.'},
+        400: {'description': 'Invalid rules.'},
+        404: {'description': 'Position or rules not found.'},
+        503: {'description': 'MT5 terminal not connected or stop manager disabled.'},
+        500: {'description': 'Internal server error.'}
+    }
+})
+def stop_rules(ticket):
+    """
+    Position Stop Rules
+    ---
+    description: Get, set (PUT) or remove (DELETE) the break-even, trailing-stop and partial take-profit rules of a position. Rules are evaluated on every tick inside the API, which sends the SL changes and partial closes itself.
+    """
+    error = _unavailable()
+    if error:
+        return error
+    manager = stop_manager.manager
+    try:
+        if request.method == 'GET':
+            rules = manager.get(ticket)
+            if rules is None:
+                return jsonify({"error": f"No stop rules for position {ticket}"}), 404
+            return jsonify(rules)
+
+        if request.method == 'DELETE':
+            if not manager.remove(ticket):
+                return jsonify({"error": f"No stop rules for position {ticket}"}), 404
+            return jsonify({"message": f"Stop rules for position {ticket} removed"})
+
+        if not connection.ensure_connected():
+            return jsonify({"error": "MT5 terminal not connected"}), 503
+        data = request.get_json(force=True, silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        rules = manager.set_rules(ticket, data)
+        logger.info("Stop rules set for position %s", ticket)
+        return jsonify(rules)
+
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception:
+        logger.exception("Error in /stops for position %s", ticket)
+        return jsonify({"error": "Internal server error"}), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
-import MetaTrader5 as mt5
-from flasgger import swag_from
+from terminal import mt5
+from swagger import swag_from
+from cache import cached
 import logging
 
 symbol_bp = Blueprint('symbol', __name__)
@@ -50,7 +51,9 @@ def get_symbol_info_tick_endpoint(symbol):
     tick_dict = tick._asdict()
     return jsonify(tick_dict)
 
+# symbol_info carries the live bid/ask/spread, so only bursts of identical calls are served from cache
 @symbol_bp.route('/symbol_info/<symbol>', methods=['GET'])
+@cached(0.25, tags=('symbols',))
 @swag_from({
     'tags': ['Symbol'],
     'parameters': [
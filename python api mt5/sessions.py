@@ -0,0 +1,146 @@
+"""
+Trading session and ICT killzone calendar.
+
+Sessions are defined in the wall-clock time of their own market, so London and New York
+follow their daylight saving changes (which happen on different dates). The calendar
+precomputes the UTC start / end of every session for a range of days once, and lookups
+are array slices; the range grows when a request goes past it.
+
+Session boundaries are UTC epochs. MT5 bar and deal times are the broker's server wall
+clock written as if it were UTC; ``MT5_SERVER_TZ`` names the server's time zone (e.g.
+``Europe/Athens`` for the common EET/EEST servers) and ``server_to_utc`` converts such
+times before they are compared with the calendar. Unset, server time is taken as UTC.
+``label`` assigns UTC timestamps to the main sessions (Asia, London, New York; a later
+session wins where they overlap) for the analytics breakdown and the chart overlay.
+"""
+import os
+import threading
+from datetime import datetime, time, timedelta, timezone
+import numpy as np
+from startup import lazy_import
+
+pytz = lazy_import('pytz')
+
+# name: (timezone, start, end); an end at or before the start is on the next day
+SESSIONS = {
+    'asia': ('Asia/Tokyo', time(9, 0), time(18, 0)),
+    'london': ('Europe/London', time(8, 0), time(17, 0)),
+    'new_york': ('America/New_York', time(8, 0), time(17, 0)),
+    # ICT killzones, New York time
+    'asia_killzone': ('America/New_York', time(20, 0), time(0, 0)),
+    'london_killzone': ('America/New_York', time(2, 0), time(5, 0)),
+    'new_york_killzone': ('America/New_York', time(7, 0), time(10, 0)),
+    'london_close_killzone': ('America/New_York', time(10, 0), time(12, 0)),
+}
+
+# Sessions used to label trades and bars, in increasing precedence
+MAIN_SESSIONS = ('asia', 'london', 'new_york')
+
+SERVER_TZ = os.environ.get('MT5_SERVER_TZ', '').strip() or None
+
+# Days computed around today the first time the calendar is used
+INITIAL_DAYS_BACK = 400
+INITIAL_DAYS_AHEAD = 30
+
+
+def _epoch(zone, day, at):
+    return int(zone.localize(datetime.combine(day, at)).timestamp())
+
+
+class SessionCalendar:
+    def __init__(self, definitions=SESSIONS):
+        self.definitions = definitions
+        self._lock = threading.Lock()
+        self._first = None
+        self._days = None
+        self._bounds = {}
+
+    def _build(self, first, last):
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        bounds = {}
+        for name, (tz, start, end) in self.definitions.items():
+            zone = pytz.timezone(tz)
+            starts = np.array([_epoch(zone, day, start) for day in days], dtype=np.int64)
+            ends = np.array([_epoch(zone, day + timedelta(days=1) if end <= start else day, end) for day in days],
+                            dtype=np.int64)
+            bounds[name] = (starts, ends)
+        self._first, self._days, self._bounds = first, days, bounds
+
+    def _ensure(self, first, last):
+        with self._lock:
+            if self._first is None or first < self._first or last > self._days[-1]:
+                today = datetime.now(timezone.utc).date()
+                lo = min(first, today - timedelta(days=INITIAL_DAYS_BACK), self._first or first)
+                hi = max(last, today + timedelta(days=INITIAL_DAYS_AHEAD), self._days[-1] if self._days else last)
+                self._build(lo, hi)
+            return self._first, self._days, self._bounds
+
+    def boundaries(self, name, first, last):
+        """``(days, starts, ends)`` of session ``name`` for local dates ``first``..``last``."""
+        if name not in self.definitions:
+            raise KeyError(name)
+        calendar_first, days, bounds = self._ensure(first, last)
+        lo, hi = (first - calendar_first).days, (last - calendar_first).days + 1
+        starts, ends = bounds[name]
+        return days[lo:hi], starts[lo:hi], ends[lo:hi]
+
+    def label(self, times, names=MAIN_SESSIONS):
+        """Session of each UTC epoch in ``times`` (None outside them); later ``names`` win overlaps."""
+        times = np.asarray(times, dtype=np.int64)
+        labels = np.full(len(times), None, dtype=object)
+        if not len(times):
+            return labels
+        # The day before covers sessions that started the previous (local) date
+        first = datetime.fromtimestamp(int(times.min()), timezone.utc).date() - timedelta(days=1)
+        last = datetime.fromtimestamp(int(times.max()), timezone.utc).date()
+        for name in names:
+            _, starts, ends = self.boundaries(name, first, last)
+            index = np.searchsorted(starts, times, side='right') - 1
+            labels[(index >= 0) & (times < ends[np.maximum(index, 0)])] = name
+        return labels
+
+    def today(self, now=None):
+        """UTC start / end of every session on the current (UTC) date."""
+        day = (now or datetime.now(timezone.utc)).date()
+        result = {}
+        for name, (tz, _, _) in self.definitions.items():
+            _, starts, ends = self.boundaries(name, day, day)
+            result[name] = {
+                "timezone": tz,
+                "start": utc_iso(starts[0]),
+                "end": utc_iso(ends[0]),
+            }
+        return result
+
+
+_server_offsets = {}
+
+
+def server_to_utc(times):
+    """UTC epochs of MT5 server-time epochs ``times`` (see ``MT5_SERVER_TZ``)."""
+    times = np.asarray(times, dtype=np.int64)
+    if SERVER_TZ is None or not len(times):
+        return times
+    zone = pytz.timezone(SERVER_TZ)
+    # UTC offsets only change on the hour; one lookup per distinct server hour
+    hours, inverse = np.unique(times // 3600, return_inverse=True)
+    offsets = np.empty(len(hours), dtype=np.int64)
+    for i, hour in enumerate(hours.tolist()):
+        offset = _server_offsets.get(hour)
+        if offset is None:
+            wall = datetime.fromtimestamp(hour * 3600, timezone.utc).replace(tzinfo=None)
+            offset = _server_offsets[hour] = int(zone.localize(wall).utcoffset().total_seconds())
+        offsets[i] = offset
+    return times - offsets[inverse]
+
+
+def utc_iso(epoch):
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def slice_sessions(times, starts, ends):
+    """Index ranges ``[lo, hi)`` of the bars in ``times`` opening inside each session."""
+    return np.searchsorted(times, starts, side='left'), np.searchsorted(times, ends, side='left')
+
+
+calendar = SessionCalendar()
@@ -0,0 +1,89 @@
+"""
+Startup timing and fast-start support.
+
+With ``MT5_FAST_START=1`` the API skips building the OpenAPI spec from the ``swag_from``
+decorators (``/apispec_1.json`` is served from the prebuilt ``MT5_SWAGGER_SPEC`` file,
+written by ``python swagger.py build``), defers pandas until a handler first needs it and
+connects to the terminal in the background, so requests are accepted as soon as Flask is
+up. Heavy modules are then imported on a background thread so the first real request
+does not pay for them.
+
+Each startup phase is timed; the breakdown is logged and reported by ``/health``.
+"""
+import os
+import time
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+FAST_START = os.environ.get('MT5_FAST_START', '').lower() in ('1', 'true', 'yes')
+
+# Modules imported in the background once a fast start has finished
+WARM_MODULES = ('pandas', 'pytz')
+
+_started = time.perf_counter()
+_phases = {}
+_ready_ms = None
+
+
+@contextmanager
+def phase(name):
+    """Time a startup phase."""
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = round((time.perf_counter() - began) * 1000, 3)
+
+
+def mark_ready():
+    """Record the moment the app is ready to accept requests and log the breakdown."""
+    global _ready_ms
+    _ready_ms = round((time.perf_counter() - _started) * 1000, 3)
+    breakdown = ', '.join(f"{name} {ms:.0f}ms" for name, ms in _phases.items())
+    logger.info("Ready in %.0fms (%s): %s", _ready_ms, 'fast start' if FAST_START else 'full start', breakdown)
+
+
+def report():
+    return {
+        "fast_start": FAST_START,
+        "ready_ms": _ready_ms,
+        "phases_ms": dict(_phases),
+    }
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            began = time.perf_counter()
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+            _phases.setdefault(f"lazy:{self.__dict__['_name']}", round((time.perf_counter() - began) * 1000, 3))
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name):
+    """``import name`` now for a full start, on first use for a fast start."""
+    return LazyModule(name) if FAST_START else importlib.import_module(name)
+
+
+def warm_up(modules=WARM_MODULES):
+    """Import deferred modules on a background thread."""
+    def run():
+        with phase('warm_up'):
+            for name in modules:
+                importlib.import_module(name)
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
@@ -0,0 +1,490 @@
+"""
+Server-side stop management driven by the tick stream.
+
+Break-even, trailing-stop and partial take-profit rules are held per position ticket
+and evaluated on every new tick of the symbols that have managed positions, so stops
+follow the market within one tick poll (``MT5_TICK_POLL_MS``) instead of a client
+polling loop calling ``/modify_sl_tp``. Distances are in points:
+
+    {
+      "break_even": {"trigger_points": 150, "offset_points": 10},
+      "trailing": {"distance_points": 200, "start_points": 300, "step_points": 20},
+      "partial_tp": [{"trigger_points": 250, "fraction": 0.5}]
+    }
+
+* ``break_even`` moves the SL to the open price (plus ``offset_points`` in profit) once
+  the position is ``trigger_points`` in profit
+* ``trailing`` keeps the SL ``distance_points`` behind the price once the position is
+  ``start_points`` in profit (default: ``distance_points``), moving it only when it
+  gains at least ``step_points``
+* ``partial_tp`` closes ``fraction`` of the volume the position had when the rule was
+  set, at each level in turn
+
+All positions of a symbol are evaluated together as numpy arrays; a
+``TRADE_ACTION_SLTP`` (or a partial close) is queued only for the tickets whose
+threshold was crossed and sent by a worker thread, so the tick poller never waits on
+the terminal. The worker re-reads the managed positions every ``STOP_SYNC_SECONDS``
+and forgets the rules of positions that were closed. An action the terminal rejects
+(e.g. "Invalid stops") is not sent again on the next tick: it waits
+``STOP_RETRY_SECONDS``, doubling after each further failure up to
+``STOP_RETRY_MAX_SECONDS``.
+
+Rules apply to the default terminal (the one ``tick_stream`` polls). They are kept in
+memory, and in ``STOP_RULES_FILE`` when set so they survive a restart. Set
+``STOP_MANAGER_DISABLED=1`` to turn the manager off.
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from types import SimpleNamespace
+import numpy as np
+from terminal import mt5
+from connection import connection
+from tick_stream import tick_stream
+from market_cache import symbol_specs
+from cache import response_cache
+import trade_validation
+from trade_validation import OrderRejected
+from execution import send_market
+import metrics
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get('STOP_MANAGER_DISABLED', '').lower() not in ('1', 'true', 'yes')
+SYNC_SECONDS = float(os.environ.get('STOP_SYNC_SECONDS', 2))
+RULES_FILE = os.environ.get('STOP_RULES_FILE')
+RETRY_SECONDS = float(os.environ.get('STOP_RETRY_SECONDS', 5))
+MAX_RETRY_SECONDS = float(os.environ.get('STOP_RETRY_MAX_SECONDS', 300))
+
+ACTIONS = metrics.register(metrics.Counter(
+    'mt5api_stop_actions_total', 'Stop manager actions sent to the terminal, by action and outcome.',
+    ('action', 'outcome')))
+REACTION_SECONDS = metrics.register(metrics.Histogram(
+    'mt5api_stop_reaction_seconds', 'Time from the tick that crossed a stop threshold to the terminal reply.'))
+
+
+def _number(rule, key, default=None, minimum=0.0):
+    value = rule.get(key, default)
+    if value is None:
+        raise ValueError(f"'{key}' is required")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number")
+    if value < minimum:
+        raise ValueError(f"'{key}' must be at least {minimum:g}")
+    return value
+
+
+def parse_rules(data, spec):
+    """Validate a rule body against the symbol spec; returns the normalized rules."""
+    stops_level = spec.trade_stops_level
+    rules = {"break_even": None, "trailing": None, "partial_tp": []}
+
+    if data.get('break_even'):
+        rule = data['break_even']
+        trigger = _number(rule, 'trigger_points', minimum=1)
+        offset = _number(rule, 'offset_points', 0, minimum=0)
+        if trigger - offset < stops_level:
+            raise ValueError(f"break_even: trigger_points - offset_points must be at least the stops level "
+                             f"({stops_level} points)")
+        rules['break_even'] = {"trigger_points": trigger, "offset_points": offset}
+
+    if data.get('trailing'):
+        rule = data['trailing']
+        distance = _number(rule, 'distance_points', minimum=max(1, stops_level))
+        rules['trailing'] = {
+            "distance_points": distance,
+            "start_points": _number(rule, 'start_points', distance, minimum=0),
+            "step_points": _number(rule, 'step_points', 1, minimum=1),
+        }
+
+    levels = []
+    for level in data.get('partial_tp') or []:
+        fraction = _number(level, 'fraction', minimum=0)
+        if not 0 < fraction < 1:
+            raise ValueError("partial_tp: 'fraction' must be between 0 and 1")
+        levels.append({"trigger_points": _number(level, 'trigger_points', minimum=1), "fraction": fraction})
+    rules['partial_tp'] = sorted(levels, key=lambda level: level['trigger_points'])
+
+    if not (rules['break_even'] or rules['trailing'] or rules['partial_tp']):
+        raise ValueError("Provide at least one of 'break_even', 'trailing' or 'partial_tp'")
+    return rules
+
+
+class _Managed:
+    """Rules and last known state of one position."""
+
+    def __init__(self, position, rules, spec, base_volume=None, next_partial=0):
+        self.ticket = position.ticket
+        self.symbol = position.symbol
+        self.type = position.type
+        self.price_open = position.price_open
+        self.sl = position.sl
+        self.tp = position.tp
+        self.volume = position.volume
+        self.base_volume = base_volume or position.volume
+        self.spec = spec
+        self.rules = rules
+        self.next_partial = next_partial
+        self.actions = 0
+        self.last_action = None
+        # action -> (consecutive failures, monotonic time before which it is not retried)
+        self.failures = {}
+
+    @property
+    def sign(self):
+        return 1.0 if self.type == mt5.POSITION_TYPE_BUY else -1.0
+
+    def backing_off(self, action, now):
+        failure = self.failures.get(action)
+        return failure is not None and now < failure[1]
+
+    def failed(self, action):
+        """Record a failed ``action``; returns the seconds before it is tried again."""
+        count = self.failures.get(action, (0, 0.0))[0] + 1
+        delay = min(RETRY_SECONDS * 2 ** (count - 1), MAX_RETRY_SECONDS)
+        self.failures[action] = (count, time.monotonic() + delay)
+        return delay
+
+    def partial_trigger(self):
+        levels = self.rules['partial_tp']
+        return levels[self.next_partial]['trigger_points'] if self.next_partial < len(levels) else np.nan
+
+    def to_dict(self):
+        return {
+            "ticket": self.ticket,
+            "symbol": self.symbol,
+            "type": self.type,
+            "price_open": self.price_open,
+            "sl": self.sl,
+            "tp": self.tp,
+            "volume": self.volume,
+            "base_volume": self.base_volume,
+            **self.rules,
+            "partials_done": self.next_partial,
+            "actions": self.actions,
+            "last_action": self.last_action,
+            "failures": {action: count for action, (count, _) in self.failures.items()},
+        }
+
+
+class StopManager:
+    def __init__(self, sync_seconds=SYNC_SECONDS, rules_file=RULES_FILE):
+        self.sync_seconds = sync_seconds
+        self.rules_file = rules_file
+        self._lock = threading.Lock()
+        self._managed = {}
+        self._tables = {}
+        self._busy = set()
+        self._queue = queue.Queue()
+        self._token = None
+        self._symbols = frozenset()
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_sync = 0.0
+
+    # --- Rules ----------------------------------------------------------------
+    def set_rules(self, ticket, data):
+        """Manage position ``ticket`` with the rules in ``data``; raises LookupError / ValueError."""
+        positions = mt5.positions_get(ticket=ticket)
+        if not positions:
+            raise LookupError(f"Position {ticket} not found")
+        position = positions[0]
+        spec = symbol_specs.get(position.symbol)
+        if spec is None:
+            raise LookupError(f"Symbol {position.symbol} not found")
+        managed = _Managed(position, parse_rules(data, spec), spec)
+        with self._lock:
+            self._managed[ticket] = managed
+            self._tables.pop(managed.symbol, None)
+        self._changed()
+        return managed.to_dict()
+
+    def remove(self, ticket):
+        with self._lock:
+            managed = self._managed.pop(ticket, None)
+            if managed is not None:
+                self._tables.pop(managed.symbol, None)
+        if managed is not None:
+            self._changed()
+        return managed is not None
+
+    def get(self, ticket):
+        with self._lock:
+            managed = self._managed.get(ticket)
+            return managed.to_dict() if managed is not None else None
+
+    def all(self):
+        with self._lock:
+            return [managed.to_dict() for managed in self._managed.values()]
+
+    def _changed(self):
+        self.start()
+        self._resubscribe()
+        self._save()
+
+    def _resubscribe(self):
+        with self._lock:
+            symbols = frozenset(managed.symbol for managed in self._managed.values())
+            if symbols == self._symbols:
+                return
+            old, self._symbols = self._token, symbols
+            self._token = tick_stream.subscribe(symbols, self.on_tick) if symbols else None
+        if old is not None:
+            tick_stream.unsubscribe(old)
+
+    # --- Evaluation -----------------------------------------------------------
+    def _table(self, symbol):
+        """Column arrays of the positions managed on ``symbol`` (rebuilt after changes)."""
+        table = self._tables.get(symbol)
+        if table is None:
+            rows = [m for m in self._managed.values() if m.symbol == symbol]
+            if not rows:
+                return None
+            be = [m.rules['break_even'] or {} for m in rows]
+            trail = [m.rules['trailing'] or {} for m in rows]
+            table = {
+                "managed": rows,
+                "sign": np.array([m.sign for m in rows]),
+                "open": np.array([m.price_open for m in rows]),
+                "sl": np.array([m.sl for m in rows]),
+                "point": np.array([m.spec.point for m in rows]),
+                "be_trigger": np.array([r.get('trigger_points', np.nan) for r in be]),
+                "be_offset": np.array([r.get('offset_points', 0.0) for r in be]),
+                "trail_start": np.array([r.get('start_points', np.nan) for r in trail]),
+                "trail_distance": np.array([r.get('distance_points', 0.0) for r in trail]),
+                "trail_step": np.array([r.get('step_points', 1.0) for r in trail]),
+                "partial_trigger": np.array([m.partial_trigger() for m in rows]),
+            }
+            self._tables[symbol] = table
+        return table
+
+    def on_tick(self, symbol, tick):
+        """Tick stream callback: queue the SL moves and partial closes this tick triggers."""
+        received = time.monotonic()
+        with self._lock:
+            table = self._table(symbol)
+            if table is None:
+                return
+            sign, point = table['sign'], table['point']
+            # Positions close at the bid (buys) or the ask (sells)
+            price = np.where(sign > 0, tick.bid, tick.ask)
+            profit = sign * (price - table['open']) / point
+            # SL levels in "direction of profit" units: larger is better for both sides
+            current = np.where(table['sl'] > 0, sign * table['sl'], -np.inf)
+            with np.errstate(invalid='ignore'):
+                be_level = np.where(profit >= table['be_trigger'],
+                                    sign * table['open'] + table['be_offset'] * point, -np.inf)
+                trail_level = np.where(profit >= table['trail_start'],
+                                       sign * price - table['trail_distance'] * point, -np.inf)
+                partial = profit >= table['partial_trigger']
+                target = np.maximum(be_level, trail_level)
+                min_move = np.where(trail_level >= be_level, table['trail_step'], 1.0) * point - point / 2
+                move = target - current >= min_move
+
+            actions = []
+            for i in np.flatnonzero(move | partial):
+                managed = table['managed'][i]
+                if managed.ticket in self._busy:
+                    continue
+                partial_due = partial[i] and not managed.backing_off('partial', received)
+                move_due = move[i] and not managed.backing_off('sltp', received)
+                if not (partial_due or move_due):
+                    continue
+                self._busy.add(managed.ticket)
+                if partial_due:
+                    actions.append(('partial', managed, None))
+                if move_due:
+                    actions.append(('sltp', managed, float(sign[i] * target[i])))
+        for action, managed, sl in actions:
+            self._queue.put((action, managed, sl, tick, received))
+
+    # --- Worker ---------------------------------------------------------------
+    def _modify(self, managed, sl, tick):
+        position = SimpleNamespace(type=managed.type, sl=managed.sl, tp=managed.tp)
+        try:
+            sl, tp, _ = trade_validation.normalize_sltp(position, sl, managed.tp, managed.spec, tick, strict=False)
+        except OrderRejected as e:
+            logger.debug("Stop move for #%s skipped for %.0fs: %s", managed.ticket, managed.failed('sltp'), e)
+            return None
+        if sl == managed.sl:
+            return None
+        result = mt5.order_send({"action": mt5.TRADE_ACTION_SLTP, "position": managed.ticket,
+                                 "symbol": managed.symbol, "sl": sl, "tp": tp})
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            managed.sl = sl
+        return result, {"sl": sl}
+
+    def _partial(self, managed):
+        spec = managed.spec
+        level = managed.rules['partial_tp'][managed.next_partial]
+        step = spec.volume_step or 0.01
+        volume = round(round(managed.base_volume * level['fraction'] / step) * step, trade_validation.step_decimals(step))
+        if managed.volume - volume < spec.volume_min - 1e-9:
+            volume = managed.volume
+        if volume < spec.volume_min - 1e-9:
+            logger.warning("Partial TP for #%s skipped: %s lots is below the minimum volume", managed.ticket, volume)
+            managed.next_partial += 1
+            return None
+        close_type = mt5.ORDER_TYPE_SELL if managed.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
+        result, attempts = send_market({
+            "action": mt5.TRADE_ACTION_DEAL, "position": managed.ticket, "symbol": managed.symbol,
+            "volume": volume, "type": close_type, "deviation": 20,
+            "comment": f"Partial TP #{managed.ticket}", "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC,
+        })
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            managed.next_partial += 1
+            managed.volume = round(managed.volume - volume, 8)
+        return result, {"volume": volume, "attempts": len(attempts)}
+
+    def _execute(self, action, managed, sl, tick, received):
+        try:
+            outcome = self._modify(managed, sl, tick) if action == 'sltp' else self._partial(managed)
+            if outcome is None:
+                return
+            result, details = outcome
+            retcode = result.retcode if result is not None else None
+            done = retcode == mt5.TRADE_RETCODE_DONE
+            ACTIONS.inc(action, 'done' if done else 'failed')
+            REACTION_SECONDS.observe(time.monotonic() - received)
+            managed.actions += done
+            managed.last_action = {"action": action, "at": time.time(), "retcode": retcode,
+                                   "comment": result.comment if result is not None else None, **details}
+            if done:
+                managed.failures.pop(action, None)
+                logger.info("Stop manager %s on #%s: %s", action, managed.ticket, details)
+                response_cache.invalidate('positions', 'orders', 'history')
+            else:
+                logger.warning("Stop manager %s on #%s failed, retrying in %.0fs: %s", action, managed.ticket,
+                               managed.failed(action), managed.last_action['comment'] or mt5.last_error())
+                if retcode == mt5.TRADE_RETCODE_POSITION_CLOSED:
+                    self.remove(managed.ticket)
+        except Exception:
+            logger.exception("Stop manager %s failed for #%s", action, managed.ticket)
+        finally:
+            with self._lock:
+                self._busy.discard(managed.ticket)
+                self._tables.pop(managed.symbol, None)
+
+    def sync(self):
+        """Refresh SL / TP / volume of the managed positions and forget closed ones."""
+        self._last_sync = time.monotonic()
+        with self._lock:
+            if not self._managed:
+                return
+        positions = mt5.positions_get()
+        if positions is None:
+            return
+        current = {position.ticket: position for position in positions}
+        closed = []
+        with self._lock:
+            for ticket, managed in list(self._managed.items()):
+                position = current.get(ticket)
+                if position is None:
+                    if ticket not in self._busy:
+                        closed.append(self._managed.pop(ticket))
+                    continue
+                if (position.sl, position.tp, position.volume) != (managed.sl, managed.tp, managed.volume):
+                    managed.sl, managed.tp, managed.volume = position.sl, position.tp, position.volume
+                    self._tables.pop(managed.symbol, None)
+            for managed in closed:
+                self._tables.pop(managed.symbol, None)
+        if closed:
+            logger.info("Stop rules removed for closed positions: %s", [m.ticket for m in closed])
+            self._resubscribe()
+            self._save()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._execute(*self._queue.get(timeout=self.sync_seconds))
+            except queue.Empty:
+                pass
+            if time.monotonic() - self._last_sync >= self.sync_seconds:
+                try:
+                    self.sync()
+                except Exception:
+                    logger.exception("Stop manager sync failed")
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stop-manager', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Persistence ----------------------------------------------------------
+    def _save(self):
+        if not self.rules_file:
+            return
+        with self._lock:
+            state = {str(t): {**m.rules, "base_volume": m.base_volume, "next_partial": m.next_partial}
+                     for t, m in self._managed.items()}
+        try:
+            with open(self.rules_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+        except OSError as e:
+            logger.error("Could not save stop rules to %s: %s", self.rules_file, e)
+
+    def load(self):
+        """Restore the rules in ``rules_file`` for positions that are still open."""
+        if not self.rules_file or not os.path.exists(self.rules_file):
+            return 0
+        with open(self.rules_file, encoding='utf-8') as f:
+            state = json.load(f)
+        positions = {position.ticket: position for position in mt5.positions_get() or ()}
+        with self._lock:
+            for ticket, saved in state.items():
+                position = positions.get(int(ticket))
+                spec = symbol_specs.get(position.symbol) if position is not None else None
+                if spec is not None:
+                    rules = {key: saved[key] for key in ('break_even', 'trailing', 'partial_tp')}
+                    self._managed[position.ticket] = _Managed(position, rules, spec, saved.get('base_volume'),
+                                                              saved.get('next_partial', 0))
+            loaded = len(self._managed)
+        if loaded:
+            self._changed()
+        logger.info("Restored stop rules for %d of %d positions", loaded, len(state))
+        return loaded
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": True,
+                "positions": len(self._managed),
+                "symbols": sorted(self._symbols),
+                "pending_actions": self._queue.qsize(),
+            }
+
+
+manager = StopManager() if ENABLED else None
+
+
+def start():
+    """Restore saved rules once the terminal is up; safe to call more than once."""
+    if manager is None or manager._thread is not None:
+        return manager
+
+    def restore():
+        while not connection.ensure_connected():
+            if manager._stop.wait(5):
+                return
+        try:
+            manager.load()
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Could not restore stop rules from %s: %s", manager.rules_file, e)
+
+    manager.start()
+    threading.Thread(target=restore, name='stop-rules-restore', daemon=True).start()
+    return manager
+
+
+def stats():
+    return manager.stats() if manager is not None else {"enabled": False}
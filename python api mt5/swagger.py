@@ -1,3 +1,17 @@
+"""
+Swagger configuration, the ``swag_from`` decorator used by the blueprints, and the
+prebuilt spec served in fast-start mode.
+
+    python swagger.py build        # write the spec to MT5_SWAGGER_SPEC (swagger_spec.json)
+"""
+import os
+import sys
+import json
+from startup import FAST_START
+
+SPEC_FILE = os.environ.get('MT5_SWAGGER_SPEC',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'swagger_spec.json'))
+
 swagger_config = {
     "swagger": "2.0",
     "info": {
@@ -29,4 +43,47 @@ swagger_config = {
     "swagger_ui": True,
     "specs_route": "/apidocs/",
     "headers": []
-}
\ No newline at end of file
+}
+
+if FAST_START:
+    def swag_from(specs=None, **kwargs):
+        """No-op in fast-start mode: the spec is served from the prebuilt file."""
+        def decorator(function):
+            return function
+        return decorator
+else:
+    from flasgger import swag_from
+
+
+def init_swagger(app):
+    """Build the spec from the decorators (full start) or serve the prebuilt file (fast start)."""
+    if not FAST_START:
+        from flasgger import Swagger
+        return Swagger(app, config=swagger_config)
+
+    from flask import jsonify, send_file
+    route = swagger_config['specs'][0]['route']
+
+    @app.route(route, endpoint='prebuilt_apispec')
+    def prebuilt_apispec():
+        if not os.path.exists(SPEC_FILE):
+            return jsonify({"error": "Prebuilt spec not found; run 'python swagger.py build'"}), 404
+        return send_file(SPEC_FILE, mimetype='application/json')
+    return None
+
+
+def build(path=SPEC_FILE):
+    """Render the spec from a full start of the app and write it to ``path``."""
+    if FAST_START:
+        raise RuntimeError("Unset MT5_FAST_START to build the spec")
+    from app import app
+    response = app.test_client().get(swagger_config['specs'][0]['route'])
+    with open(path, 'w') as f:
+        json.dump(response.get_json(), f, indent=2, sort_keys=True)
+    return path
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        sys.exit("usage: python swagger.py build")
+    print(f"Wrote {build()}")
@@ -0,0 +1,271 @@
+import os
+import time
+import inspect
+import logging
+import itertools
+import threading
+import queue
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeout
+from contextvars import ContextVar
+from functools import wraps
+
+# Offline backend for benchmarks and Linux environments without a terminal
+SIMULATED = os.environ.get('MT5_SIMULATOR', '').lower() in ('1', 'true', 'yes')
+if SIMULATED:
+    import mt5_simulator
+    mt5_simulator.install()
+
+import MetaTrader5 as _mt5
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITY_TRADE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_DATA = 10
+
+PRIORITY_NAMES = {
+    PRIORITY_TRADE: 'trade',
+    PRIORITY_DEFAULT: 'default',
+    PRIORITY_DATA: 'data',
+}
+
+# Priority of a terminal function when the caller did not set one
+CALL_PRIORITIES = {
+    'order_send': PRIORITY_TRADE,
+    'order_check': PRIORITY_TRADE,
+    'initialize': PRIORITY_TRADE,
+    'login': PRIORITY_TRADE,
+    'shutdown': PRIORITY_TRADE,
+    'copy_rates_from': PRIORITY_DATA,
+    'copy_rates_from_pos': PRIORITY_DATA,
+    'copy_rates_range': PRIORITY_DATA,
+    'copy_ticks_from': PRIORITY_DATA,
+    'copy_ticks_range': PRIORITY_DATA,
+    'history_deals_get': PRIORITY_DATA,
+    'history_deals_total': PRIORITY_DATA,
+    'history_orders_get': PRIORITY_DATA,
+    'history_orders_total': PRIORITY_DATA,
+}
+
+# Seconds a call may wait in the queue before it is dropped
+DEFAULT_DEADLINES = {
+    PRIORITY_TRADE: float(os.environ.get('MT5_TRADE_DEADLINE', 10)),
+    PRIORITY_DEFAULT: float(os.environ.get('MT5_DEFAULT_DEADLINE', 10)),
+    PRIORITY_DATA: float(os.environ.get('MT5_DATA_DEADLINE', 30)),
+}
+
+_priority_override = ContextVar('mt5_priority', default=None)
+_account = ContextVar('mt5_account', default=None)
+
+
+class TerminalTimeout(Exception):
+    """A terminal call did not start before its deadline."""
+
+
+class MT5Executor:
+    """
+    Runs every MetaTrader5 call on a single owner thread.
+
+    The ``MetaTrader5`` module is not safe for concurrent use, so request threads
+    submit calls to a priority queue instead of calling it directly. Trading calls
+    (priority 0) are served before default calls and bar/history fetches (priority 10);
+    calls with the same priority run in submission order.
+
+    A deadline bounds how long a call may wait in the queue. Once a call has started
+    it always runs to completion and the caller waits for it, so an ``order_send`` is
+    never reported as timed out after it reached the terminal.
+    """
+
+    def __init__(self, deadlines=None):
+        self.deadlines = dict(DEFAULT_DEADLINES if deadlines is None else deadlines)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.current_call = None
+
+        self._depth = {p: 0 for p in PRIORITY_NAMES}
+        self._executed = {p: 0 for p in PRIORITY_NAMES}
+        self._expired = {p: 0 for p in PRIORITY_NAMES}
+        self._wait_total = {p: 0.0 for p in PRIORITY_NAMES}
+        self._wait_max = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='mt5-executor', daemon=True)
+                self._thread.start()
+
+    def on_owner_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, func, *args, priority=PRIORITY_DEFAULT, deadline=None, name=None, **kwargs):
+        """Queue ``func(*args, **kwargs)`` for the owner thread and return a Future."""
+        if self._thread is None:
+            self.start()
+        if priority not in PRIORITY_NAMES:
+            priority = PRIORITY_DEFAULT
+        if deadline is None:
+            deadline = self.deadlines.get(priority)
+
+        future = Future()
+        now = time.monotonic()
+        item = (name or getattr(func, '__name__', 'call'), func, args, kwargs, now,
+                now + deadline if deadline else None, future)
+        with self._lock:
+            self._depth[priority] += 1
+        self._queue.put((priority, next(self._seq), item))
+        return future
+
+    def run(self, func, *args, priority=PRIORITY_DEFAULT, deadline=None, name=None, **kwargs):
+        """Run ``func`` on the owner thread and wait for its result."""
+        if self.on_owner_thread():
+            return _timed(name or getattr(func, '__name__', 'call'), func, args, kwargs)
+
+        future = self.submit(func, *args, priority=priority, deadline=deadline, name=name, **kwargs)
+        deadline = self.deadlines.get(priority) if deadline is None else deadline
+        call_name = name or getattr(func, '__name__', 'call')
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeout:
+            if future.cancel():
+                raise TerminalTimeout(f"{call_name} did not start within {deadline}s")
+            # Already running: never abandon a call that reached the terminal
+            return future.result()
+        except CancelledError:
+            raise TerminalTimeout(f"{call_name} did not start within {deadline}s")
+
+    def stats(self):
+        """Queue depth and wait statistics per priority class."""
+        with self._lock:
+            return {
+                "busy": self.current_call is not None,
+                "current_call": self.current_call,
+                "queues": {
+                    PRIORITY_NAMES[p]: {
+                        "depth": self._depth[p],
+                        "executed": self._executed[p],
+                        "expired": self._expired[p],
+                        "avg_wait_ms": round(self._wait_total[p] / self._executed[p] * 1000, 3)
+                        if self._executed[p] else 0.0,
+                        "max_wait_ms": round(self._wait_max[p] * 1000, 3),
+                    }
+                    for p in PRIORITY_NAMES
+                },
+            }
+
+    def _run(self):
+        while True:
+            priority, _, (name, func, args, kwargs, enqueued, expires, future) = self._queue.get()
+            started = time.monotonic()
+            with self._lock:
+                self._depth[priority] -= 1
+
+            if expires is not None and started > expires:
+                with self._lock:
+                    self._expired[priority] += 1
+                logger.warning("Dropped %s: waited %.3fs in the %s queue", name, started - enqueued,
+                               PRIORITY_NAMES[priority])
+                future.cancel()
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            waited = started - enqueued
+            with self._lock:
+                self._executed[priority] += 1
+                self._wait_total[priority] += waited
+                self._wait_max[priority] = max(self._wait_max[priority], waited)
+                self.current_call = name
+            metrics.TERMINAL_QUEUE_WAIT.observe(waited, PRIORITY_NAMES[priority])
+            try:
+                future.set_result(_timed(name, func, args, kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self.current_call = None
+
+
+def _timed(name, func, args, kwargs):
+    """Run a terminal call, recording its duration in the terminal latency histogram."""
+    metrics.TERMINAL_IN_FLIGHT.inc(name)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        metrics.TERMINAL_LATENCY.observe(time.perf_counter() - started, name)
+        metrics.TERMINAL_IN_FLIGHT.dec(name)
+
+
+class TerminalProxy:
+    """
+    Drop-in replacement for the ``MetaTrader5`` module.
+
+    Constants and types are passed through unchanged; every function call is routed
+    through the executor with a priority taken from ``trade_priority`` (if the current
+    request set one) or from ``CALL_PRIORITIES``. When a ``TerminalPool`` is attached
+    as ``pool``, calls go to its worker processes instead of the local executor.
+    """
+
+    def __init__(self, module, executor):
+        self._module = module
+        self._executor = executor
+        self._wrappers = {}
+        self.pool = None
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not inspect.isroutine(attr):
+            return attr
+
+        wrapper = self._wrappers.get(name)
+        if wrapper is None:
+            @wraps(attr)
+            def wrapper(*args, **kwargs):
+                priority = _priority_override.get()
+                if priority is None:
+                    priority = CALL_PRIORITIES.get(name, PRIORITY_DEFAULT)
+                if self.pool is not None:
+                    return _timed(name, self.pool.call, (name, args, kwargs),
+                                  {'priority': priority, 'deadline': self._executor.deadlines.get(priority),
+                                   'account': _account.get()})
+                return self._executor.run(attr, *args, priority=priority, name=name, **kwargs)
+            self._wrappers[name] = wrapper
+        return wrapper
+
+
+def trade_priority(f):
+    """Run every terminal call made by the decorated handler in the trade queue."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = _priority_override.set(PRIORITY_TRADE)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _priority_override.reset(token)
+    # Read by admission control: trade-critical views are always admitted
+    decorated_function.trade_critical = True
+    return decorated_function
+
+
+def set_account(account):
+    """Select the account (terminal pool worker) for the current request; returns a reset token."""
+    return _account.set(account)
+
+
+def reset_account(token):
+    _account.reset(token)
+
+
+def current_account():
+    """The account selected for the current request (``None`` for the default terminal)."""
+    return _account.get()
+
+
+executor = MT5Executor()
+mt5 = TerminalProxy(_mt5, executor)
+metrics.register(metrics.CallbackGauge(
+    'mt5api_terminal_queue_depth', 'Terminal calls waiting in the executor queue.', ('priority',),
+    lambda: {(PRIORITY_NAMES[p],): depth for p, depth in executor._depth.items()}))
@@ -0,0 +1,349 @@
+"""
+Pool of worker processes, each owning its own MT5 terminal.
+
+Every worker initializes ``MetaTrader5`` against its own terminal path / login and serves
+calls from a local priority queue, so the pool scales terminal throughput across cores
+and lets one API serve several accounts. Configure it with a JSON file named by
+``MT5_TERMINALS_FILE``:
+
+    [
+        {"name": "main", "path": "C:/MT5-1/terminal64.exe", "login": 5001, "password": "...",
+         "server": "Broker-Live"},
+        {"name": "data-1", "path": "C:/MT5-2/terminal64.exe", "login": 5001, "password": "...",
+         "server": "Broker-Live", "trading": false}
+    ]
+
+Market data calls are spread over the least busy worker. Calls that change terminal
+state market data depends on (``symbol_select``, market book subscriptions) go to every
+worker, so a later read finds the symbol wherever it lands. Account calls (orders,
+positions, history, account info) go to the worker whose ``name`` or ``login`` matches
+the account named in the request (``X-MT5-Account`` header or ``account`` body field),
+or to the first trading worker when no account is given.
+
+A call is answered within its queue deadline plus ``MT5_WORKER_CALL_TIMEOUT`` seconds
+(default 60) once started; a worker that does not answer in time is considered hung and
+restarted, failing its pending calls with ``TerminalUnavailable``.
+"""
+import os
+import json
+import time
+import heapq
+import pickle
+import logging
+import itertools
+import threading
+import queue
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from terminal import TerminalTimeout
+
+logger = logging.getLogger(__name__)
+
+# Calls that do not depend on the logged-in account and can run on any worker
+MARKET_DATA_CALLS = {
+    'copy_rates_from', 'copy_rates_from_pos', 'copy_rates_range',
+    'copy_ticks_from', 'copy_ticks_range',
+    'symbol_info', 'symbol_info_tick', 'symbols_get', 'symbols_total', 'symbol_select',
+    'market_book_add', 'market_book_get', 'market_book_release',
+}
+
+# Market data calls that change terminal state and are sent to every worker
+BROADCAST_CALLS = {'symbol_select', 'market_book_add', 'market_book_release'}
+
+CALL_TIMEOUT = float(os.environ.get('MT5_WORKER_CALL_TIMEOUT', 60))
+
+PROBE_INTERVAL = 5.0
+
+
+class UnknownAccount(ValueError):
+    """The request named an account that no worker is logged into."""
+
+
+class TerminalUnavailable(Exception):
+    """The worker process serving the call died before answering."""
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
+def _encode(result):
+    """Pickle the result, falling back to plain tuples for types the parent cannot import."""
+    try:
+        return pickle.dumps(result)
+    except Exception:
+        return pickle.dumps(_plain(result))
+
+
+def _plain(value):
+    if hasattr(value, '_asdict'):
+        return ('__namedtuple__', type(value).__name__, tuple(value._asdict().items()))
+    if type(value) is tuple:
+        return tuple(_plain(v) for v in value)
+    return value
+
+
+_rebuilt_types = {}
+
+
+def _decode(payload):
+    return _rebuild(pickle.loads(payload))
+
+
+def _rebuild(value):
+    if type(value) is tuple:
+        if len(value) == 3 and value[0] == '__namedtuple__':
+            _, typename, items = value
+            fields = tuple(k for k, _ in items)
+            cls = _rebuilt_types.get((typename, fields))
+            if cls is None:
+                cls = _rebuilt_types[(typename, fields)] = namedtuple(typename, fields)
+            return cls(*(_rebuild(v) for _, v in items))
+        return tuple(_rebuild(v) for v in value)
+    return value
+
+
+def _worker_main(config, requests, responses):
+    import MetaTrader5 as mt5
+
+    init_kwargs = {k: config[k] for k in ('path', 'login', 'password', 'server', 'timeout') if config.get(k)}
+    connected = False
+    next_probe = 0.0
+    pending = []
+
+    def connect():
+        ok = mt5.initialize(**init_kwargs)
+        if not ok:
+            logger.error("Worker %s: initialize failed: %s", config['name'], mt5.last_error())
+        return bool(ok)
+
+    while True:
+        now = time.monotonic()
+        if now >= next_probe:
+            info = mt5.terminal_info() if connected else None
+            connected = (info is not None and bool(info.connected)) or connect()
+            next_probe = now + PROBE_INTERVAL
+
+        try:
+            item = requests.get(timeout=PROBE_INTERVAL) if not pending else requests.get_nowait()
+            if item is None:
+                break
+            heapq.heappush(pending, item)
+            while True:
+                item = requests.get_nowait()
+                if item is None:
+                    return
+                heapq.heappush(pending, item)
+        except queue.Empty:
+            pass
+        if not pending:
+            continue
+
+        priority, seq, call_id, name, args, kwargs, expires = heapq.heappop(pending)
+        if expires is not None and time.time() > expires:
+            responses.put((call_id, 'expired', None))
+            continue
+        try:
+            if name == '__status__':
+                result = {'connected': connected, 'pid': os.getpid()}
+            else:
+                result = getattr(mt5, name)(*args, **kwargs)
+            responses.put((call_id, 'ok', _encode(result)))
+        except Exception as e:
+            responses.put((call_id, 'error', pickle.dumps(RuntimeError(f"{name} failed: {e}"))))
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+class _Worker:
+    def __init__(self, config, context):
+        self.config = config
+        self.name = config['name']
+        self.login = str(config['login']) if config.get('login') else None
+        self.server = config.get('server')
+        self.trading = config.get('trading', True)
+        self.context = context
+        self.pending = {}
+        self.inflight = 0
+        self.calls = 0
+        self.restarts = -1
+        self.lock = threading.Lock()
+        self.process = None
+        self.stopped = False
+
+    def start(self):
+        self.stopped = False
+        self.requests = self.context.Queue()
+        self.responses = self.context.Queue()
+        self.process = self.context.Process(target=_worker_main, name=f'mt5-worker-{self.name}',
+                                            args=(self.config, self.requests, self.responses), daemon=True)
+        self.process.start()
+        self.restarts += 1
+        threading.Thread(target=self._read, args=(self.responses, self.process),
+                         name=f'mt5-reader-{self.name}', daemon=True).start()
+
+    def stop(self):
+        self.stopped = True
+        if self.process is not None and self.process.is_alive():
+            self.requests.put(None)
+            self.process.join(timeout=5)
+
+    def kill(self):
+        """Terminate a hung worker; the reader thread fails its pending calls and restarts it."""
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+
+    def submit(self, call_id, item):
+        future = Future()
+        with self.lock:
+            self.pending[call_id] = future
+            self.inflight += 1
+            self.calls += 1
+        self.requests.put(item)
+        return future
+
+    def _resolve(self, call_id):
+        with self.lock:
+            future = self.pending.pop(call_id, None)
+            if future is not None:
+                self.inflight -= 1
+        return future
+
+    def _read(self, responses, process):
+        while True:
+            try:
+                call_id, status, payload = responses.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                break
+            future = self._resolve(call_id)
+            if future is None:
+                continue
+            if status == 'ok':
+                future.set_result(_decode(payload))
+            elif status == 'expired':
+                future.set_exception(TerminalTimeout(f"Call expired in the {self.name} worker queue"))
+            else:
+                future.set_exception(pickle.loads(payload))
+
+        if process is not self.process:
+            return
+        with self.lock:
+            failed, self.pending, self.inflight = self.pending, {}, 0
+        for future in failed.values():
+            future.set_exception(TerminalUnavailable(f"MT5 worker {self.name} died"))
+        if self.stopped:
+            return
+        logger.error("MT5 worker %s exited with code %s; restarting.", self.name, process.exitcode)
+        self.start()
+
+
+class TerminalPool:
+    def __init__(self, configs, start_method='spawn'):
+        if not configs:
+            raise ValueError("At least one terminal must be configured")
+        context = multiprocessing.get_context(start_method)
+        self.workers = [_Worker(config, context) for config in configs]
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._started = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            configs = json.load(f)
+        for i, config in enumerate(configs):
+            config.setdefault('name', str(config.get('login') or i))
+        return cls(configs)
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                for worker in self.workers:
+                    worker.start()
+                self._started = True
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+        self._started = False
+
+    def account_worker(self, account=None):
+        if account is not None:
+            account = str(account)
+            for worker in self.workers:
+                if account in (worker.name, worker.login):
+                    return worker
+            raise UnknownAccount(f"No terminal is configured for account '{account}'")
+        for worker in self.workers:
+            if worker.trading:
+                return worker
+        return self.workers[0]
+
+    def worker_for(self, name, account=None):
+        """
+        Pick the worker for a call. Account calls are pinned to the account's worker;
+        market data goes to the least busy worker (on the same trade server as the
+        requested account, so prices stay consistent with the broker).
+        """
+        if name not in MARKET_DATA_CALLS:
+            return self.account_worker(account)
+        candidates = self.workers
+        if account is not None:
+            server = self.account_worker(account).server
+            candidates = [w for w in self.workers if w.server == server]
+        return min(candidates, key=lambda w: (w.inflight, w.calls))
+
+    def call(self, name, args, kwargs, priority=5, deadline=None, account=None):
+        if not self._started:
+            self.start()
+        if name in BROADCAST_CALLS:
+            candidates = self.workers
+            if account is not None:
+                server = self.account_worker(account).server
+                candidates = [w for w in self.workers if w.server == server]
+            pending = [self._submit(worker, name, args, kwargs, priority, deadline) for worker in candidates]
+            return all([self._result(*call) for call in pending])
+        worker = self.worker_for(name, account)
+        return self._result(*self._submit(worker, name, args, kwargs, priority, deadline))
+
+    def _submit(self, worker, name, args, kwargs, priority, deadline):
+        call_id = next(self._ids)
+        expires = time.time() + deadline if deadline else None
+        future = worker.submit(call_id, (priority, next(self._seq), call_id, name, args, kwargs, expires))
+        return worker, call_id, name, future, expires
+
+    def _result(self, worker, call_id, name, future, expires):
+        timeout = CALL_TIMEOUT + (max(expires - time.time(), 0.0) if expires is not None else 0.0)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if worker._resolve(call_id) is None:
+                # Answered just as the wait ran out
+                return future.result()
+            logger.error("MT5 worker %s did not answer %s within %.0fs; restarting it.", worker.name, name, timeout)
+            worker.kill()
+            raise TerminalUnavailable(f"MT5 worker {worker.name} did not answer {name} within {timeout:.0f}s")
+
+    def ready(self):
+        return self._started and all(w.process is not None and w.process.is_alive() for w in self.workers)
+
+    def status(self):
+        return {
+            "workers": [
+                {
+                    "name": w.name,
+                    "login": w.login,
+                    "trading": w.trading,
+                    "alive": w.process is not None and w.process.is_alive(),
+                    "pid": w.process.pid if w.process is not None else None,
+                    "inflight": w.inflight,
+                    "calls": w.calls,
+                    "restarts": max(w.restarts, 0),
+                }
+                for w in self.workers
+            ]
+        }
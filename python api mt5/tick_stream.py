@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import itertools
+import threading
+from terminal import mt5, executor, PRIORITY_DEFAULT
+
+logger = logging.getLogger(__name__)
+
+
+class TickStream:
+    """
+    Shared tick poller.
+
+    One background thread polls ``symbol_info_tick`` for the union of all subscribed
+    symbols (in a single executor hop per round) and calls each subscriber's callback
+    when a symbol's ``time_msc`` changes. Any number of subscribers share the same
+    terminal load. Callbacks run on the poller thread and must not block.
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self._latest = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self, symbols, callback):
+        """Call ``callback(symbol, tick)`` for every new tick on ``symbols``; returns a token."""
+        token = next(self._ids)
+        with self._lock:
+            self._subscribers[token] = (frozenset(symbols), callback)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='tick-stream', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def latest(self, symbol):
+        """Last tick seen for ``symbol`` (None until it has been polled once)."""
+        return self._latest.get(symbol)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _poll(self, symbols):
+        return [(symbol, mt5.symbol_info_tick(symbol)) for symbol in symbols]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                subscribers = list(self._subscribers.values())
+            if not subscribers:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            started = time.monotonic()
+            symbols = sorted(set().union(*(symbols for symbols, _ in subscribers)))
+            try:
+                ticks = executor.run(self._poll, symbols, priority=PRIORITY_DEFAULT, name='tick_poll')
+            except Exception:
+                logger.exception("Tick poll failed")
+                ticks = []
+
+            for symbol, tick in ticks:
+                if tick is None:
+                    continue
+                previous = self._latest.get(symbol)
+                if previous is not None and previous.time_msc == tick.time_msc:
+                    continue
+                self._latest[symbol] = tick
+                for wanted, callback in subscribers:
+                    if symbol in wanted:
+                        try:
+                            callback(symbol, tick)
+                        except Exception:
+                            logger.exception("Tick subscriber failed for %s", symbol)
+
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+tick_stream = TickStream(interval=float(os.environ.get('MT5_TICK_POLL_MS', 250)) / 1000)
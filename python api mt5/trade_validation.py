@@ -0,0 +1,186 @@
+"""
+Pre-trade validation and normalization against cached symbol specs.
+
+Requests are checked locally before ``order_send`` so that mistakes the terminal would
+answer with INVALID_VOLUME / INVALID_PRICE / INVALID_STOPS / INVALID_FILL do not cost a
+terminal round trip:
+
+* volume is rounded to ``volume_step`` and checked against ``volume_min`` / ``volume_max``
+* prices, SL and TP are rounded to the symbol's tick size and ``digits``
+* SL / TP must be at least ``trade_stops_level`` points from the market (positions) or
+  from the order price (pending orders), on the correct side
+* pending prices must be ``trade_stops_level`` points away from the market, on the side
+  their type implies
+* SL / TP of a position cannot be changed while the market is within
+  ``trade_freeze_level`` points of them
+* the filling mode is one the symbol allows (``filling_mode`` bitmask), preferring IOC
+
+``ORDER_VALIDATION`` selects what happens to volume and price rounding: ``fix``
+(default) corrects the values and reports the adjustments, ``strict`` rejects them,
+``off`` skips validation entirely. Stop-level violations and trade mode restrictions are
+always rejected; the filling mode is always corrected.
+"""
+import os
+from terminal import mt5
+
+MODE = os.environ.get('ORDER_VALIDATION', 'fix').lower()
+
+# MetaTrader5 SYMBOL_TRADE_MODE_* values
+TRADE_MODE_DISABLED = 0
+TRADE_MODE_LONGONLY = 1
+TRADE_MODE_SHORTONLY = 2
+TRADE_MODE_CLOSEONLY = 3
+
+BUY_TYPES = ('ORDER_TYPE_BUY', 'ORDER_TYPE_BUY_LIMIT', 'ORDER_TYPE_BUY_STOP', 'ORDER_TYPE_BUY_STOP_LIMIT')
+
+
+class OrderRejected(Exception):
+    """The request would be refused by the terminal and cannot be fixed locally."""
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.field = field
+
+
+def enabled():
+    return MODE != 'off'
+
+
+def _is_buy(order_type):
+    return order_type in {getattr(mt5, name) for name in BUY_TYPES}
+
+
+def step_decimals(step):
+    text = f"{step:.10f}".rstrip('0')
+    return len(text.split('.')[1]) if '.' in text else 0
+
+
+class _Normalizer:
+    def __init__(self, spec, strict):
+        self.spec = spec
+        self.strict = strict
+        self.point = spec.point
+        self.tick_size = spec.trade_tick_size or spec.point
+        self.adjustments = []
+
+    def fix(self, field, original, value):
+        if value != original:
+            if self.strict:
+                raise OrderRejected(f"'{field}' {original} is not valid for {self.spec.name}; nearest valid value is {value}",
+                                    field)
+            self.adjustments.append({"field": field, "from": original, "to": value})
+        return value
+
+    def price(self, field, value):
+        if not value:
+            return value
+        rounded = round(round(value / self.tick_size) * self.tick_size, self.spec.digits)
+        return self.fix(field, value, rounded)
+
+    def volume(self, value):
+        step = self.spec.volume_step or 0.01
+        rounded = round(round(value / step) * step, step_decimals(step))
+        if rounded < self.spec.volume_min - 1e-12:
+            raise OrderRejected(f"Volume {value} is below the minimum {self.spec.volume_min} for {self.spec.name}", 'volume')
+        if rounded > self.spec.volume_max + 1e-12:
+            raise OrderRejected(f"Volume {value} is above the maximum {self.spec.volume_max} for {self.spec.name}", 'volume')
+        return self.fix('volume', value, rounded)
+
+    def stops(self, is_buy, reference, sl, tp):
+        """SL / TP must be ``trade_stops_level`` points from ``reference`` on the correct side."""
+        distance = self.spec.trade_stops_level * self.point
+        tolerance = self.point / 2
+        if sl:
+            if is_buy and sl > reference - distance + tolerance:
+                raise OrderRejected(f"SL {sl} must be at least {self.spec.trade_stops_level} points below {reference}", 'sl')
+            if not is_buy and sl < reference + distance - tolerance:
+                raise OrderRejected(f"SL {sl} must be at least {self.spec.trade_stops_level} points above {reference}", 'sl')
+        if tp:
+            if is_buy and tp < reference + distance - tolerance:
+                raise OrderRejected(f"TP {tp} must be at least {self.spec.trade_stops_level} points above {reference}", 'tp')
+            if not is_buy and tp > reference - distance + tolerance:
+                raise OrderRejected(f"TP {tp} must be at least {self.spec.trade_stops_level} points below {reference}", 'tp')
+
+
+def filling_mode(spec, action, requested=None):
+    """A filling mode the symbol accepts for ``action``; keeps ``requested`` when allowed."""
+    allowed = []
+    if spec.filling_mode & mt5.SYMBOL_FILLING_IOC:
+        allowed.append(mt5.ORDER_FILLING_IOC)
+    if spec.filling_mode & mt5.SYMBOL_FILLING_FOK:
+        allowed.append(mt5.ORDER_FILLING_FOK)
+    # Pending orders can always be placed with RETURN; market orders only without IOC / FOK
+    if action == mt5.TRADE_ACTION_PENDING or not allowed:
+        allowed.append(mt5.ORDER_FILLING_RETURN)
+    return requested if requested in allowed else allowed[0]
+
+
+def _check_trade_mode(spec, is_buy):
+    if spec.trade_mode == TRADE_MODE_DISABLED:
+        raise OrderRejected(f"Trading is disabled for {spec.name}", 'symbol')
+    if spec.trade_mode == TRADE_MODE_CLOSEONLY:
+        raise OrderRejected(f"{spec.name} is close-only", 'symbol')
+    if spec.trade_mode == TRADE_MODE_LONGONLY and not is_buy:
+        raise OrderRejected(f"{spec.name} allows long positions only", 'type')
+    if spec.trade_mode == TRADE_MODE_SHORTONLY and is_buy:
+        raise OrderRejected(f"{spec.name} allows short positions only", 'type')
+
+
+def normalize_order(request_data, spec, tick, strict=None):
+    """
+    Validate a TRADE_ACTION_DEAL / TRADE_ACTION_PENDING request for opening an order.
+    Returns ``(normalized_request, adjustments)``; raises ``OrderRejected``.
+    """
+    n = _Normalizer(spec, MODE == 'strict' if strict is None else strict)
+    data = dict(request_data)
+    is_buy = _is_buy(data['type'])
+    _check_trade_mode(spec, is_buy)
+
+    data['volume'] = n.volume(float(data['volume']))
+    for field in ('price', 'sl', 'tp'):
+        if field in data:
+            data[field] = n.price(field, float(data[field]))
+
+    if data['action'] == mt5.TRADE_ACTION_PENDING:
+        price = data['price']
+        distance = spec.trade_stops_level * spec.point - spec.point / 2
+        if data['type'] in (mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_STOP):
+            market = tick.ask if data['type'] == mt5.ORDER_TYPE_BUY_LIMIT else tick.bid
+            if market - price < distance:
+                raise OrderRejected(f"Price {price} must be at least {spec.trade_stops_level} points below {market}", 'price')
+        elif data['type'] in (mt5.ORDER_TYPE_SELL_LIMIT, mt5.ORDER_TYPE_BUY_STOP):
+            market = tick.bid if data['type'] == mt5.ORDER_TYPE_SELL_LIMIT else tick.ask
+            if price - market < distance:
+                raise OrderRejected(f"Price {price} must be at least {spec.trade_stops_level} points above {market}", 'price')
+        n.stops(is_buy, price, data.get('sl'), data.get('tp'))
+    else:
+        # A buy position closes at the bid, a sell position at the ask
+        n.stops(is_buy, tick.bid if is_buy else tick.ask, data.get('sl'), data.get('tp'))
+
+    # Always worked out from the symbol, even in strict mode
+    filling = filling_mode(spec, data['action'], data.get('type_filling'))
+    if filling != data.get('type_filling'):
+        n.adjustments.append({"field": "type_filling", "from": data.get('type_filling'), "to": filling})
+        data['type_filling'] = filling
+    return data, n.adjustments
+
+
+def normalize_sltp(position, sl, tp, spec, tick, strict=None):
+    """
+    Validate new SL / TP levels for an open position.
+    Returns ``(sl, tp, adjustments)``; raises ``OrderRejected``.
+    """
+    n = _Normalizer(spec, MODE == 'strict' if strict is None else strict)
+    is_buy = position.type == mt5.POSITION_TYPE_BUY
+    current = tick.bid if is_buy else tick.ask
+
+    freeze = spec.trade_freeze_level * spec.point
+    if freeze:
+        for field, level in (('sl', position.sl), ('tp', position.tp)):
+            if level and abs(current - level) < freeze:
+                raise OrderRejected(f"Existing {field.upper()} {level} is within the freeze level "
+                                    f"({spec.trade_freeze_level} points) of {current}", field)
+
+    sl, tp = n.price('sl', float(sl)), n.price('tp', float(tp))
+    n.stops(is_buy, current, sl, tp)
+    return sl, tp, n.adjustments
@@ -0,0 +1,136 @@
+"""
+WSGI middleware that records the request sequence to a JSON-lines file for offline replay
+(``benchmarks/replay.py``). Enabled by setting ``TRAFFIC_RECORD_FILE``.
+
+Each line holds the recording session (the epoch second the recorder started, since the
+file is appended to across restarts), the request's offset in seconds from the start of
+that session, method, path, query, a small allowlist of headers, the request body and the response status,
+size and duration. API keys and other credentials are never written: only allowlisted
+headers are kept, and query / body fields whose name looks like a secret are replaced
+with ``"***"``.
+"""
+import io
+import re
+import json
+import time
+import logging
+import threading
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+RECORDED_HEADERS = ('Content-Type', 'X-MT5-Account', 'X-Profile', 'User-Agent')
+SECRET_FIELD = re.compile(r'pass|secret|token|key|auth|cookie', re.IGNORECASE)
+REDACTED = '***'
+MAX_BODY = 64 * 1024
+
+_HEADER_KEYS = {name: 'CONTENT_TYPE' if name == 'Content-Type' else 'HTTP_' + name.upper().replace('-', '_')
+                for name in RECORDED_HEADERS}
+
+
+def redact(value):
+    """Recursively replace values of secret-looking keys."""
+    if isinstance(value, dict):
+        return {k: REDACTED if SECRET_FIELD.search(str(k)) else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+class _RecordedBody:
+    """Response iterable that counts bytes and writes the record once the body is consumed or closed."""
+
+    def __init__(self, result, finish):
+        self._result = result
+        self._finish = finish
+        self._done = False
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._result:
+            self.size += len(chunk)
+            yield chunk
+        self._complete()
+
+    def _complete(self):
+        if not self._done:
+            self._done = True
+            self._finish(self.size)
+
+    def close(self):
+        try:
+            if hasattr(self._result, 'close'):
+                self._result.close()
+        finally:
+            self._complete()
+
+
+class TrafficRecorder:
+    def __init__(self, wsgi_app, path, max_body=MAX_BODY):
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self.max_body = max_body
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+        self._started = time.time()
+        self.session = int(self._started)
+        logger.info("Recording traffic to %s", path)
+
+    def _body(self, environ):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return b''
+        raw = environ['wsgi.input'].read(length)
+        environ['wsgi.input'] = io.BytesIO(raw)
+        return raw
+
+    def _decode_body(self, raw, content_type):
+        if not raw:
+            return None
+        if len(raw) > self.max_body:
+            return {'__truncated__': len(raw)}
+        text = raw.decode('utf-8', errors='replace')
+        if 'json' in (content_type or '') or text[:1] in '{[':
+            try:
+                return redact(json.loads(text))
+            except ValueError:
+                pass
+        return text
+
+    def __call__(self, environ, start_response):
+        arrived = time.time()
+        started = time.perf_counter()
+        raw = self._body(environ)
+        record = {
+            'session': self.session,
+            't': round(arrived - self._started, 6),
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'query': redact(dict(parse_qsl(environ.get('QUERY_STRING', ''), keep_blank_values=True))),
+            'headers': {name: environ[key] for name, key in _HEADER_KEYS.items() if key in environ},
+            'body': self._decode_body(raw, environ.get('CONTENT_TYPE')),
+            'request_bytes': len(raw),
+        }
+
+        def recording_start_response(status, headers, exc_info=None):
+            record['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        def finish(size):
+            record['response_bytes'] = size
+            record['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            self.write(record)
+
+        return _RecordedBody(self.wsgi_app(environ, recording_start_response), finish)
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()